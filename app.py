@@ -2,13 +2,19 @@ import streamlit as st
 import re
 import requests
 import uuid  # 👈 新增导入
+import os
+import tempfile
 from pathlib import Path
 
-# --- 储存 ---
-from .data_db.position_store import PositionStore
-from .data_db.candidate_store import CandidateStore
-from .data_db.candinote_store import  NoteStore
-from rag_engine import RAGEngine
+# --- 储存（按部署模式为本地存储或数据服务的瘦客户端） ---
+from .service.client import connect_services
+from .data_db.candidate_export import EXPORT_FORMATS
+from .data_model.position import DEGREE_LEVELS, Position, PrescreenRules
+from .doc_ana.prescreen import suggest_terms
+from .doc_ana.doc_ana import extract_text_from_file
+from .backend_control import INTERACTIVE, request_priority
+from .data_model.candidate import PERSON_PROFILE_FIELDS
+from .telemetry import configure as configure_telemetry
 
 # --- 服务 ---
 from config import get_config
@@ -16,6 +22,30 @@ from config import get_config
 # --- llamaindex ---
 from llama_index.core import Settings
 
+@st.cache_resource
+def get_services():
+    """进程内共享一组存储和RAGEngine（及其模型客户端和HTTP连接池），不再每个会话各建一个；
+    service部署模式下为数据服务的瘦客户端，可以起多个界面进程"""
+    return connect_services(get_config())
+
+# --- 数据（按数据版本号缓存：版本号不变时Streamlit重跑不再查询数据库） ---
+PAGE_SIZE = 20
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def load_candidate_page(position_id: int, data_version: int, sort_by: str, page: int, page_size: int = PAGE_SIZE) -> list[dict]:
+    """一页候选人（data_version只作为缓存key，写入后版本号变化自然失效）"""
+    return get_services().candidates.get_by_position(
+        position_id, sort_by=sort_by, include_notes=True, limit=page_size, offset=page * page_size
+    )
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def load_position_stats(position_id: int, data_version: int) -> dict:
+    return get_services().candidates.get_stats_by_position(position_id)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def load_positions_with_stats(data_version: int, status: str = "active") -> list[dict]:
+    return get_services().positions.get_all_with_stats(status)
+
 # --- ui ---
 def get_chat_model(config:dict) -> list[str]:
     return [config['vllm']['vllm_model']]
@@ -27,23 +57,258 @@ def ini_app():
         with st.spinner("正在初始化系统..."):
             # 获取配置
             config = get_config()
+            configure_telemetry(**config["telemetry"])
             # 初始化存储
-            st.session_state.position_store = PositionStore()
-            st.session_state.candidate_store = CandidateStore()
-            st.session_state.note_store = NoteStore()
-            st.session_state.rag_engine = RAGEngine()
+            services = get_services()
+            st.session_state.position_store = services.positions
+            st.session_state.candidate_store = services.candidates
+            st.session_state.note_store = services.notes
+            st.session_state.job_store = services.jobs
+            st.session_state.rag_engine = services.engine
 
             # 服务
+            st.session_state.app_ini = True
+
+def render_resume_download(candidate: dict):
+    """简历原文件下载（点击时才分块读取文件内容，渲染候选人列表时不读文件）"""
+    sha256 = candidate.get("blob_sha256")
+    if not sha256:
+        return
+
+    blob_store = st.session_state.candidate_store.blobs
+    if not blob_store.exists(sha256):
+        st.caption("原始简历文件已被清理")
+        return
+
+    # 本地存储和数据服务的瘦客户端都提供iter_chunks（后者经GET /blobs/<sha256>流式读取）；
+    # 下载组件最终要拿到完整的bytes，这里只是把读取推迟到点击时
+    st.download_button(
+        label="下载原始简历",
+        data=lambda: b"".join(blob_store.iter_chunks(sha256)),
+        file_name=candidate.get("file_name") or sha256,
+        key=f"download_{candidate['id']}",
+    )
+
+def render_export(position_id: int, position_name: str):
+    """导出岗位候选人（逐批查询写入临时文件，生成过程不在内存中攒整张表；下载组件发送时仍会读入整个文件）"""
+    fmt = st.selectbox("导出格式", list(EXPORT_FORMATS), key=f"export_fmt_{position_id}")
+    if st.button("生成导出文件", key=f"export_{position_id}"):
+        # delete=False：Windows上打开中的临时文件不能再次打开，写完关闭后重新以"rb"打开
+        # （下载组件只接受bytes或BufferedReader等类型），用完在finally中删除
+        with tempfile.NamedTemporaryFile(suffix=f".{fmt}", delete=False) as tmp:
+            tmp_path = tmp.name
+        try:
+            with open(tmp_path, "wb") as target, st.spinner("正在导出..."):
+                get_services().export_position(position_id, fmt, target)
+            with open(tmp_path, "rb") as f:
+                st.download_button(
+                    label="下载",
+                    data=f,
+                    file_name=f"{position_name}_候选人.{fmt}",
+                    mime=EXPORT_FORMATS[fmt],
+                    key=f"export_download_{position_id}",
+                )
+        finally:
+            os.unlink(tmp_path)
+
+def render_batch_upload(position_id: int):
+    """批量上传简历：文件进入后台任务队列，由job_worker进程处理，刷新页面不影响进度"""
+    files = st.file_uploader(
+        "批量上传简历",
+        type=["pdf", "docx", "txt"],
+        accept_multiple_files=True,
+        key=f"upload_{position_id}",
+    )
+    if files and st.button("开始筛选", key=f"enqueue_{position_id}"):
+        batch_id = get_services().enqueue_batch(position_id, [(f.name, f) for f in files])
+        st.success(f"已提交批次#{batch_id}，后台处理中")
+    render_batch_progress(position_id)
+
+@st.fragment(run_every=3)
+def render_batch_progress(position_id: int):
+    """最近批次的处理进度（每3秒轮询任务库，只重绘本区域）"""
+    job_store = st.session_state.job_store
+    for batch in job_store.list_batches(position_id, limit=5):
+        stages = "，".join(f"{stage} {n}" for stage, n in batch["stages"].items() if n)
+        st.progress(
+            batch["percent"] / 100,
+            text=f"{'重新评估' if batch['kind'] == 'reevaluate' else ''}批次#{batch['batch_id']}：完成{batch['done']}/{batch['total']}，失败{batch['failed']}"
+                 + (f"（处理中：{stages}）" if stages else "")
+                 + (f"，{'无法自动重新评估' if batch['kind'] == 'reevaluate' else '重复跳过'}{batch['duplicate_count']}"
+                    if batch["duplicate_count"] else ""),
+        )
+        if batch["failed"]:
+            with st.expander(f"批次#{batch['batch_id']}失败明细"):
+                for error in job_store.get_batch_progress(batch["batch_id"])["errors"]:
+                    st.caption(f"{error['file_name']}：{error['last_error']}")
+                if st.button("重试失败任务", key=f"retry_{batch['batch_id']}"):
+                    job_store.retry_failed(batch["batch_id"])
+
+def render_prescreen_rules(position_id: int, description: str):
+    """岗位规则预筛设置（未通过的简历不调用LLM，直接标记为不推荐）"""
+    position_store = st.session_state.position_store
+    rules = position_store.get_prescreen_rules(position_id) or PrescreenRules(enabled=False, must_have=suggest_terms(description))
+    with st.expander("规则预筛"):
+        enabled = st.checkbox("启用预筛", value=rules.enabled, key=f"prescreen_on_{position_id}")
+        terms = st.text_input("必备关键词（逗号分隔，同义写法用|分隔）", value=", ".join(rules.must_have), key=f"prescreen_terms_{position_id}")
+        ratio = st.slider("关键词至少命中比例", 0.0, 1.0, rules.min_term_ratio, 0.1, key=f"prescreen_ratio_{position_id}")
+        degree = st.selectbox("最低学历", ["不限"] + DEGREE_LEVELS,
+                              index=DEGREE_LEVELS.index(rules.min_degree) + 1 if rules.min_degree else 0,
+                              key=f"prescreen_degree_{position_id}")
+        years = st.number_input("最低工作年限", 0.0, 30.0, float(rules.min_years or 0), 0.5, key=f"prescreen_years_{position_id}")
+        if st.button("保存预筛规则", key=f"prescreen_save_{position_id}"):
+            position_store.set_prescreen_rules(position_id, PrescreenRules(
+                enabled=enabled,
+                must_have=[t.strip() for t in re.split(r"[,，]", terms) if t.strip()],
+                min_term_ratio=ratio,
+                min_degree=None if degree == "不限" else degree,
+                min_years=years or None,
+            ))
+            st.success("预筛规则已保存，对之后提交的简历生效")
+
+def render_position_editor(position_id: int):
+    """修改岗位描述：保存后已有候选人的评估标记为过期，并在后台按优先级重新评估"""
+    position_store = st.session_state.position_store
+    position = position_store.get_by_id(position_id)
+    with st.expander(f"编辑岗位描述（当前版本v{position.jd_version}）"):
+        description = st.text_area("岗位描述", value=position.description, height=240, key=f"jd_{position_id}")
+        if st.button("保存岗位描述", key=f"jd_save_{position_id}") and description != position.description:
+            position_store.update(position_id, description=description)
+            batch_id = get_services().enqueue_reevaluation(position_id)
+            if batch_id:
+                st.success(f"岗位描述已更新，已有候选人在后台重新评估（批次#{batch_id}）")
+                skipped = st.session_state.job_store.get_batch_progress(batch_id)["duplicate_count"]
+                if skipped:
+                    st.warning(f"其中{skipped}人没有可用的原简历文件，无法自动重新评估，请在候选人卡片上点击「重新分析」")
+            else:
+                st.success("岗位描述已更新")
+
+def render_stale_marker(candidate: dict):
+    """评估基于旧版岗位描述的候选人显示过期标记（没有原简历文件的不会自动重新评估，提示手动重新分析）"""
+    if not candidate.get("stale"):
+        return
+    sha256 = candidate.get("blob_sha256")
+    if sha256 and st.session_state.candidate_store.blobs.exists(sha256):
+        st.caption(f"⚠️ 评估基于旧版岗位描述（v{candidate.get('jd_version')}），正在重新评估")
+    else:
+        st.caption(f"⚠️ 评估基于旧版岗位描述（v{candidate.get('jd_version')}），没有可用的原简历文件，"
+                   f"不会自动重新评估，请点击「重新分析」")
+
+def render_duplicate_marker(candidate: dict):
+    """本岗位下有近似重复简历的候选人显示重复投递标记"""
+    if candidate.get("duplicate_count"):
+        st.caption(f"🔁 疑似重复投递：本岗位另有{candidate['duplicate_count']}份近似相同的简历")
+
+def render_candidate_list(position_id: int):
+    """候选人列表：每次只查询和渲染当前页"""
+    candidate_store = st.session_state.candidate_store
+    version = candidate_store.get_data_version(position_id)
+    stats = load_position_stats(position_id, version)
+
+    col_sort, col_page = st.columns([2, 1])
+    sort_by = col_sort.selectbox(
+        "排序",
+        ["tag_priority", "recommendation", "time"],
+        format_func={"tag_priority": "按标签", "recommendation": "按推荐等级", "time": "按时间"}.get,
+        key=f"sort_{position_id}",
+    )
+    pages = max(1, -(-stats["total"] // PAGE_SIZE))
+    page = col_page.number_input(f"页码（共{pages}页，{stats['total']}人）", 1, pages, 1, key=f"page_{position_id}") - 1
+
+    for candidate in load_candidate_page(position_id, version, sort_by, page):
+        render_candidate_card(candidate, position_id)
+
+def reanalyze_candidate(candidate: dict, position_id: int):
+    """
+    在界面进程内直接重新评估单个候选人（交互优先级，不排在批量筛选任务后面）
+
+    与ScreeningWorker的analyze阶段一致：已有提取好的经历时只调用评估；预筛淘汰、
+    两级模型之前保存的等没有经历的候选人，从原简历文件重新提取文本后完整分析，避免用空档案覆盖原结果
+    """
+    position = st.session_state.position_store.get_by_id(position_id)
+    profile = st.session_state.candidate_store.get_by_id(candidate["id"])
+    if position is None or profile is None:
+        st.error("候选人或岗位已删除")
+        return
+    with request_priority(INTERACTIVE), st.spinner("正在重新分析..."):
+        if profile.work_experience or profile.project_experience:
+            analysis = st.session_state.rag_engine.evaluate_profile(
+                profile.model_dump(include=set(PERSON_PROFILE_FIELDS)), position.description
+            )
+        else:
+            text = extract_candidate_text(candidate)
+            if text is None:
+                st.error("没有可用的原简历文件，无法重新分析")
+                return
+            analysis = st.session_state.rag_engine.analyze_resume(text, position.description)
+    if not analysis.analysis_success:
+        st.error("重新分析失败，请稍后再试")
+        return
+    st.session_state.candidate_store.update_analysis(candidate["id"], analysis, position.jd_version)
+    st.rerun()
+
+def extract_candidate_text(candidate: dict):
+    """从原简历文件提取文本（复制到临时目录再解析，数据服务模式下同样可用），没有文件或提取失败返回None"""
+    sha256 = candidate.get("blob_sha256")
+    blob_store = st.session_state.candidate_store.blobs
+    if not sha256 or not blob_store.exists(sha256):
+        return None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = Path(tmp_dir) / f"resume{Path(candidate.get('file_name') or '').suffix}"
+        blob_store.copy_to(sha256, file_path)
+        text, ok = extract_text_from_file(str(file_path), get_config().get("ocr"), sha256)
+    return text if ok else None
+
+def render_candidate_card(candidate: dict, position_id: int):
+    """单个候选人卡片"""
+    with st.container(border=True):
+        st.markdown(f"**{candidate['name']}** · {candidate['recommendation_level']}"
+                    + (f" · 标签：{candidate['hr_tag']}" if candidate.get("hr_tag") else ""))
+        render_stale_marker(candidate)
+        render_duplicate_marker(candidate)
+        if candidate.get("ai_summary"):
+            st.caption(candidate["ai_summary"])
+        with st.expander("详情"):
+            for item in candidate["ai_strengths"]:
+                st.markdown(f"- ✅ {item}")
+            for item in candidate["ai_concerns"]:
+                st.markdown(f"- ⚠️ {item}")
+            for note in candidate.get("latest_notes", []):
+                st.caption(f"📝 {note['content']}（{note['created_at']}）")
+            render_resume_download(candidate)
+
+        cols = st.columns(4)
+        for col, (tag, label) in zip(cols, [("star", "⭐ 星标"), ("interview", "面试"), ("pending", "待定"), ("rejected", "淘汰")]):
+            if col.button(label, key=f"tag_{tag}_{candidate['id']}"):
+                # 写入后数据版本号加1，本次重跑时缓存自动失效
+                st.session_state.candidate_store.update_hr_tag(candidate["id"], tag)
+                st.rerun()
+        if st.button("🔄 重新分析", key=f"reanalyze_{candidate['id']}"):
+            reanalyze_candidate(candidate, position_id)
 
 def render_sidebar():
-    """侧边栏渲染"""
+    """侧边栏渲染：岗位列表（含候选人数）和新建岗位，返回当前选中的岗位"""
     with st.sidebar:
+        st.header("岗位")
+        # 全局数据版本号不变时不查询数据库
+        positions = {p["id"]: p for p in load_positions_with_stats(st.session_state.position_store.get_data_version())}
+        position_id = None
+        if positions:
+            position_id = st.radio(
+                "选择岗位",
+                list(positions),
+                format_func=lambda pid: f"{positions[pid]['name']}（{positions[pid]['stats']['total']}人）",
+                key="current_position",
+            )
         st.divider()
-        
-
+        with st.expander("新建岗位"):
+            name = st.text_input("岗位名称", key="new_position_name")
+            description = st.text_area("岗位描述", height=200, key="new_position_description")
+            if st.button("创建岗位", key="new_position_create") and name.strip() and description.strip():
+                st.session_state.position_store.create(Position(name=name.strip(), description=description.strip()))
+                st.rerun()
 
-
-    return 
+    return positions.get(position_id)
 
 def main():
     """主函数"""
@@ -53,7 +318,24 @@ def main():
         page_title='简历筛选系统',
         layout='wide'
     )
+    ini_app()
+
+    position = render_sidebar()
+    if position is None:
+        st.info("请先在侧边栏新建岗位")
+        return
+
+    st.header(position["name"])
+    tab_candidates, tab_upload, tab_settings = st.tabs(["候选人", "上传简历", "岗位设置"])
+    with tab_candidates:
+        render_candidate_list(position["id"])
+        with st.expander("导出候选人"):
+            render_export(position["id"], position["name"])
+    with tab_upload:
+        render_batch_upload(position["id"])
+    with tab_settings:
+        render_position_editor(position["id"])
+        render_prescreen_rules(position["id"], position["description"])
 
-config = get_config()
-res = get_chat_model(config)
-print(res)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,508 @@
+"""模型服务（vLLM/Xinference）调用的客户端流控
+
+同一后端的所有调用共用一个BackendController（按名字取，进程内单例）：
+    - AIMD并发控制：调用成功且延迟不超过目标时，并发上限缓慢加1（每满一轮加1）；
+      超时、5xx、连接失败或延迟超标时乘性减小，同一拥塞事件只减一次
+    - 每个请求一个总截止时间（config["env"]["ollama_timeout"]），排队等待和重试都计入
+    - 可重试错误按指数退避+随机抖动重试
+    - 熔断：连续失败达到阈值后直接拒绝，冷却期后放行一个探测请求，成功则恢复
+    - 优先级：请求分为交互（界面上的单次分析、检索问答）和批量（后台筛选）两类，由request_priority
+      在调用链上标记；空出的名额先给交互请求，且批量请求最多占用(1 - reserved_share)的并发上限，
+      批量任务排满时交互请求也不用排在整批后面
+并发上限、在途请求数、各优先级的排队数和熔断状态以gauge形式导出（见telemetry），排队等待时间记为
+queue.<后端>.<优先级>阶段的耗时，由Prometheus按时间采集；
+进程内另保留最近的调整记录（history），压测和调试时可直接查看。
+"""
+
+import asyncio
+import logging
+import math
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+from .telemetry import OUTCOME_OK, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, BULK)
+
+# 当前调用链的请求优先级，未标记时取进程默认值（界面进程为交互，worker进程设为批量，
+# 这样worker内线程池发起的调用也不会被当作交互请求）
+_request_priority: ContextVar[Optional[str]] = ContextVar("request_priority", default=None)
+_default_priority = INTERACTIVE
+
+
+@contextmanager
+def request_priority(priority: str) -> Iterator[None]:
+    """在with块内发起的模型调用使用指定优先级（INTERACTIVE / BULK）"""
+    if priority not in PRIORITIES:
+        raise ValueError(f"未知的优先级: {priority}")
+    token = _request_priority.set(priority)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+
+def set_default_priority(priority: str) -> None:
+    """设置本进程未标记调用的默认优先级"""
+    global _default_priority
+    if priority not in PRIORITIES:
+        raise ValueError(f"未知的优先级: {priority}")
+    _default_priority = priority
+
+
+def current_priority() -> str:
+    return _request_priority.get() or _default_priority
+
+
+# 当前调用链上已经在控制器内的后端；客户端方法互相调用时（如批量嵌入逐条调用单条嵌入）
+# 内层直接执行，不重复占用名额，也避免名额耗尽时自己等自己
+_active_backends: ContextVar[frozenset] = ContextVar("active_backends", default=frozenset())
+
+# 同步调用本次尝试还剩的秒数（总截止时间减去排队和之前重试的耗时）
+_attempt_timeout: ContextVar[Optional[float]] = ContextVar("attempt_timeout", default=None)
+
+
+def attempt_timeout(default: float = None) -> Optional[float]:
+    """
+    BackendController.call内本次尝试可用的秒数，被调用的客户端用作单次请求的超时，
+    使一次尝试不会超出总截止时间（异步调用由asyncio.wait_for限制）；不在受控调用中时返回default
+    """
+    remaining = _attempt_timeout.get()
+    return default if remaining is None else remaining
+
+
+class CircuitOpenError(RuntimeError):
+    """后端熔断中，请求未发出"""
+
+
+class DeadlineExceeded(TimeoutError):
+    """请求在截止时间内没有完成（含排队和重试）"""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """超时、连接失败、429和5xx可以重试；其余4xx等请求本身的问题重试也没用"""
+    if isinstance(error, (CircuitOpenError, DeadlineExceeded)):
+        return False
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    name = type(error).__name__
+    return "Timeout" in name or "Connect" in name
+
+
+class AIMDLimiter:
+    """加性增、乘性减的并发上限，名额按优先级分配"""
+
+    def __init__(
+        self,
+        name: str,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        latency_target: float = 30.0,
+        decrease_factor: float = 0.7,
+        reserved_share: float = 0.25,
+        history_size: int = 1000,
+    ):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.reserved_share = reserved_share
+        self._limit = float(max(min_limit, min(initial, max_limit)))
+        self._inflight = 0
+        self._inflight_by_priority = {priority: 0 for priority in PRIORITIES}
+        self._lock = threading.Lock()
+        # 同一优先级内按先来后到获得名额，避免个别请求一直抢不到而超时
+        self._waiters: Dict[str, Deque[Callable[[], None]]] = {priority: deque() for priority in PRIORITIES}
+        # 减小之前已经发出的请求，结束时不再触发减小（同一拥塞事件只减一次）
+        self._epoch = 0
+        self.history: Deque[Tuple[float, int]] = deque(maxlen=history_size)
+        self._publish()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    @property
+    def bulk_limit(self) -> int:
+        """批量请求最多占用的名额（至少1个，上限为1时不保留）"""
+        limit = int(self._limit)
+        return max(1, limit - math.ceil(limit * self.reserved_share))
+
+    def queue_depth(self, priority: str) -> int:
+        return len(self._waiters[priority])
+
+    def acquire(self, timeout: Optional[float] = None, priority: Optional[str] = None) -> int:
+        """占用一个并发名额，返回当前epoch；超时抛DeadlineExceeded。priority默认取当前调用链的优先级"""
+        priority = priority or current_priority()
+        started = time.monotonic()
+        granted = threading.Event()
+
+        def wake():
+            granted.set()
+
+        with self._lock:
+            if self._can_grant(priority, queued_ahead=True):
+                return self._grant(priority, started)
+            self._enqueue(priority, wake)
+
+        if not granted.wait(timeout):
+            with self._lock:
+                if wake in self._waiters[priority]:
+                    self._dequeue(priority, wake)
+                    raise DeadlineExceeded(f"{self.name}: 等待并发名额超时")
+            # 超时的同时已被分配了名额
+        self._observe_wait(priority, started)
+        return self._epoch
+
+    async def acquire_async(self, timeout: Optional[float] = None, priority: Optional[str] = None) -> int:
+        """acquire的协程版本，等待时不占用线程"""
+        priority = priority or current_priority()
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        with self._lock:
+            if self._can_grant(priority, queued_ahead=True):
+                return self._grant(priority, started)
+            self._enqueue(priority, wake)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(granted), timeout)
+        except BaseException as e:
+            with self._lock:
+                if wake in self._waiters[priority]:
+                    self._dequeue(priority, wake)
+                    if isinstance(e, asyncio.TimeoutError):
+                        raise DeadlineExceeded(f"{self.name}: 等待并发名额超时") from e
+                    raise
+                if not isinstance(e, asyncio.TimeoutError):
+                    # 已分配名额但调用方被取消，归还名额
+                    self._inflight -= 1
+                    self._inflight_by_priority[priority] -= 1
+                    self._wake_waiters()
+                    raise
+        self._observe_wait(priority, started)
+        return self._epoch
+
+    def _can_grant(self, priority: str, queued_ahead: bool = False) -> bool:
+        """当前是否可以给该优先级一个名额；queued_ahead为True时还要求前面没有同级或更高优先级的等待者"""
+        if self._inflight >= int(self._limit):
+            return False
+        if priority == BULK:
+            if queued_ahead and (self._waiters[INTERACTIVE] or self._waiters[BULK]):
+                return False
+            return self._inflight_by_priority[BULK] < self.bulk_limit
+        return not (queued_ahead and self._waiters[INTERACTIVE])
+
+    def _grant(self, priority: str, started: float) -> int:
+        self._inflight += 1
+        self._inflight_by_priority[priority] += 1
+        self._publish()
+        self._observe_wait(priority, started)
+        return self._epoch
+
+    def _enqueue(self, priority: str, wake: Callable[[], None]) -> None:
+        self._waiters[priority].append(wake)
+        self._publish_queue(priority)
+
+    def _dequeue(self, priority: str, wake: Callable[[], None]) -> None:
+        self._waiters[priority].remove(wake)
+        self._publish_queue(priority)
+
+    def _wake_waiters(self) -> None:
+        """把空出来的名额交给等待者：先交互后批量，同级按顺序（调用方持有锁）"""
+        for priority in PRIORITIES:
+            waiters = self._waiters[priority]
+            woken = False
+            while waiters and self._can_grant(priority):
+                self._inflight += 1
+                self._inflight_by_priority[priority] += 1
+                waiters.popleft()()
+                woken = True
+            if woken:
+                self._publish_queue(priority)
+
+    def _observe_wait(self, priority: str, started: float) -> None:
+        REGISTRY.observe((f"queue.{self.name}.{priority}", "", "", OUTCOME_OK), time.monotonic() - started)
+
+    def release(self, epoch: int, latency: float, overloaded: bool, priority: Optional[str] = None) -> None:
+        """
+        归还名额并根据结果调整上限
+
+        Args:
+            epoch: acquire返回的epoch
+            latency: 本次调用耗时（秒）
+            overloaded: 是否出现超时/5xx/连接失败等过载信号
+            priority: acquire时的优先级，默认取当前调用链的优先级
+        """
+        with self._lock:
+            self._inflight -= 1
+            self._inflight_by_priority[priority or current_priority()] -= 1
+            if overloaded or latency > self.latency_target:
+                if epoch == self._epoch:
+                    self._limit = max(self.min_limit, self._limit * self.decrease_factor)
+                    self._epoch += 1
+                    self._record()
+            elif self._inflight + 1 >= int(self._limit) * 0.5:
+                # 只有并发确实用上时才增加，空闲时上限不会无限上涨
+                before = int(self._limit)
+                self._limit = min(self.max_limit, self._limit + 1.0 / max(self._limit, 1.0))
+                if int(self._limit) != before:
+                    self._record()
+            self._wake_waiters()
+            self._publish()
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """占用名额执行一次调用，调用方通过yield出的字典标记overloaded"""
+        priority = current_priority()
+        epoch = self.acquire(timeout, priority)
+        outcome = {"overloaded": False}
+        start = time.monotonic()
+        try:
+            yield outcome
+        except BaseException as e:
+            outcome["overloaded"] = outcome["overloaded"] or is_retryable(e)
+            raise
+        finally:
+            self.release(epoch, time.monotonic() - start, outcome["overloaded"], priority)
+
+    def _record(self):
+        self.history.append((time.time(), int(self._limit)))
+        logger.info(f"{self.name}并发上限调整为{int(self._limit)}")
+
+    def _publish(self):
+        REGISTRY.set_gauge("backend_concurrency_limit", int(self._limit), backend=self.name)
+        REGISTRY.set_gauge("backend_inflight", self._inflight, backend=self.name)
+        for priority, inflight in self._inflight_by_priority.items():
+            REGISTRY.set_gauge("backend_inflight_by_priority", inflight, backend=self.name, priority=priority)
+
+    def _publish_queue(self, priority: str):
+        REGISTRY.set_gauge("backend_queue_depth", len(self._waiters[priority]), backend=self.name, priority=priority)
+
+
+class CircuitBreaker:
+    """连续失败熔断"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+        self._publish()
+
+    def allow(self) -> None:
+        """请求发出前检查，熔断中抛CircuitOpenError"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probing = False
+                self._publish()
+            # 探测请求没有结果（如排队超时）时，过一个冷却期再放行下一个
+            now = time.monotonic()
+            if self.state == self.HALF_OPEN and (not self._probing or now - self._probe_started >= self.reset_timeout):
+                self._probing = True
+                self._probe_started = now
+                return
+            raise CircuitOpenError(f"{self.name}服务熔断中，{self.reset_timeout:.0f}秒内不再请求")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            if self.state != self.CLOSED:
+                logger.info(f"{self.name}服务恢复，关闭熔断")
+                self.state = self.CLOSED
+                self._probing = False
+                self._publish()
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"{self.name}服务连续失败{self._failures}次，熔断{self.reset_timeout:.0f}秒")
+                    REGISTRY.inc("backend_circuit_trips", backend=self.name)
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+                self._publish()
+
+    def _publish(self):
+        REGISTRY.set_gauge("backend_circuit_open", 0 if self.state == self.CLOSED else 1, backend=self.name)
+
+
+class BackendController:
+    """一个后端的并发控制 + 截止时间 + 重试 + 熔断"""
+
+    def __init__(
+        self,
+        name: str,
+        timeout: float = 120.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 10.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        **limiter_options,
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.limiter = AIMDLimiter(name, **limiter_options)
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+
+    def call(self, fn: Callable, *args, **kwargs):
+        """同步调用fn，截止时间为self.timeout（fn应以attempt_timeout()作为单次请求的超时）"""
+        active = _active_backends.get()
+        if self.name in active:
+            return fn(*args, **kwargs)
+        token = _active_backends.set(active | {self.name})
+        try:
+            return self._call(fn, *args, **kwargs)
+        finally:
+            _active_backends.reset(token)
+
+    async def acall(self, fn: Callable, *args, **kwargs):
+        """异步调用协程函数fn，等待名额时不阻塞事件循环"""
+        active = _active_backends.get()
+        if self.name in active:
+            return await fn(*args, **kwargs)
+        token = _active_backends.set(active | {self.name})
+        try:
+            return await self._acall(fn, *args, **kwargs)
+        finally:
+            _active_backends.reset(token)
+
+    def _call(self, fn: Callable, *args, **kwargs):
+        deadline = time.monotonic() + self.timeout
+        attempt = 0
+        while True:
+            self.breaker.allow()
+            try:
+                with self.limiter.slot(self._remaining(deadline)):
+                    token = _attempt_timeout.set(self._remaining(deadline))
+                    try:
+                        result = fn(*args, **kwargs)
+                    finally:
+                        _attempt_timeout.reset(token)
+            except Exception as e:
+                delay = self._on_error(e, attempt, deadline)
+                attempt += 1
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def _acall(self, fn: Callable, *args, **kwargs):
+        deadline = time.monotonic() + self.timeout
+        attempt = 0
+        while True:
+            self.breaker.allow()
+            priority = current_priority()
+            epoch = await self.limiter.acquire_async(self._remaining(deadline), priority)
+            start = time.monotonic()
+            overloaded = False
+            try:
+                result = await asyncio.wait_for(fn(*args, **kwargs), self._remaining(deadline))
+            except Exception as e:
+                overloaded = is_retryable(e)
+                self.limiter.release(epoch, time.monotonic() - start, overloaded, priority)
+                delay = self._on_error(e, attempt, deadline)
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self.limiter.release(epoch, time.monotonic() - start, overloaded, priority)
+            self.breaker.record_success()
+            return result
+
+    def _remaining(self, deadline: float) -> float:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"{self.name}请求超过{self.timeout:.0f}秒未完成")
+        return remaining
+
+    def _on_error(self, error: Exception, attempt: int, deadline: float) -> float:
+        """记录失败，可以重试时返回等待秒数，否则重新抛出"""
+        if isinstance(error, (CircuitOpenError, DeadlineExceeded)):
+            raise error
+        if not is_retryable(error):
+            # 请求本身的问题，不代表后端不可用
+            self.breaker.record_success()
+            raise error
+
+        self.breaker.record_failure()
+        REGISTRY.inc("backend_errors", backend=self.name, error=type(error).__name__)
+        if attempt >= self.max_retries:
+            raise error
+
+        # 全抖动退避，且不超过剩余时间
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        if delay >= deadline - time.monotonic():
+            raise error
+        REGISTRY.inc("backend_retries", backend=self.name)
+        logger.warning(f"{self.name}调用失败({type(error).__name__}: {error})，{delay:.2f}秒后第{attempt + 1}次重试")
+        return delay
+
+
+_controllers: Dict[str, BackendController] = {}
+_controllers_lock = threading.Lock()
+
+
+def get_controller(name: str, config: Dict[str, Any]) -> BackendController:
+    """
+    取进程内共享的后端控制器（首次调用时按配置创建）
+
+    Args:
+        name: 后端名，对应config["backend_control"]下的小节（llm / llm_small / embedding）
+        config: 全局配置
+    """
+    with _controllers_lock:
+        controller = _controllers.get(name)
+        if controller is None:
+            section = config.get("backend_control", {})
+            options = dict(section.get(name, {}))
+            controller = BackendController(
+                name,
+                timeout=config["env"]["ollama_timeout"],
+                failure_threshold=section.get("failure_threshold", 5),
+                reset_timeout=section.get("reset_timeout", 30.0),
+                **options,
+            )
+            _controllers[name] = controller
+        return controller
@@ -0,0 +1,352 @@
+"""检索质量 vs 延迟评估
+
+用岗位上保存的检索标注（PositionStore.set_retrieval_labels / label_from_hr_tags：岗位描述 → 相关简历及相关程度）
+回放检索，对比不同配置下的 recall@k、nDCG@k、MRR、查询延迟和索引大小：
+    - top_k：返回的简历数（也是送入LLM评估的数量）
+    - 节点粒度：full为每份简历一个node（线上做法，直接复用已有向量）；chunk:<token数>为按句切块，
+      切块需要调用嵌入服务重新向量化，检索时多取一些块再按简历去重
+    - 向量索引参数：Chroma的HNSW参数（space、M、construction_ef、search_ef），Chroma不支持向量量化，
+      索引大小和精度/速度的取舍通过这些参数调整
+每种(粒度, HNSW参数)在工作目录下建一个独立的Chroma库，查询走与线上相同的按岗位过滤的向量检索。
+线上向量库只读不写，可以在服务运行时执行。
+
+用法（在包的上级目录执行）:
+    python -m <包名>.bench.retrieval_eval --label-from-hr-tags
+    python -m <包名>.bench.retrieval_eval --top-k 5,10,20 --granularity full,chunk:512 --hnsw 'default;search_ef=100'
+"""
+
+import argparse
+import json
+import logging
+import math
+import shutil
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..config import get_config
+from ..data_db.database import DEFAULT_DB_PATH
+from ..data_db.position_store import PositionStore
+from ..index_tools import DEFAULT_VECTOR_DB_PATH, active_collection_name, directory_size, open_client
+from ..telemetry import span
+from .scenarios import Recorder, summarize
+
+logger = logging.getLogger(__name__)
+
+# 切块检索时多取的倍数（多个块属于同一份简历，去重后仍需凑满top_k）
+CHUNK_OVERFETCH = 4
+
+
+@dataclass
+class EvalQuery:
+    position_id: int
+    text: str
+    labels: Dict[str, int]  # 简历文件hash -> 相关程度
+    embedding: List[float] = None
+
+
+@dataclass
+class Corpus:
+    """某一粒度下的节点（id、文本、metadata、向量）"""
+    granularity: str
+    ids: List[str] = field(default_factory=list)
+    documents: List[str] = field(default_factory=list)
+    metadatas: List[Dict[str, Any]] = field(default_factory=list)
+    embeddings: List[List[float]] = field(default_factory=list)
+
+
+# ---------------- 指标 ----------------
+
+def recall_at_k(ranked: List[str], labels: Dict[str, int], k: int) -> float:
+    relevant = {doc for doc, grade in labels.items() if grade > 0}
+    if not relevant:
+        return 0.0
+    return len(relevant.intersection(ranked[:k])) / len(relevant)
+
+
+def ndcg_at_k(ranked: List[str], labels: Dict[str, int], k: int) -> float:
+    """分级相关的nDCG，增益为2^相关程度-1"""
+    dcg = sum((2 ** labels.get(doc, 0) - 1) / math.log2(i + 2) for i, doc in enumerate(ranked[:k]))
+    ideal = sorted((grade for grade in labels.values() if grade > 0), reverse=True)[:k]
+    idcg = sum((2 ** grade - 1) / math.log2(i + 2) for i, grade in enumerate(ideal))
+    return dcg / idcg if idcg else 0.0
+
+
+def reciprocal_rank(ranked: List[str], labels: Dict[str, int], k: int) -> float:
+    for i, doc in enumerate(ranked[:k]):
+        if labels.get(doc, 0) > 0:
+            return 1 / (i + 1)
+    return 0.0
+
+
+# ---------------- 配置 ----------------
+
+def parse_hnsw(spec: str) -> Dict[str, Any]:
+    """'default' 或 'M=32,search_ef=100' -> Chroma collection metadata"""
+    if spec == "default":
+        return {}
+    params = {}
+    for item in spec.split(","):
+        key, value = item.split("=", 1)
+        params[f"hnsw:{key.strip()}"] = value.strip() if key.strip() == "space" else int(value)
+    return params
+
+
+def chunk_size_of(granularity: str) -> Optional[int]:
+    """'full' -> None，'chunk:512' -> 512"""
+    if granularity == "full":
+        return None
+    kind, _, size = granularity.partition(":")
+    if kind != "chunk" or not size.isdigit():
+        raise ValueError(f"未知的节点粒度: {granularity}")
+    return int(size)
+
+
+# ---------------- 数据准备 ----------------
+
+def load_queries(positions: PositionStore, position_ids: List[int] = None) -> List[EvalQuery]:
+    """有标注的岗位，以岗位描述为查询"""
+    queries = []
+    for position_id in position_ids or positions.get_labelled_position_ids():
+        position = positions.get_by_id(position_id)
+        labels = positions.get_retrieval_labels(position_id)
+        if position is None or not any(grade > 0 for grade in labels.values()):
+            logger.warning(f"岗位{position_id}不存在或没有相关简历标注，跳过")
+            continue
+        queries.append(EvalQuery(position_id, position.description, labels))
+    return queries
+
+
+def load_full_corpus(collection, position_ids: List[int]) -> Corpus:
+    """从线上collection读出这些岗位的节点和已存向量（不重新嵌入）"""
+    corpus = Corpus("full")
+    for position_id in position_ids:
+        result = collection.get(where={"position_id": position_id}, include=["documents", "metadatas", "embeddings"])
+        for node_id, document, metadata, embedding in zip(
+            result["ids"], result["documents"], result["metadatas"], result["embeddings"]
+        ):
+            if not (metadata or {}).get("doc_key"):
+                continue
+            corpus.ids.append(node_id)
+            corpus.documents.append(document)
+            corpus.metadatas.append({"position_id": position_id, "doc_key": metadata["doc_key"]})
+            corpus.embeddings.append(list(embedding))
+    return corpus
+
+
+def chunk_corpus(full: Corpus, chunk_size: int, embed_model, batch_size: int = 64) -> Corpus:
+    """按句切块并重新向量化（经过嵌入服务的客户端流控）"""
+    from llama_index.core.node_parser import SentenceSplitter
+
+    splitter = SentenceSplitter(chunk_size=chunk_size, chunk_overlap=chunk_size // 8)
+    corpus = Corpus(f"chunk:{chunk_size}")
+    for node_id, document, metadata in zip(full.ids, full.documents, full.metadatas):
+        for i, chunk in enumerate(splitter.split_text(document)):
+            corpus.ids.append(f"{node_id}#{i}")
+            corpus.documents.append(chunk)
+            corpus.metadatas.append(dict(metadata))
+
+    with span("eval.embed_chunks", chunk_size=chunk_size) as s:
+        for start in range(0, len(corpus.documents), batch_size):
+            corpus.embeddings.extend(embed_model.get_text_embedding_batch(corpus.documents[start:start + batch_size]))
+        s.count("nodes", len(corpus.ids))
+    return corpus
+
+
+def build_collection(corpus: Corpus, path: Path, hnsw: Dict[str, Any], batch_size: int = 500):
+    """在独立目录下建评估用collection，返回(collection, 目录大小)"""
+    if path.exists():
+        shutil.rmtree(path)
+    client = open_client(path)
+    collection = client.create_collection("eval", metadata=hnsw or None)
+    batch_size = max(1, min(batch_size, getattr(client, "get_max_batch_size", lambda: batch_size)()))
+    for start in range(0, len(corpus.ids), batch_size):
+        end = start + batch_size
+        collection.add(
+            ids=corpus.ids[start:end],
+            documents=corpus.documents[start:end],
+            metadatas=corpus.metadatas[start:end],
+            embeddings=corpus.embeddings[start:end],
+        )
+    return collection, directory_size(path)
+
+
+# ---------------- 评估 ----------------
+
+def _ranked_docs(collection, query: EvalQuery, top_k: int, fetch: int) -> List[str]:
+    result = collection.query(
+        query_embeddings=[query.embedding],
+        n_results=fetch,
+        where={"position_id": query.position_id},
+        include=["metadatas"],
+    )
+    ranked = []
+    for metadata in result["metadatas"][0]:
+        doc = metadata["doc_key"]
+        if doc not in ranked:
+            ranked.append(doc)
+            if len(ranked) == top_k:
+                break
+    return ranked
+
+
+def evaluate(
+    collection,
+    corpus: Corpus,
+    queries: List[EvalQuery],
+    top_k: int,
+    repeats: int = 5,
+) -> Dict[str, Any]:
+    """一组配置下各岗位查询的平均指标和延迟分布"""
+    nodes_per_position: Dict[int, int] = {}
+    for metadata in corpus.metadatas:
+        nodes_per_position[metadata["position_id"]] = nodes_per_position.get(metadata["position_id"], 0) + 1
+    overfetch = 1 if corpus.granularity == "full" else CHUNK_OVERFETCH
+
+    recorder = Recorder()
+    totals = {"recall": 0.0, "ndcg": 0.0, "mrr": 0.0}
+    evaluated = 0
+    for query in queries:
+        available = nodes_per_position.get(query.position_id, 0)
+        if not available:
+            continue
+        fetch = min(top_k * overfetch, available)
+        ranked = None
+        for _ in range(repeats):
+            with recorder.measure():
+                ranked = _ranked_docs(collection, query, top_k, fetch)
+        if ranked is None:
+            continue
+        totals["recall"] += recall_at_k(ranked, query.labels, top_k)
+        totals["ndcg"] += ndcg_at_k(ranked, query.labels, top_k)
+        totals["mrr"] += reciprocal_rank(ranked, query.labels, top_k)
+        evaluated += 1
+
+    summary = summarize(recorder)
+    metrics = {name: round(total / evaluated, 4) if evaluated else 0.0 for name, total in totals.items()}
+    p50 = summary.get("latency_ms", {}).get("p50")
+    return {
+        "queries": evaluated,
+        **metrics,
+        "latency_ms": summary.get("latency_ms"),
+        "errors": summary.get("errors", 0),
+        "recall_per_ms": round(metrics["recall"] / p50, 4) if p50 else None,
+    }
+
+
+def run_eval(args) -> Dict[str, Any]:
+    from ..model_clients import build_embed_model
+
+    config = get_config()
+    positions = PositionStore(args.db_path)
+    if args.label_from_hr_tags:
+        for position in positions.get_all("all"):
+            added = positions.label_from_hr_tags(position.id)
+            if added:
+                logger.info(f"岗位{position.id}按HR标签新增{added}条检索标注")
+
+    position_ids = [int(p) for p in args.positions.split(",")] if args.positions else None
+    queries = load_queries(positions, position_ids)
+    if not queries:
+        raise SystemExit("没有可用的检索标注，先用PositionStore.set_retrieval_labels或--label-from-hr-tags标注")
+
+    base_name = args.collection or config["model"]["collection_name"]
+    source = open_client(args.vector_path).get_collection(active_collection_name(base_name, args.vector_path))
+    full = load_full_corpus(source, [q.position_id for q in queries])
+    indexed = {metadata["doc_key"] for metadata in full.metadatas}
+    missing = sum(1 for q in queries for doc, grade in q.labels.items() if grade > 0 and doc not in indexed)
+    if missing:
+        logger.warning(f"{missing}份标注为相关的简历不在向量库中，计入未召回")
+
+    embed_model = build_embed_model(config)
+    with span("eval.embed_queries"):
+        for query in queries:
+            query.embedding = embed_model.get_query_embedding(query.text)
+
+    top_ks = [int(k) for k in args.top_k.split(",")]
+    workdir = Path(args.workdir) / time.strftime("%Y%m%d-%H%M%S")
+    results = []
+    try:
+        for granularity in args.granularity.split(","):
+            chunk_size = chunk_size_of(granularity)
+            corpus = full if chunk_size is None else chunk_corpus(full, chunk_size, embed_model)
+            for hnsw_spec in args.hnsw.split(";"):
+                path = workdir / f"{granularity.replace(':', '')}__{hnsw_spec.replace(',', '_').replace('=', '')}"
+                collection, index_bytes = build_collection(corpus, path, parse_hnsw(hnsw_spec))
+                # 预热：第一次查询会加载HNSW索引
+                _ranked_docs(collection, queries[0], 1, 1)
+                for top_k in top_ks:
+                    row = {
+                        "granularity": granularity,
+                        "hnsw": hnsw_spec,
+                        "top_k": top_k,
+                        "nodes": len(corpus.ids),
+                        "index_bytes": index_bytes,
+                        **evaluate(collection, corpus, queries, top_k, args.repeats),
+                    }
+                    logger.info(
+                        f"{granularity} {hnsw_spec} top_k={top_k}: recall={row['recall']} ndcg={row['ndcg']} "
+                        f"mrr={row['mrr']} p50={row['latency_ms'] and row['latency_ms']['p50']}ms"
+                    )
+                    results.append(row)
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    eligible = [r for r in results if r["recall_per_ms"] is not None and r["recall"] >= args.min_recall]
+    best = max(eligible, key=lambda r: r["recall_per_ms"], default=None)
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "positions": [q.position_id for q in queries],
+        "relevant_labels": sum(1 for q in queries for grade in q.labels.values() if grade > 0),
+        "labels_missing_from_index": missing,
+        "source_collection_bytes": directory_size(args.vector_path),
+        "results": results,
+        "best_recall_per_ms": best,
+    }
+
+
+def _print_table(report: Dict[str, Any]) -> None:
+    header = f"{'粒度':<12}{'HNSW':<24}{'top_k':>6}{'recall':>8}{'nDCG':>8}{'MRR':>8}{'p50ms':>9}{'p95ms':>9}{'MB':>8}{'recall/ms':>11}"
+    print(header)
+    for r in sorted(report["results"], key=lambda r: -(r["recall_per_ms"] or 0)):
+        latency = r["latency_ms"] or {}
+        print(
+            f"{r['granularity']:<12}{r['hnsw']:<24}{r['top_k']:>6}{r['recall']:>8.3f}{r['ndcg']:>8.3f}{r['mrr']:>8.3f}"
+            f"{latency.get('p50', 0):>9.2f}{latency.get('p95', 0):>9.2f}{r['index_bytes'] / 1e6:>8.1f}"
+            f"{r['recall_per_ms'] or 0:>11.4f}"
+        )
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="检索质量与延迟评估")
+    parser.add_argument("--top-k", default="3,5,10,20")
+    parser.add_argument("--granularity", default="full", help="节点粒度，逗号分隔：full, chunk:<token数>")
+    parser.add_argument("--hnsw", default="default", help="HNSW参数，分号分隔多组，如 'default;search_ef=100;M=32,construction_ef=200'")
+    parser.add_argument("--repeats", type=int, default=5, help="每个查询重复次数（统计延迟）")
+    parser.add_argument("--min-recall", type=float, default=0.0, help="选最优配置时要求的最低recall")
+    parser.add_argument("--positions", default=None, help="只评估这些岗位id，逗号分隔")
+    parser.add_argument("--label-from-hr-tags", action="store_true", help="先按HR标签补充检索标注")
+    parser.add_argument("--db-path", default=DEFAULT_DB_PATH)
+    parser.add_argument("--vector-path", default=DEFAULT_VECTOR_DB_PATH)
+    parser.add_argument("--collection", default=None, help="逻辑collection名，默认取配置")
+    parser.add_argument("--workdir", default="./bench_data/retrieval_eval")
+    parser.add_argument("--keep", action="store_true", help="保留评估用的Chroma库")
+    parser.add_argument("--out", default=None, help="报告路径，默认 <workdir>/reports/<时间>.json")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    report = run_eval(args)
+    out = Path(args.out) if args.out else Path(args.workdir) / "reports" / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    _print_table(report)
+    if report["best_recall_per_ms"]:
+        best = report["best_recall_per_ms"]
+        print(f"\n每毫秒召回最高: {best['granularity']} / {best['hnsw']} / top_k={best['top_k']}")
+    logger.info(f"报告已写入: {out}")
+
+
+if __name__ == "__main__":
+    main()
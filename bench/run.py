@@ -0,0 +1,194 @@
+"""端到端压测入口
+
+生成（或复用）合成简历语料，启动本地vLLM/Xinference替身，逐个在独立子进程中运行场景，
+输出包含p50/p95/p99延迟、吞吐和峰值RSS的JSON报告；指定--compare时与之前的报告对比，
+有回退时以非0退出码结束，方便在提交之间发现性能回退。
+
+用法（在包的上级目录执行）:
+    python -m <包名>.bench.run --count 1000 --scenarios extraction,store_queries
+    python -m <包名>.bench.run --compare bench_data/reports/<旧报告>.json
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List
+
+from .resume_gen import FORMATS, generate_corpus
+from .scenarios import SCENARIOS, BenchContext, run_scenario
+from .stub_servers import EmbeddingStubServer, LatencyProfile, LLMStubServer
+
+logger = logging.getLogger(__name__)
+
+_REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=_REPO_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def _load_corpus(data_dir: Path, count: int, seed: int, formats: List[str]) -> List[Path]:
+    """语料按(数量, seed)缓存，重复运行不重新生成"""
+    corpus_dir = data_dir / f"corpus_{count}_{seed}"
+    files = sorted(p for p in corpus_dir.glob("*") if p.suffix.lstrip(".") in formats) if corpus_dir.exists() else []
+    if len(files) < count:
+        files = generate_corpus(str(corpus_dir), count, formats, seed)
+    return files
+
+
+def _run_isolated(name: str, ctx: BenchContext) -> Dict[str, Any]:
+    """每个场景一个新进程，峰值RSS互不影响"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(run_scenario, name, ctx).result()
+
+
+def run_benchmarks(args) -> Dict[str, Any]:
+    data_dir = Path(args.data_dir).resolve()
+    corpus = _load_corpus(data_dir, args.count, args.seed, args.formats.split(","))
+    run_dir = data_dir / "runs" / time.strftime("%Y%m%d-%H%M%S")
+
+    llm_profile = LatencyProfile(
+        base_latency=args.llm_base_latency,
+        decode_tokens_per_s=args.llm_decode_tps,
+        max_concurrency=args.llm_concurrency,
+    )
+    llm_small_profile = LatencyProfile(
+        base_latency=args.llm_base_latency,
+        decode_tokens_per_s=args.llm_small_decode_tps,
+        max_concurrency=args.llm_concurrency,
+    )
+    embedding_profile = LatencyProfile(
+        base_latency=args.embedding_base_latency,
+        max_concurrency=args.embedding_concurrency,
+    )
+
+    report = {
+        "commit": _git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": multiprocessing.cpu_count(),
+        },
+        "params": {
+            "count": args.count,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "formats": args.formats,
+            "llm_profile": vars(llm_profile),
+            "llm_small_profile": vars(llm_small_profile),
+            "embedding_profile": vars(embedding_profile),
+        },
+        "scenarios": {},
+    }
+
+    with LLMStubServer(profile=llm_profile) as llm, \
+            LLMStubServer(profile=llm_small_profile, model="Qwen3-8B") as llm_small, \
+            EmbeddingStubServer(profile=embedding_profile) as embedding:
+        for name in args.scenarios.split(","):
+            ctx = BenchContext(
+                workdir=run_dir / name,
+                corpus=corpus,
+                llm_url=llm.url,
+                llm_small_url=llm_small.url,
+                embedding_url=embedding.url,
+                count=args.count,
+                concurrency=args.concurrency,
+                seed=args.seed,
+                params={"top_k": args.top_k, "queries": args.queries},
+            )
+            logger.info(f"运行场景: {name}")
+            started = time.perf_counter()
+            try:
+                result = _run_isolated(name, ctx)
+            except Exception as e:
+                logger.error(f"场景{name}失败: {e}")
+                result = {"error": str(e)}
+            result["duration_s"] = round(time.perf_counter() - started, 3)
+            report["scenarios"][name] = result
+
+    return report
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.10) -> List[str]:
+    """p95延迟上升或吞吐下降超过tolerance的指标"""
+    regressions = []
+    for scenario, result in current.get("scenarios", {}).items():
+        old_metrics = baseline.get("scenarios", {}).get(scenario, {}).get("metrics", {})
+        for metric, summary in result.get("metrics", {}).items():
+            old = old_metrics.get(metric)
+            if not old or "latency_ms" not in old or "latency_ms" not in summary:
+                continue
+
+            old_p95, new_p95 = old["latency_ms"]["p95"], summary["latency_ms"]["p95"]
+            if old_p95 and new_p95 > old_p95 * (1 + tolerance):
+                regressions.append(f"{scenario}/{metric}: p95 {old_p95}ms -> {new_p95}ms")
+
+            old_tp, new_tp = old.get("throughput_per_s"), summary.get("throughput_per_s")
+            if old_tp and new_tp is not None and new_tp < old_tp * (1 - tolerance):
+                regressions.append(f"{scenario}/{metric}: 吞吐 {old_tp}/s -> {new_tp}/s")
+
+            if summary.get("errors", 0) > old.get("errors", 0):
+                regressions.append(f"{scenario}/{metric}: 失败数 {old.get('errors', 0)} -> {summary['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="简历筛选系统端到端压测")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--count", type=int, default=1000, help="语料简历数（1k~100k）")
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--llm-base-latency", type=float, default=0.2)
+    parser.add_argument("--llm-decode-tps", type=float, default=60.0)
+    parser.add_argument("--llm-small-decode-tps", type=float, default=180.0, help="提取用小模型的解码速度")
+    parser.add_argument("--llm-concurrency", type=int, default=16)
+    parser.add_argument("--embedding-base-latency", type=float, default=0.02)
+    parser.add_argument("--embedding-concurrency", type=int, default=32)
+    parser.add_argument("--data-dir", default="./bench_data")
+    parser.add_argument("--out", default=None, help="报告路径，默认 <data-dir>/reports/<时间>-<commit>.json")
+    parser.add_argument("--compare", default=None, help="用于对比的基线报告")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"未知场景: {', '.join(sorted(unknown))}")
+
+    report = run_benchmarks(args)
+    out = Path(args.out) if args.out else (
+        Path(args.data_dir) / "reports" / f"{time.strftime('%Y%m%d-%H%M%S')}-{report['commit']}.json"
+    )
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    logger.info(f"报告已写入: {out}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare_reports(baseline, report, args.tolerance)
+        for line in regressions:
+            logger.warning(f"性能回退: {line}")
+        if regressions:
+            sys.exit(1)
+        logger.info("与基线相比无回退")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,428 @@
+"""压测场景
+
+每个场景接收BenchContext，返回 {指标名: Recorder}。场景在独立子进程中运行
+（见run.py），工作目录切换到ctx.workdir，向量库和SQLite都落在该目录下，互不干扰。
+"""
+
+import logging
+import math
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+_QUERIES = [
+    "5年以上AI产品经验，主导过RAG项目落地",
+    "熟悉制造业MES系统，有智能制造行业背景",
+    "具备大模型应用和向量数据库经验的产品经理",
+    "推荐系统算法工程师，熟悉TensorFlow",
+    "有医疗AI产品商业化经验",
+    "B端产品经理，熟悉ERP实施和需求分析",
+]
+
+_JOB_DESCRIPTION = """岗位：AI产品经理（智能制造方向）
+岗位职责：
+1. 负责基于大模型和RAG技术的工业知识库产品规划与落地；
+2. 深入产线一线挖掘需求，输出PRD并推动研发交付；
+任职要求：
+1. 本科及以上学历，5年以上产品经验，其中2年以上AI产品经验；
+2. 熟悉LangChain/LlamaIndex、向量数据库等技术；
+3. 有制造业MES/ERP背景者优先。
+"""
+
+
+@dataclass
+class BenchContext:
+    workdir: Path
+    corpus: List[Path]
+    llm_url: str
+    embedding_url: str
+    llm_small_url: str = None
+    count: int = 100
+    concurrency: int = 8
+    seed: int = 42
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+class Recorder:
+    """记录一组操作的耗时和失败数"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.started = None
+        self.finished = None
+
+    @contextmanager
+    def measure(self):
+        start = time.perf_counter()
+        if self.started is None:
+            self.started = start
+        try:
+            yield
+        except Exception as e:
+            self.errors += 1
+            logger.debug(f"操作失败: {e}")
+        finally:
+            end = time.perf_counter()
+            self.latencies.append(end - start)
+            self.finished = end if self.finished is None else max(self.finished, end)
+
+    def run(self, fn: Callable, items: Iterable, concurrency: int = 1):
+        """对items逐个执行fn并计时，fn返回False视为失败"""
+        def _one(item):
+            with self.measure():
+                if fn(item) is False:
+                    raise RuntimeError("返回失败")
+
+        items = list(items)
+        if concurrency <= 1:
+            for item in items:
+                _one(item)
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(_one, items))
+        return self
+
+
+def _config(ctx: BenchContext) -> Dict[str, Any]:
+    from ..config import get_config
+
+    config = get_config()
+    config["vllm"]["vllm_api"] = f"{ctx.llm_url}/v1"
+    config["vllm_small"]["enabled"] = True
+    config["vllm_small"]["vllm_api"] = f"{ctx.llm_small_url or ctx.llm_url}/v1"
+    config["embedding"]["base_url"] = ctx.embedding_url
+    config["model"]["collection_name"] = "bench_collection"
+    return config
+
+
+def _engine(ctx: BenchContext):
+    from ..rag_engine import RAGEngine
+    return RAGEngine(_config(ctx))
+
+
+def _sample(ctx: BenchContext, n: int = None) -> List[Path]:
+    n = min(n or ctx.count, len(ctx.corpus))
+    return random.Random(ctx.seed).sample(ctx.corpus, n)
+
+
+# ---------------- 场景 ----------------
+
+def scenario_extraction(ctx: BenchContext) -> Dict[str, Recorder]:
+    """extract_text_from_file：PDF/DOCX/TXT文本提取"""
+    from ..doc_ana.doc_ana import extract_text_from_file
+
+    by_format: Dict[str, List[Path]] = {}
+    for path in _sample(ctx):
+        by_format.setdefault(path.suffix.lstrip("."), []).append(path)
+
+    return {
+        f"extract.{fmt}": Recorder().run(lambda p: extract_text_from_file(str(p))[1], paths)
+        for fmt, paths in sorted(by_format.items())
+    }
+
+
+def scenario_ingestion(ctx: BenchContext) -> Dict[str, Recorder]:
+    """ingest_resume：读取 → 建node → 嵌入 → 写入向量库"""
+    engine = _engine(ctx)
+    recorder = Recorder().run(
+        lambda p: engine.ingest_resume(str(p), position_id=1),
+        _sample(ctx),
+        concurrency=ctx.concurrency
+    )
+    return {"ingest": recorder}
+
+
+def scenario_retrieval(ctx: BenchContext) -> Dict[str, Recorder]:
+    """retrieve：按岗位过滤的向量检索（先摄取语料，摄取不计入结果）"""
+    engine = _engine(ctx)
+    for path in _sample(ctx):
+        engine.ingest_resume(str(path), position_id=1)
+
+    rng = random.Random(ctx.seed)
+    queries = [rng.choice(_QUERIES) for _ in range(ctx.params.get("queries", 200))]
+    top_k = ctx.params.get("top_k", 5)
+    return {
+        "retrieve": Recorder().run(
+            lambda q: engine.retrieve(q, position_id=1, top_k=top_k),
+            queries,
+            concurrency=ctx.concurrency
+        )
+    }
+
+
+def scenario_llm_screening(ctx: BenchContext) -> Dict[str, Recorder]:
+    """
+    analyze_resume：对照岗位描述的LLM分析（文本提取不计入结果）
+
+    analyze.single为大模型一次完成，analyze.two_tier为小模型提取+大模型评估，
+    各档位的耗时和token用量见报告telemetry中的llm.complete / llm.extract / llm.evaluate。
+    """
+    from ..doc_ana.doc_ana import extract_text_from_file
+
+    engine = _engine(ctx)
+    small_llm = engine.small_llm
+    texts = [extract_text_from_file(str(p))[0] for p in _sample(ctx)]
+
+    def _analyze(text):
+        return engine.analyze_resume(text, _JOB_DESCRIPTION).analysis_success
+
+    engine.small_llm = None
+    recorders = {"analyze.single": Recorder().run(_analyze, texts, concurrency=ctx.concurrency)}
+    if small_llm is not None:
+        engine.small_llm = small_llm
+        recorders["analyze.two_tier"] = Recorder().run(_analyze, texts, concurrency=ctx.concurrency)
+    return recorders
+
+
+def scenario_llm_priority(ctx: BenchContext) -> Dict[str, Recorder]:
+    """
+    批量筛选压满LLM时，交互请求（单个候选人重新分析）的等待和耗时
+
+    批量按BULK优先级以4倍并发持续分析，同时逐个发出INTERACTIVE的评估请求；
+    各优先级的排队时间见报告telemetry中的queue.llm.bulk / queue.llm.interactive。
+    """
+    import threading
+    from ..backend_control import BULK, INTERACTIVE, request_priority
+    from ..doc_ana.doc_ana import extract_text_from_file
+
+    engine = _engine(ctx)
+    texts = [extract_text_from_file(str(p))[0] for p in _sample(ctx)]
+    profile = {"total_years_experience": 5, "skills": ["Python", "RAG"], "work_experience": [], "project_experience": []}
+    interactive_calls = ctx.params.get("interactive_calls", 20)
+
+    def _bulk(text):
+        with request_priority(BULK):
+            return engine.analyze_resume(text, _JOB_DESCRIPTION).analysis_success
+
+    def _interactive(_):
+        with request_priority(INTERACTIVE):
+            return engine.evaluate_profile(profile, _JOB_DESCRIPTION).analysis_success
+
+    bulk = Recorder()
+    worker = threading.Thread(target=bulk.run, args=(_bulk, texts, ctx.concurrency * 4))
+    worker.start()
+    interactive = Recorder()
+    try:
+        # 等批量请求排满队列后再发交互请求
+        time.sleep(1.0)
+        interactive.run(_interactive, range(interactive_calls))
+    finally:
+        worker.join()
+    return {"priority.interactive": interactive, "priority.bulk": bulk}
+
+
+def scenario_store_queries(ctx: BenchContext) -> Dict[str, Recorder]:
+    """CandidateStore/NoteStore/PositionStore常用读写"""
+    from ..data_db.candidate_store import CandidateStore
+    from ..data_db.candinote_store import NoteStore
+    from ..data_db.position_store import PositionStore
+    from ..data_model.candidate import CandidateProfile
+    from ..data_model.position import Position
+
+    positions = PositionStore()
+    candidates = CandidateStore()
+    notes = NoteStore()
+    rng = random.Random(ctx.seed)
+
+    position_count = ctx.params.get("positions", 20)
+    position_ids = [
+        positions.create(Position(name=f"岗位{i}", description=_JOB_DESCRIPTION))
+        for i in range(position_count)
+    ]
+
+    levels = ["强烈推荐", "推荐", "可考虑", "不推荐"]
+    candidate_ids = []
+
+    def _save(i):
+        profile = CandidateProfile(
+            name=f"候选人{i}",
+            position_id=rng.choice(position_ids),
+            file_name=f"{i}.pdf",
+            recommendation_level=rng.choice(levels),
+            ai_strengths=["经验匹配", "项目丰富"],
+        )
+        candidate_ids.append(candidates.save(profile))
+
+    recorders = {"store.save": Recorder().run(_save, range(ctx.count))}
+    recorders["store.update_hr_tag"] = Recorder().run(
+        lambda cid: candidates.update_hr_tag(cid, rng.choice(["star", "interview", "pending", "rejected"])),
+        rng.sample(candidate_ids, min(len(candidate_ids), 500))
+    )
+    recorders["store.add_note"] = Recorder().run(
+        lambda cid: notes.add_note(cid, "电话沟通，意向较强"),
+        rng.sample(candidate_ids, min(len(candidate_ids), 500))
+    )
+    recorders["store.get_by_position"] = Recorder().run(
+        lambda pid: candidates.get_by_position(pid, include_notes=True),
+        position_ids,
+        concurrency=ctx.concurrency
+    )
+    recorders["store.get_stats_for_positions"] = Recorder().run(
+        lambda _: candidates.get_stats_for_positions(position_ids),
+        range(50)
+    )
+    recorders["store.get_all_with_stats"] = Recorder().run(
+        lambda _: positions.get_all_with_stats(),
+        range(50)
+    )
+    return recorders
+
+
+def scenario_prescreen(ctx: BenchContext) -> Dict[str, Recorder]:
+    """规则预筛：关键词/学历/年限（纯文本，不调用模型）"""
+    from ..data_model.position import PrescreenRules
+    from ..doc_ana.prescreen import Prescreener
+    from .resume_gen import generate_resume
+
+    rng = random.Random(ctx.seed)
+    texts = ["\n".join(generate_resume(rng)[1]) for _ in range(ctx.count)]
+    prescreener = Prescreener(PrescreenRules(
+        must_have=["Python|py", "RAG", "向量数据库", "大模型", "SQL"],
+        min_term_ratio=0.6,
+        min_degree="本科",
+        min_years=3,
+    ))
+
+    def _screen(text):
+        prescreener.screen(text)  # 未通过预筛不算失败
+
+    return {"prescreen.screen": Recorder().run(_screen, texts)}
+
+
+def scenario_near_dup(ctx: BenchContext) -> Dict[str, Recorder]:
+    """近似重复检测：签名计算，以及在已登记count份简历的索引中查询（每5份查询有1份是改过几行的重投）"""
+    from ..data_db.fingerprint_store import FingerprintStore
+    from ..doc_ana.near_dup import NearDupIndex, minhash
+    from .resume_gen import generate_resume
+
+    rng = random.Random(ctx.seed)
+    texts = ["\n".join(generate_resume(rng)[1]) for _ in range(ctx.count)]
+    queries = []
+    for i in range(min(ctx.count, 1000)):
+        if i % 5 == 0:
+            lines = texts[rng.randrange(len(texts))].split("\n")
+            lines[rng.randrange(len(lines))] += "，负责团队管理"
+            queries.append("\n".join(lines))
+        else:
+            queries.append("\n".join(generate_resume(rng)[1]))
+
+    recorders = {"near_dup.minhash": Recorder()}
+    signatures = []
+    for text in texts:
+        with recorders["near_dup.minhash"].measure():
+            signatures.append(minhash(text))
+
+    index = NearDupIndex(FingerprintStore("./near_dup.db"))
+    for i, signature in enumerate(signatures):
+        index.add(f"corpus-{i}", signature)
+    query_signatures = [minhash(text) for text in queries]
+    recorders["near_dup.find"] = Recorder().run(index.find, query_signatures)
+    return recorders
+
+
+def scenario_client_overhead(ctx: BenchContext) -> Dict[str, Recorder]:
+    """
+    单次模型调用的客户端开销：每次新建连接 vs 进程级连接池
+
+    在子进程内另起零延迟的替身服务，测到的耗时基本都是客户端和连接本身的开销。
+    """
+    import httpx
+    from ..http_pool import get_http_client
+    from ..model_clients import build_embed_model
+    from .stub_servers import EmbeddingStubServer, LatencyProfile, LLMStubServer
+
+    profile = LatencyProfile(base_latency=0.0, prefill_tokens_per_s=1e9, decode_tokens_per_s=1e9, max_concurrency=256)
+    calls = ctx.params.get("overhead_calls", 500)
+    recorders = {}
+    with LLMStubServer(profile=profile, completion_tokens=1) as llm, EmbeddingStubServer(profile=profile) as embedding:
+        config = _config(ctx)
+        config["vllm"]["vllm_api"] = f"{llm.url}/v1"
+        config["embedding"]["base_url"] = embedding.url
+        targets = {
+            "embedding": (f"{embedding.url}/v1/embeddings", {"model": "bge-m3", "input": ["Python 产品经理"]}),
+            "llm": (f"{llm.url}/v1/completions", {"model": "Qwen3-32B", "prompt": "你好", "max_tokens": 1}),
+        }
+
+        for name, (url, body) in targets.items():
+            def _new_connection(_):
+                with httpx.Client() as client:
+                    client.post(url, json=body).raise_for_status()
+
+            def _pooled(_):
+                get_http_client(url, config).post(url, json=body).raise_for_status()
+
+            recorders[f"overhead.{name}.new_connection"] = Recorder().run(_new_connection, range(calls), ctx.concurrency)
+            recorders[f"overhead.{name}.pooled"] = Recorder().run(_pooled, range(calls), ctx.concurrency)
+
+        # 完整客户端路径：流控 + 连接池 + 请求/响应解析
+        embed_model = build_embed_model(config)
+        recorders["overhead.embedding.model_client"] = Recorder().run(
+            lambda _: embed_model.get_text_embedding("Python 产品经理"), range(calls), ctx.concurrency
+        )
+    return recorders
+
+
+SCENARIOS: Dict[str, Callable[[BenchContext], Dict[str, Recorder]]] = {
+    "extraction": scenario_extraction,
+    "ingestion": scenario_ingestion,
+    "retrieval": scenario_retrieval,
+    "llm_screening": scenario_llm_screening,
+    "llm_priority": scenario_llm_priority,
+    "store_queries": scenario_store_queries,
+    "prescreen": scenario_prescreen,
+    "near_dup": scenario_near_dup,
+    "client_overhead": scenario_client_overhead,
+}
+
+
+def summarize(recorder: Recorder) -> Dict[str, Any]:
+    """p50/p95/p99延迟（毫秒）与吞吐"""
+    latencies = sorted(recorder.latencies)
+    count = len(latencies)
+    if not count:
+        return {"count": 0, "errors": recorder.errors}
+
+    def _pct(p: float) -> float:
+        # nearest-rank
+        return round(latencies[min(count - 1, max(0, math.ceil(p * count) - 1))] * 1000, 3)
+
+    wall = (recorder.finished - recorder.started) if recorder.started is not None else 0.0
+    return {
+        "count": count,
+        "errors": recorder.errors,
+        "latency_ms": {
+            "p50": _pct(0.50),
+            "p95": _pct(0.95),
+            "p99": _pct(0.99),
+            "mean": round(sum(latencies) / count * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3),
+        },
+        "wall_s": round(wall, 3),
+        "throughput_per_s": round(count / wall, 3) if wall > 0 else None,
+    }
+
+
+def run_scenario(name: str, ctx: BenchContext) -> Dict[str, Any]:
+    """在当前进程执行场景（run.py会把它放到独立子进程里调用）"""
+    import resource
+    from ..telemetry import REGISTRY
+
+    ctx.workdir.mkdir(parents=True, exist_ok=True)
+    os.chdir(ctx.workdir)
+    recorders = SCENARIOS[name](ctx)
+
+    # Linux下ru_maxrss单位为KB
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {
+        "metrics": {metric: summarize(recorder) for metric, recorder in recorders.items()},
+        "peak_rss_mb": round(peak_rss_mb, 1),
+        "telemetry": REGISTRY.snapshot(),
+    }
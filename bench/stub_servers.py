@@ -0,0 +1,273 @@
+"""本地模型服务替身
+
+    - LLMStubServer: OpenAI兼容的vLLM接口（/v1/completions, /v1/chat/completions, /v1/models）
+    - EmbeddingStubServer: Xinference嵌入接口（/v1/models/{uid}, /v1/embeddings）
+
+延迟按 基础延迟 + prompt_tokens/预填充速度 + completion_tokens/解码速度 模拟，
+max_concurrency模拟GPU上同时处理的请求数，超出的请求在服务端排队。
+返回内容确定（同样输入同样输出），便于不同提交之间对比。
+
+用法:
+    python -m <包名>.bench.stub_servers --llm-port 8207 --embedding-port 9997
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import math
+import re
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LatencyProfile:
+    """服务端延迟模型"""
+    base_latency: float = 0.05        # 每个请求固定开销（秒）
+    prefill_tokens_per_s: float = 8000.0
+    decode_tokens_per_s: float = 60.0
+    max_concurrency: int = 16         # 同时处理的请求数（模拟GPU批大小）
+
+    def delay(self, prompt_tokens: int, completion_tokens: int = 0) -> float:
+        delay = self.base_latency + prompt_tokens / self.prefill_tokens_per_s
+        if completion_tokens:
+            delay += completion_tokens / self.decode_tokens_per_s
+        return delay
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算token数：中文约1字1token，其余约4字符1token"""
+    cjk = len(re.findall(r"[一-鿿]", text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+_STUB_ANALYSIS = {
+    "recommendation_level": "推荐",
+    "key_strengths": ["具备相关行业项目经验", "有从0到1的产品落地经历", "技术背景扎实"],
+    "key_concerns": ["团队管理经验偏少"],
+    "one_sentence_summary": "经验匹配度较高的候选人，需关注管理经验",
+    "total_years_experience": 5,
+    "work_experience": [
+        {"company": "某科技公司", "position": "产品经理", "start_date": "2020-06", "end_date": "至今",
+         "description": "负责AI产品规划与落地"}
+    ],
+    "project_experience": [
+        {"name": "企业知识库RAG系统", "role": "产品负责人", "description": "主导RAG产品从0到1"}
+    ],
+}
+
+
+class _StubServer:
+    """在后台线程运行的HTTP替身服务"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, profile: Optional[LatencyProfile] = None):
+        self.profile = profile or LatencyProfile()
+        self._slots = threading.BoundedSemaphore(self.profile.max_concurrency)
+        self.requests = 0
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # 支持keep-alive
+            # 响应头和响应体合并成一次写入并关闭Nagle，否则keep-alive连接上
+            # 会碰到Nagle与延迟ACK叠加的~40ms停顿，测出的是替身服务的问题
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def log_message(self, fmt, *args):
+                pass
+
+            def _body(self) -> Dict[str, Any]:
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+            def _send(self, status: int, payload: Any):
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                status, payload = stub.handle("GET", self.path, {})
+                self._send(status, payload)
+
+            def do_POST(self):
+                status, payload = stub.handle("POST", self.path, self._body())
+                self._send(status, payload)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "_StubServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _simulate(self, prompt_tokens: int, completion_tokens: int = 0):
+        with self._lock:
+            self.requests += 1
+        with self._slots:
+            time.sleep(self.profile.delay(prompt_tokens, completion_tokens))
+
+    def handle(self, method: str, path: str, body: Dict[str, Any]):
+        raise NotImplementedError
+
+
+class LLMStubServer(_StubServer):
+    """OpenAI兼容的vLLM替身，返回固定的简历分析JSON"""
+
+    def __init__(self, *args, model: str = "Qwen3-32B", completion_tokens: int = 600, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.model = model
+        self.completion_tokens = completion_tokens
+
+    def handle(self, method: str, path: str, body: Dict[str, Any]):
+        if method == "GET" and path.rstrip("/").endswith("/models"):
+            return 200, {"object": "list", "data": [{"id": self.model, "object": "model"}]}
+
+        if method == "POST" and path.endswith("/chat/completions"):
+            prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+            text, usage = self._complete(prompt, body)
+            return 200, {
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+                "model": self.model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        if method == "POST" and path.endswith("/completions"):
+            prompt = body.get("prompt", "")
+            prompt = "\n".join(prompt) if isinstance(prompt, list) else str(prompt)
+            text, usage = self._complete(prompt, body)
+            return 200, {
+                "id": "cmpl-stub", "object": "text_completion", "created": int(time.time()),
+                "model": self.model,
+                "choices": [{"index": 0, "text": text, "finish_reason": "stop", "logprobs": None}],
+                "usage": usage,
+            }
+
+        return 404, {"error": f"unknown endpoint {method} {path}"}
+
+    def _complete(self, prompt: str, body: Dict[str, Any]):
+        prompt_tokens = estimate_tokens(prompt)
+        completion_tokens = min(self.completion_tokens, int(body.get("max_tokens") or self.completion_tokens))
+        if "# 候选人档案" in prompt:
+            # 两级模型的评估调用只输出评价字段，约为完整分析输出的1/4
+            completion_tokens //= 4
+        self._simulate(prompt_tokens, completion_tokens)
+        text = json.dumps(_STUB_ANALYSIS, ensure_ascii=False)
+        return text, {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+
+class EmbeddingStubServer(_StubServer):
+    """Xinference嵌入替身，向量由文本hash确定性生成"""
+
+    def __init__(self, *args, model_uid: str = "bge-m3", dimensions: int = 1024, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.model_uid = model_uid
+        self.dimensions = dimensions
+
+    def handle(self, method: str, path: str, body: Dict[str, Any]):
+        path = path.rstrip("/")
+        if method == "GET" and path == "/v1/cluster/auth":
+            return 200, False
+        if method == "GET" and path == "/v1/models":
+            return 200, {"object": "list", "data": [self._model_desc()]}
+        if method == "GET" and path.startswith("/v1/models/"):
+            return 200, self._model_desc()
+
+        if method == "POST" and path.endswith("/embeddings"):
+            inputs = body.get("input", [])
+            inputs = [inputs] if isinstance(inputs, str) else list(inputs)
+            prompt_tokens = sum(estimate_tokens(text) for text in inputs)
+            self._simulate(prompt_tokens)
+            return 200, {
+                "object": "list",
+                "model": self.model_uid,
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": self.embed(text)}
+                    for i, text in enumerate(inputs)
+                ],
+                "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+            }
+
+        return 404, {"error": f"unknown endpoint {method} {path}"}
+
+    def _model_desc(self) -> Dict[str, Any]:
+        return {
+            "id": self.model_uid, "model_uid": self.model_uid, "model_name": self.model_uid,
+            "model_type": "embedding", "dimensions": self.dimensions, "replica": 1,
+        }
+
+    def embed(self, text: str) -> List[float]:
+        """按字符二元组做hash投影，相近文本的向量也相近（检索结果有意义）"""
+        vector = [0.0] * self.dimensions
+        for i in range(max(len(text) - 1, 1)):
+            digest = hashlib.blake2b(text[i:i + 2].encode("utf-8"), digest_size=8).digest()
+            index, sign = struct.unpack("<IxxxB", digest[:8])
+            vector[index % self.dimensions] += 1.0 if sign & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动本地vLLM/Xinference替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--llm-port", type=int, default=8207)
+    parser.add_argument("--embedding-port", type=int, default=9997)
+    parser.add_argument("--llm-base-latency", type=float, default=0.2)
+    parser.add_argument("--llm-decode-tps", type=float, default=60.0)
+    parser.add_argument("--llm-concurrency", type=int, default=16)
+    parser.add_argument("--embedding-base-latency", type=float, default=0.02)
+    parser.add_argument("--embedding-concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    llm = LLMStubServer(args.host, args.llm_port, LatencyProfile(
+        base_latency=args.llm_base_latency, decode_tokens_per_s=args.llm_decode_tps,
+        max_concurrency=args.llm_concurrency,
+    )).start()
+    embedding = EmbeddingStubServer(args.host, args.embedding_port, LatencyProfile(
+        base_latency=args.embedding_base_latency, max_concurrency=args.embedding_concurrency,
+    )).start()
+    logger.info(f"vLLM替身: {llm.url}/v1  Xinference替身: {embedding.url}")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        llm.stop()
+        embedding.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -17,10 +17,95 @@ def get_config():
         "vllm":{
             "vllm_model":"Qwen3-32B",
             "vllm_api":"http://192.168.2.120:8207/v1",
-            "vllm_key":"dI.=>.TU?E5l>Ac8,Zz4"
+            "vllm_key":"dI.=>.TU?E5l>Ac8,Zz4",
+            # 请求体中带上priority（交互0、批量10），需vLLM以--scheduling-policy priority启动，
+            # 多个进程（界面、各worker）共用同一个vLLM时由服务端让交互请求先调度
+            "priority_scheduling": False
+        },
+        "vllm_small":{
+            # 两级模型：小模型负责简历信息提取，vllm中的大模型只做评估；关闭时由大模型一次完成
+            # 部署了小模型服务后再开启；未填写的项（vllm_key、priority_scheduling等）沿用vllm小节
+            "enabled": False,
+            "vllm_model":"Qwen3-8B",
+            "vllm_api":"http://192.168.2.120:8208/v1"
         },
         "env": {
             "ollama_host": "https://api.deepseek.com",  # Ollama服务地址
             "ollama_timeout": 120.0  # Ollama请求超时时间（秒）
+        },
+        "backend_control": {
+            # 模型服务的客户端流控（AIMD并发、重试、熔断），请求截止时间取env.ollama_timeout
+            "llm": {
+                "initial": 4,  # 初始并发上限
+                "min_limit": 1,
+                "max_limit": 32,
+                "latency_target": 60.0,  # 单次调用超过该秒数视为过载，降低并发
+                "reserved_share": 0.25,  # 为交互请求保留的并发比例，批量筛选最多占用其余部分
+                "max_retries": 3
+            },
+            "llm_small": {
+                "initial": 8,
+                "min_limit": 1,
+                "max_limit": 64,
+                "latency_target": 20.0,
+                "reserved_share": 0.25,
+                "max_retries": 3
+            },
+            "embedding": {
+                "initial": 8,
+                "min_limit": 1,
+                "max_limit": 64,
+                "latency_target": 2.0,
+                "max_retries": 3
+            },
+            "failure_threshold": 5,  # 连续失败多少次后熔断
+            "reset_timeout": 30.0  # 熔断后多少秒放行探测请求
+        },
+        "http_pool": {
+            # 模型服务共用的HTTP连接池（每个服务一个）
+            "http2": True,  # 需要安装h2，未安装时自动使用HTTP/1.1
+            "max_connections": 64,
+            "max_keepalive_connections": 32,
+            "keepalive_expiry": 60.0,
+            "connect_timeout": 5.0
+        },
+        "prescreen": {
+            # LLM分析前按岗位规则预筛（阈值在各岗位的prescreen_rules中设置）
+            "enabled": True
+        },
+        "near_dup": {
+            # 近似重复简历检测（MinHash LSH，见doc_ana.near_dup）
+            "enabled": True,
+            "min_similarity": 0.8,  # 估计的Jaccard相似度（字符3-gram）达到该值即视为近似重复
+            "reuse_analysis": True  # 近似重复时复用已有向量和人员档案；False为只标记给HR
+        },
+        "ocr": {
+            # 扫描件/纯图片PDF的OCR兜底（需安装pypdfium2、pytesseract和tesseract的chi_sim语言包）
+            "enabled": True,
+            "lang": "chi_sim+eng",
+            "max_pages": 10,  # 每个文件最多识别的页数
+            "time_budget": 90.0,  # 每个文件的识别时间上限（秒）
+            "workers": None,  # 并行识别的页数，None为CPU核数；多个worker进程时可调小
+            "dpi": 200
+        },
+        "compaction": {
+            # 简历送入LLM前的压缩（去页眉页脚/联系方式/低价值小节，按小节优先级控制长度）
+            "enabled": True,
+            "token_budget": 4000,  # 压缩后简历的token上限（估算值），None为不限制
+            "drop_sections": ["hobbies", "portfolio"]  # 直接丢弃的小节类型，见doc_ana.compaction
+        },
+        "deployment": {
+            # local：界面进程内直接打开向量库和SQLite（只运行一个界面进程时）；
+            # service：由数据服务进程（python -m <包名>.service.server）独占，多个界面/API进程通过HTTP访问
+            "mode": "local",
+            "service_url": "http://127.0.0.1:8765",  # service模式下客户端访问的地址
+            "host": "127.0.0.1",  # 数据服务监听地址（只监听本机）
+            "port": 8765,
+            "timeout": 300.0,  # 客户端单次请求超时（秒），需覆盖LLM评估的耗时
+            "rpc_workers": 8  # 批量检索/摄取并行执行的线程数
+        },
+        "telemetry": {
+            "log_spans": True,  # 每个阶段结束输出一行JSON日志（DEBUG级别，异常为WARNING）
+            "metrics_port": 9464  # Prometheus /metrics端口，0为不启动
         }
     }
@@ -0,0 +1,278 @@
+"""存储层异步接口
+
+供asyncio流水线（批量筛选、摄取）使用，避免同步sqlite3调用阻塞事件循环：
+    - 写操作进入专用写线程的队列，写线程把积压的写操作合并到同一个事务中提交（group commit）
+    - 读操作在读线程池中执行（WAL模式下读写互不阻塞）
+同步接口（CandidateStore/NoteStore/PositionStore）保持不变，Streamlit页面继续直接使用。
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .database import DEFAULT_DB_PATH, connect, init_database
+from .candidate_store import CandidateStore
+from .candinote_store import NoteStore
+from .position_store import PositionStore
+from ..data_model.candidate import CandidateProfile
+from ..data_model.ana_model import ResumeAnalysis
+from ..data_model.position import Position
+from ..telemetry import call_labels, span
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class _WriteRequest:
+    __slots__ = ("fn", "args", "kwargs", "future")
+
+    def __init__(self, fn: Callable, args: tuple, kwargs: dict):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+
+
+class WriteBatcher:
+    """
+    单写线程 + 批量提交队列
+
+    写线程持有唯一的写连接，每次取出队列中已积压的请求（最多max_batch个，
+    最多再等待max_delay秒凑批），在一个事务内逐个执行后统一COMMIT。
+    每个请求包在SAVEPOINT里，单个请求失败只回滚它自己，不影响同批其他请求。
+    请求的结果在事务提交之后才返回给调用方。
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, max_batch: int = 256, max_delay: float = 0.005):
+        self.db_path = Path(db_path)
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        init_database(self.db_path)
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="store-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """提交写操作，fn的第一个参数是写连接"""
+        if self._closed:
+            raise RuntimeError("WriteBatcher已关闭")
+        request = _WriteRequest(fn, args, kwargs)
+        self._queue.put(request)
+        return request.future
+
+    def close(self):
+        """处理完队列中剩余的写操作后停止写线程"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        conn = connect(self.db_path)
+        conn.isolation_level = None  # 手动管理事务
+        try:
+            stopping = False
+            while not stopping:
+                first = self._queue.get()
+                if first is _STOP:
+                    break
+
+                batch = [first]
+                deadline = time.monotonic() + self.max_delay
+                while len(batch) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+
+                self._commit_batch(conn, batch)
+        finally:
+            conn.close()
+
+    def _commit_batch(self, conn, batch: List[_WriteRequest]):
+        outcomes = []
+        try:
+            with span("store.write_batch") as batch_span:
+                batch_span.count("requests", len(batch))
+                conn.execute("BEGIN IMMEDIATE")
+                for request in batch:
+                    conn.execute("SAVEPOINT write_request")
+                    try:
+                        position, file_type = call_labels(request.fn, (conn, *request.args), request.kwargs)
+                        with span(f"store.write.{request.fn.__name__.lstrip('_')}", position=position, file_type=file_type):
+                            result = request.fn(conn, *request.args, **request.kwargs)
+                        conn.execute("RELEASE write_request")
+                        outcomes.append((request, result, None))
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO write_request")
+                        conn.execute("RELEASE write_request")
+                        outcomes.append((request, None, e))
+                with span("store.commit"):
+                    conn.execute("COMMIT")
+        except Exception as e:
+            logger.error(f"批量写入提交失败({len(batch)}条): {e}")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        for request, result, error in outcomes:
+            if error is not None:
+                request.future.set_exception(error)
+            else:
+                request.future.set_result(result)
+
+
+class _AsyncStoreBase:
+    """读操作走读线程池，写操作走WriteBatcher"""
+
+    def __init__(self, store, writer: WriteBatcher, readers: ThreadPoolExecutor):
+        self.sync = store  # 同步接口
+        self._writer = writer
+        self._readers = readers
+
+    async def _read(self, fn: Callable, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, partial(fn, *args, **kwargs))
+
+    async def _write(self, fn: Callable, *args, **kwargs):
+        return await asyncio.wrap_future(self._writer.submit(fn, *args, **kwargs))
+
+
+class AsyncCandidateStore(_AsyncStoreBase):
+    """CandidateStore的异步接口"""
+
+    async def save(self, profile: CandidateProfile, analysis: ResumeAnalysis = None, original_file_path: str = None, blob_sha256: str = None, person_id: int = None, jd_version: int = None, dup_cluster_id: int = None, prescreen_rules: str = None, prescreen_rejected: bool = False) -> int:
+        return await self._write(self.sync._save, profile, analysis, original_file_path, blob_sha256, person_id, jd_version, dup_cluster_id, prescreen_rules, prescreen_rejected)
+
+    async def update_analysis(self, candidate_id: int, analysis: ResumeAnalysis, jd_version: int = None, prescreen_rules: str = None, prescreen_rejected: bool = None) -> bool:
+        return await self._write(self.sync._update_analysis, candidate_id, analysis, jd_version, prescreen_rules, prescreen_rejected)
+
+    async def update_hr_tag(self, candidate_id: int, tag: str = None, note: str = None) -> bool:
+        return await self._write(self.sync._update_hr_tag, candidate_id, tag, note)
+
+    async def delete(self, candidate_id: int) -> bool:
+        deleted = await self._write(self.sync._delete, candidate_id)
+        if deleted:
+            await self._read(self.sync.blobs.collect_garbage)
+        return deleted
+
+    async def rebuild_stats(self):
+        return await self._write(self.sync._rebuild_stats)
+
+    async def get_by_id(self, candidate_id: int) -> Optional[CandidateProfile]:
+        return await self._read(self.sync.get_by_id, candidate_id)
+
+    async def get_by_position(self, position_id: int, sort_by: str = 'tag_priority', include_notes: bool = False, notes_per_candidate: int = 1, limit: int = None, offset: int = 0) -> List[Dict[str, Any]]:
+        return await self._read(self.sync.get_by_position, position_id, sort_by, include_notes, notes_per_candidate, limit, offset)
+
+    async def get_stats_by_position(self, position_id: int) -> Dict[str, int]:
+        return await self._read(self.sync.get_stats_by_position, position_id)
+
+    async def get_stats_for_positions(self, position_ids: List[int]) -> Dict[int, Dict[str, int]]:
+        return await self._read(self.sync.get_stats_for_positions, position_ids)
+
+
+class AsyncNoteStore(_AsyncStoreBase):
+    """NoteStore的异步接口"""
+
+    async def add_note(self, candidate_id: int, content: str) -> bool:
+        return await self._write(self.sync._add_note, candidate_id, content)
+
+    async def delete_note(self, note_id: int) -> bool:
+        return await self._write(self.sync._delete_note, note_id)
+
+    async def get_notes(self, candidate_id: int, limit: int = None) -> List[Dict[str, Any]]:
+        return await self._read(self.sync.get_notes, candidate_id, limit)
+
+    async def get_note_count(self, candidate_id: int) -> int:
+        return await self._read(self.sync.get_note_count, candidate_id)
+
+    async def get_note_counts(self, candidate_ids: List[int]) -> Dict[int, int]:
+        return await self._read(self.sync.get_note_counts, candidate_ids)
+
+    async def get_latest_notes(self, candidate_ids: List[int], per_candidate: int = 1) -> Dict[int, List[Dict[str, Any]]]:
+        return await self._read(self.sync.get_latest_notes, candidate_ids, per_candidate)
+
+
+class AsyncPositionStore(_AsyncStoreBase):
+    """PositionStore的异步接口"""
+
+    async def create(self, position: Position) -> int:
+        return await self._write(self.sync._create, position)
+
+    async def update(self, position_id: int, name: str = None, description: str = None, status: str = None) -> bool:
+        return await self._write(self.sync._update, position_id, name, description, status)
+
+    async def delete(self, position_id: int, soft_delete: bool = True) -> bool:
+        deleted = await self._write(self.sync._delete, position_id, soft_delete)
+        if deleted and not soft_delete:
+            await self._read(self.sync.blobs.collect_garbage)
+        return deleted
+
+    async def get_by_id(self, position_id: int) -> Optional[Position]:
+        return await self._read(self.sync.get_by_id, position_id)
+
+    async def get_all(self, status: str = "active") -> List[Position]:
+        return await self._read(self.sync.get_all, status)
+
+    async def get_all_with_stats(self, status: str = "active") -> List[Dict[str, Any]]:
+        return await self._read(self.sync.get_all_with_stats, status)
+
+    async def count_candidates(self, position_id: int) -> int:
+        return await self._read(self.sync.count_candidates, position_id)
+
+
+class AsyncStores:
+    """
+    异步存储门面，三个store共用一个写线程和一个读线程池
+
+    用法:
+        async with AsyncStores() as stores:
+            candidate_id = await stores.candidates.save(profile, analysis)
+            await stores.notes.add_note(candidate_id, "...")
+    """
+
+    def __init__(
+        self,
+        db_path: str = DEFAULT_DB_PATH,
+        readers: int = 4,
+        max_batch: int = 256,
+        max_delay: float = 0.005
+    ):
+        self.writer = WriteBatcher(db_path, max_batch=max_batch, max_delay=max_delay)
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="store-reader")
+
+        self.candidates = AsyncCandidateStore(CandidateStore(db_path), self.writer, self._readers)
+        self.notes = AsyncNoteStore(NoteStore(db_path), self.writer, self._readers)
+        self.positions = AsyncPositionStore(PositionStore(db_path), self.writer, self._readers)
+
+    def close(self):
+        """等待所有写操作提交后释放线程"""
+        self.writer.close()
+        self._readers.shutdown(wait=True)
+
+    async def aclose(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    async def __aenter__(self) -> "AsyncStores":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
@@ -0,0 +1,152 @@
+"""简历原文件的内容寻址存储
+
+文件按sha256存放在 <数据库目录>/blobs/ab/cd/<sha256>，同一份简历投递多个岗位只存一份。
+引用计数由candidates表上的触发器维护（见database._v3_resume_blobs），
+无引用的blob由collect_garbage清理。下载通过iter_chunks分块读取。
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Union
+
+from .database import DEFAULT_DB_PATH, connect, init_database
+from ..telemetry import traced_methods
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 1 << 20
+
+
+# path/iter_chunks只构造路径或惰性迭代器，不计时
+@traced_methods("store.blob", exclude=("path", "iter_chunks"))
+class ResumeBlobStore:
+    """简历原文件存储"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, root: Optional[str] = None):
+        self.db_path = Path(db_path)
+        init_database(self.db_path)
+        self.root = Path(root) if root else self.db_path.parent / "blobs"
+        self._tmp_dir = self.root / "tmp"
+        self._tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    def path(self, sha256: str) -> Path:
+        """blob在磁盘上的位置（按hash前4位两级分片）"""
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+
+    def exists(self, sha256: str) -> bool:
+        return self.path(sha256).exists()
+
+    def put(self, file_path: Union[str, Path]) -> str:
+        """存入本地文件，返回sha256"""
+        file_path = Path(file_path)
+        with open(file_path, "rb") as f:
+            return self.put_stream(f, ext=file_path.suffix.lower())
+
+    def put_stream(self, stream: BinaryIO, ext: str = "") -> str:
+        """
+        存入文件流（如Streamlit的UploadedFile），边写临时文件边计算hash，只读一遍
+
+        已存在相同内容时丢弃临时文件，只刷新last_put_at，保证刚上传、
+        还没关联候选人的blob不会被垃圾回收误删。
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_name = tempfile.mkstemp(dir=self._tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                while True:
+                    chunk = stream.read(_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+
+            sha256 = digest.hexdigest()
+
+            # 先登记再落盘：与collect_garbage的删除在同一把写锁上串行，
+            # 回收进程删掉旧记录和文件后，这里一定会重新写入文件
+            with connect(self.db_path) as conn:
+                conn.execute(
+                    """
+                    INSERT INTO resume_blobs (sha256, size, ext) VALUES (?, ?, ?)
+                    ON CONFLICT(sha256) DO UPDATE SET last_put_at = CURRENT_TIMESTAMP
+                    """,
+                    (sha256, size, ext)
+                )
+
+            target = self.path(sha256)
+            if target.exists():
+                os.unlink(tmp_name)
+            else:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_name, target)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
+        return sha256
+
+    def open(self, sha256: str) -> BinaryIO:
+        """以只读方式打开blob"""
+        return open(self.path(sha256), "rb")
+
+    def iter_chunks(self, sha256: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """分块读取blob，用于下载"""
+        with open(self.path(sha256), "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def copy_to(self, sha256: str, target: Union[str, Path]) -> Path:
+        """导出blob到指定路径"""
+        target = Path(target)
+        with self.open(sha256) as src, open(target, "wb") as dst:
+            shutil.copyfileobj(src, dst, _CHUNK_SIZE)
+        return target
+
+    def collect_garbage(self, grace_seconds: int = 600) -> int:
+        """
+        删除无候选人引用的blob，返回删除数量
+
+        grace_seconds内刚上传的blob不删除（上传与保存候选人之间的窗口期）。
+        """
+        with connect(self.db_path) as conn:
+            rows = conn.execute(
+                """
+                SELECT sha256 FROM resume_blobs
+                WHERE ref_count <= 0 AND last_put_at <= datetime('now', ?)
+                """,
+                (f"-{int(grace_seconds)} seconds",)
+            ).fetchall()
+
+        removed = 0
+        for (sha256,) in rows:
+            with connect(self.db_path) as conn:
+                # 删除前再确认一次没有新的引用；文件在提交前删除，
+                # 保证并发的put_stream要么看到记录仍在，要么在文件删除后重新写入
+                cursor = conn.execute(
+                    """
+                    DELETE FROM resume_blobs
+                    WHERE sha256 = ? AND ref_count <= 0 AND last_put_at <= datetime('now', ?)
+                    """,
+                    (sha256, f"-{int(grace_seconds)} seconds")
+                )
+                if cursor.rowcount == 0:
+                    continue
+                try:
+                    self.path(sha256).unlink()
+                except FileNotFoundError:
+                    pass
+            removed += 1
+
+        if removed:
+            logger.info(f"清理无引用简历文件{removed}个")
+        return removed
@@ -0,0 +1,250 @@
+"""岗位候选人流式导出（CSV / XLSX / Parquet）
+
+通过游标分批从SQLite读取候选人，逐行展平为表格列后增量写出，
+内存占用与岗位候选人数量无关。
+"""
+
+import csv
+import io
+import json
+import logging
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Union
+
+from .candidate_store import _order_clause
+from .database import DEFAULT_DB_PATH, connect, init_database
+
+logger = logging.getLogger(__name__)
+
+# 展平后固定的列数
+MAX_STRENGTHS = 5
+MAX_CONCERNS = 3
+MAX_WORK_EXPERIENCE = 3
+MAX_PROJECT_EXPERIENCE = 3
+
+EXPORT_COLUMNS: List[str] = (
+    ["id", "name", "file_name", "recommendation_level", "ai_summary", "total_years_experience"]
+    + [f"strength_{i}" for i in range(1, MAX_STRENGTHS + 1)]
+    + [f"concern_{i}" for i in range(1, MAX_CONCERNS + 1)]
+    + [
+        f"work_{i}_{field}"
+        for i in range(1, MAX_WORK_EXPERIENCE + 1)
+        for field in ("company", "position", "start_time", "end_time", "description")
+    ]
+    + [
+        f"project_{i}_{field}"
+        for i in range(1, MAX_PROJECT_EXPERIENCE + 1)
+        for field in ("name", "role", "description")
+    ]
+    + ["skills", "hr_tag", "hr_note", "parser_status", "created_at"]
+)
+
+# 导出时的表头（中文）
+COLUMN_TITLES: Dict[str, str] = {
+    "id": "编号",
+    "name": "姓名",
+    "file_name": "简历文件",
+    "recommendation_level": "推荐等级",
+    "ai_summary": "AI总结",
+    "total_years_experience": "工作年限",
+    "skills": "技能",
+    "hr_tag": "HR标签",
+    "hr_note": "HR备注",
+    "parser_status": "解析状态",
+    "created_at": "投递时间",
+}
+
+EXPORT_FORMATS: Dict[str, str] = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def iter_candidate_rows(
+    position_id: int,
+    sort_by: str = "tag_priority",
+    db_path: str = DEFAULT_DB_PATH,
+    batch_size: int = 500
+) -> Iterator[Dict[str, Any]]:
+    """按岗位逐行产出展平后的候选人记录（游标分批读取）"""
+    init_database(db_path)
+    conn = connect(db_path)
+    try:
+        cursor = conn.execute(
+            f"""
+            SELECT
+                c.id, c.name, c.file_name, c.recommendation_level, c.ai_summary, c.total_years_experience,
+                c.ai_strengths, c.ai_concerns,
+                COALESCE((SELECT p.profile_json FROM person_profiles p WHERE p.id = c.person_id), c.profile_json) AS profile_json,
+                c.hr_tag, c.hr_note, c.parser_status, c.created_at
+            FROM candidates c
+            WHERE c.position_id = ?
+            {_order_clause(sort_by)}
+            """,
+            (position_id,)
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield _flatten_row(row)
+    finally:
+        conn.close()
+
+
+def _loads(value: str, default):
+    if not value:
+        return default
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _flatten_row(row: tuple) -> Dict[str, Any]:
+    (candidate_id, name, file_name, level, summary, years,
+     strengths_json, concerns_json, profile_json,
+     hr_tag, hr_note, parser_status, created_at) = row
+
+    record = {column: None for column in EXPORT_COLUMNS}
+    record.update({
+        "id": candidate_id,
+        "name": name,
+        "file_name": file_name,
+        "recommendation_level": level,
+        "ai_summary": summary,
+        "total_years_experience": years,
+        "hr_tag": hr_tag,
+        "hr_note": hr_note,
+        "parser_status": parser_status,
+        "created_at": created_at,
+    })
+
+    for i, item in enumerate(_loads(strengths_json, [])[:MAX_STRENGTHS], start=1):
+        record[f"strength_{i}"] = item
+    for i, item in enumerate(_loads(concerns_json, [])[:MAX_CONCERNS], start=1):
+        record[f"concern_{i}"] = item
+
+    profile = _loads(profile_json, {})
+    for i, work in enumerate(profile.get("work_experience", [])[:MAX_WORK_EXPERIENCE], start=1):
+        for field in ("company", "position", "start_time", "end_time", "description"):
+            record[f"work_{i}_{field}"] = work.get(field)
+    for i, project in enumerate(profile.get("project_experience", [])[:MAX_PROJECT_EXPERIENCE], start=1):
+        for field in ("name", "role", "description"):
+            record[f"project_{i}_{field}"] = project.get(field)
+
+    skills = profile.get("skills", [])
+    if skills:
+        record["skills"] = "; ".join(
+            f"{s.get('category', '')}: {', '.join(s.get('items', []))}" for s in skills
+        )
+    return record
+
+
+def _titles() -> List[str]:
+    return [COLUMN_TITLES.get(column, column) for column in EXPORT_COLUMNS]
+
+
+# ---------------- 写出 ----------------
+
+def iter_csv_bytes(rows: Iterator[Dict[str, Any]], flush_rows: int = 200) -> Iterator[bytes]:
+    """把记录编码为CSV字节块（带BOM，Excel直接打开中文不乱码）"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(_titles())
+
+    yield "\ufeff".encode("utf-8")
+    pending = 1
+    for record in rows:
+        writer.writerow(["" if record[c] is None else record[c] for c in EXPORT_COLUMNS])
+        pending += 1
+        if pending >= flush_rows:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def write_csv(rows: Iterator[Dict[str, Any]], target: BinaryIO) -> None:
+    for chunk in iter_csv_bytes(rows):
+        target.write(chunk)
+
+
+def write_xlsx(rows: Iterator[Dict[str, Any]], target: Union[str, Path, BinaryIO]) -> None:
+    """openpyxl只写模式，行数据直接落到临时文件而不保留在内存中"""
+    try:
+        from openpyxl import Workbook
+    except ImportError as e:
+        raise ImportError("导出XLSX需要安装openpyxl: pip install openpyxl") from e
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("候选人")
+    sheet.append(_titles())
+    for record in rows:
+        sheet.append([record[c] for c in EXPORT_COLUMNS])
+    workbook.save(target)
+
+
+def write_parquet(rows: Iterator[Dict[str, Any]], target: Union[str, Path, BinaryIO], batch_size: int = 1000) -> None:
+    """按batch_size行一个row group增量写入"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("导出Parquet需要安装pyarrow: pip install pyarrow") from e
+
+    int_columns = {"id", "total_years_experience"}
+    schema = pa.schema([
+        (column, pa.int64() if column in int_columns else pa.string())
+        for column in EXPORT_COLUMNS
+    ])
+
+    def _to_batch(records: List[Dict[str, Any]]):
+        return pa.RecordBatch.from_pylist(
+            [
+                {c: (r[c] if c in int_columns or r[c] is None else str(r[c])) for c in EXPORT_COLUMNS}
+                for r in records
+            ],
+            schema=schema
+        )
+
+    with pq.ParquetWriter(target, schema) as writer:
+        batch = []
+        for record in rows:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                writer.write_batch(_to_batch(batch))
+                batch = []
+        if batch:
+            writer.write_batch(_to_batch(batch))
+
+
+_WRITERS = {
+    "csv": write_csv,
+    "xlsx": write_xlsx,
+    "parquet": write_parquet,
+}
+
+
+def export_position(
+    position_id: int,
+    fmt: str,
+    target: Union[str, Path, BinaryIO],
+    sort_by: str = "tag_priority",
+    db_path: str = DEFAULT_DB_PATH
+) -> None:
+    """导出岗位候选人到文件或二进制流"""
+    if fmt not in _WRITERS:
+        raise ValueError(f"不支持的导出格式: {fmt}（可选: {', '.join(_WRITERS)}）")
+
+    rows = iter_candidate_rows(position_id, sort_by=sort_by, db_path=db_path)
+    if fmt == "csv" and isinstance(target, (str, Path)):
+        with open(target, "wb") as f:
+            write_csv(rows, f)
+    else:
+        _WRITERS[fmt](rows, target)
+    logger.info(f"岗位{position_id}候选人导出完成: {fmt}")
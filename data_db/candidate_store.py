@@ -6,175 +6,256 @@ from pathlib import Path
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
-from ..data_model.candidate import CandidateProfile
+from .blob_store import ResumeBlobStore
+from .database import DEFAULT_DB_PATH, POSITION_STATS_COLUMNS, POSITION_STATS_KEYS, connect, get_data_version, init_database, rebuild_position_stats
+from ..data_model.candidate import PERSON_PROFILE_FIELDS, CandidateProfile
 from ..data_model.ana_model import ResumeAnalysis
+from ..telemetry import traced_methods
 
+@traced_methods("store.candidate")
 class CandidateStore:
     """候选人数据存储管理"""
-    def __init__(self, db_path: str = './data/candidates.db'):
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
         self.db_path = Path(db_path)
-        self.db_path.parent.mkdir(exist_ok=True)
-        self._init_database()
-    
-    def _init_database(self):
-        """初始化"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS candidates (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    position_id INTEGER NOT NULL,
-                    file_name TEXT NOT NULL,
-                    original_file_path TEXT,
-                        
-                    
-                    -- 基础档案
-                    total_years_experience INTEGER,
-                    profile_json TEXT,
-                        
-                    -- AI分析结果
-                    recommendation_level TEXT DEFAULT '可考虑',
-                    ai_atrengths TEXT,
-                    ai_concerns TEXT,
-                    ai_summary TEXT,
-                        
-
-                    -- HR标签
-                    hr_tag TEXT DEFAULT NULL,
-                    hr_note TEXT DEFAULT NULL,
-                    hr_tagged_at TIMESTAMP,
-                        
-                    -- 解析状态
-                    parser_status TEXT DEFAULT 'success',
-                    error_message TEXT,
-                        
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                        )
-                """)
-            
-        try:
-            conn.execute("ALTER TABLE candidates ADD COLUMN original_file_path TEXT")
-        except sqlite3.OperationalError:
-            pass
-
-        # 创建索引
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_position_id ON candidates(position_id)")
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_position_hr_tag ON candidates(position_id, hr_tag)")
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_position_recommendation ON candidates(position_id, recommendation_level)")
-
-        # 创建触发器
-        conn.execute("""
-            CREATE TRIGGER IF NOT EXISTS update_candidates_timestamp
-            AFTER UPDATE ON candidates
-            BEGIN
-                UPDATE candidates SET updated_at = CURRENT_TIMESTAMP WHER id = NEW.id;
-            END
-            """)
-            
-    def save(self, profile: CandidateProfile, analysis: ResumeAnalysis = None, original_file_path: str = None) -> int:
-        """保存候选人的档案（AI分析结果）"""
-        with sqlite3.connect(self.db_path) as conn:
-            # 如果有AI分析结果，更新profile
-            if analysis:
-                profile.recommendation_level = analysis.recommendation_level
-                profile.ai_strengths = analysis.key_strengths
-                profile.ai_concerns = analysis.key_concerns
-                profile.ai_summary = analysis.one_sentence_summary
+        init_database(self.db_path)
+        self.blobs = ResumeBlobStore(db_path)
 
-            cursor = conn.execute(
-                """
-                INSERT INTO candidates(
-                    name, position_id, file_name, original_file_path,
-                    total_years_experience, profile_json,
-                    recommendation_level, ai_strengths, ai_concerns, ai_summary,
-                    parser_status, error_message
-                )VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    profile.name,
-                    profile.position_id,
-                    profile.file_name,
-                    original_file_path,
-                    profile.total_years_experience,
-                    profile.model_dump_json,
-                    profile.recommendation_level,
-                    json.dumps(profile.ai_strengths,ensure_ascii=False),
-                    json.dumps(profile.ai_concerns,ensure_ascii=False),
-                    profile.ai_summary,
-                    profile.parser_status,
-                    profile.error_message
-                )
+    def rebuild_stats(self):
+        """重算岗位统计表（统计不一致时手动修复用）"""
+        with connect(self.db_path) as conn:
+            self._rebuild_stats(conn)
+
+    def _rebuild_stats(self, conn: sqlite3.Connection):
+        rebuild_position_stats(conn)
+
+    def save(self, profile: CandidateProfile, analysis: ResumeAnalysis = None, original_file_path: str = None, blob_sha256: str = None, person_id: int = None, jd_version: int = None, dup_cluster_id: int = None, prescreen_rules: str = None, prescreen_rejected: bool = False) -> int:
+        """
+        保存候选人的档案（AI分析结果），blob_sha256为ResumeBlobStore.put返回的原文件hash
+
+        关联了人员档案（person_id）时，工作/项目/教育经历和技能只保存在人员档案中，候选人行只保存岗位相关的评估结果；
+        jd_version为分析时岗位描述的版本，不传时取岗位当前版本；
+        dup_cluster_id为简历所属的近似重复簇（见doc_ana.near_dup）；
+        prescreen_rules为预筛所用规则的JSON（未预筛为None），prescreen_rejected为是否未通过
+        """
+        with connect(self.db_path) as conn:
+            return self._save(conn, profile, analysis, original_file_path, blob_sha256, person_id, jd_version, dup_cluster_id, prescreen_rules, prescreen_rejected)
+
+    def _save(self, conn: sqlite3.Connection, profile: CandidateProfile, analysis: ResumeAnalysis = None, original_file_path: str = None, blob_sha256: str = None, person_id: int = None, jd_version: int = None, dup_cluster_id: int = None, prescreen_rules: str = None, prescreen_rejected: bool = False) -> int:
+        # 如果有AI分析结果，更新profile
+        if analysis:
+            profile.recommendation_level = analysis.recommendation_level
+            profile.ai_strengths = analysis.key_strengths
+            profile.ai_concerns = analysis.key_concerns
+            profile.ai_summary = analysis.one_sentence_summary
+
+        cursor = conn.execute(
+            """
+            INSERT INTO candidates(
+                name, position_id, file_name, original_file_path, blob_sha256, person_id, jd_version, dup_cluster_id,
+                prescreen_rules, prescreen_rejected,
+                total_years_experience, profile_json,
+                recommendation_level, ai_strengths, ai_concerns, ai_summary,
+                parser_status, error_message
+            )VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, (SELECT jd_version FROM positions WHERE id = ?)), ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                profile.name,
+                profile.position_id,
+                profile.file_name,
+                original_file_path,
+                blob_sha256,
+                person_id,
+                jd_version,
+                profile.position_id,
+                dup_cluster_id,
+                prescreen_rules,
+                int(bool(prescreen_rejected)),
+                profile.total_years_experience,
+                profile.model_dump_json(exclude=_PERSON_ONLY_FIELDS if person_id else None),
+                profile.recommendation_level,
+                json.dumps(profile.ai_strengths,ensure_ascii=False),
+                json.dumps(profile.ai_concerns,ensure_ascii=False),
+                profile.ai_summary,
+                profile.parser_status,
+                profile.error_message
             )
-            return cursor.lastrowid
+        )
+        return cursor.lastrowid
         
     def get_by_id(self, candidate_id: int) -> Optional[CandidateProfile]:
         """根据id获取候选人"""
-        with sqlite3.connect(self.db_path) as conn:
+        with connect(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
-            cursor = conn.execute("SELECT *FROM candidates WHERE id = ?",(candidate_id,))
+            cursor = conn.execute(
+                """
+                SELECT c.profile_json, p.profile_json AS person_profile_json
+                FROM candidates c
+                LEFT JOIN person_profiles p ON p.id = c.person_id
+                WHERE c.id = ?
+                """,
+                (candidate_id,)
+            )
             row = cursor.fetchone()
             if row and row['profile_json']:
-                return CandidateProfile.model_validate_json(row['profile_json'])
+                profile = json.loads(row['profile_json'])
+                if row['person_profile_json']:
+                    profile.update(json.loads(row['person_profile_json']))
+                return CandidateProfile.model_validate(profile)
         return None
 
-    def get_by_position(self, position_id:int,sort_by:str = 'tag_priority') -> List[Dict[str,Any]]:
-        """获取岗位的候选人列表（'tag_priority','recommendation','time'）"""
-        with sqlite3.connect(self.db_path) as conn:
+    def get_id_by_blob(self, position_id: int, blob_sha256: str) -> Optional[int]:
+        """同一岗位下同一份简历文件已保存的候选人id（后台任务重试时避免重复保存）"""
+        with connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT id FROM candidates WHERE position_id = ? AND blob_sha256 = ? ORDER BY id LIMIT 1",
+                (position_id, blob_sha256)
+            ).fetchone()
+            return row[0] if row else None
+
+    def exists(self, candidate_id: int) -> bool:
+        """候选人是否仍存在（重新上传时判断之前的任务结果是否已被删除）"""
+        with connect(self.db_path) as conn:
+            return conn.execute("SELECT 1 FROM candidates WHERE id = ?", (candidate_id,)).fetchone() is not None
+
+    def update_analysis(self, candidate_id: int, analysis: ResumeAnalysis, jd_version: int = None, prescreen_rules: str = None, prescreen_rejected: bool = None) -> bool:
+        """
+        岗位描述修改后重新评估：只覆盖评估结果并更新所依据的岗位描述版本，HR标签和备注保留
+
+        prescreen_rejected不为None时（本次重新预筛过）同时覆盖预筛规则和结论，prescreen_rules为None表示不再预筛
+        """
+        with connect(self.db_path) as conn:
+            return self._update_analysis(conn, candidate_id, analysis, jd_version, prescreen_rules, prescreen_rejected)
+
+    def _update_analysis(self, conn: sqlite3.Connection, candidate_id: int, analysis: ResumeAnalysis, jd_version: int = None, prescreen_rules: str = None, prescreen_rejected: bool = None) -> bool:
+        cursor = conn.execute(
+            """
+            UPDATE candidates SET
+                recommendation_level = ?, ai_strengths = ?, ai_concerns = ?, ai_summary = ?,
+                jd_version = COALESCE(?, (SELECT jd_version FROM positions WHERE id = candidates.position_id))
+            WHERE id = ?
+            """,
+            (
+                analysis.recommendation_level,
+                json.dumps(analysis.key_strengths, ensure_ascii=False),
+                json.dumps(analysis.key_concerns, ensure_ascii=False),
+                analysis.one_sentence_summary,
+                jd_version,
+                candidate_id
+            )
+        )
+        if prescreen_rejected is not None:
+            conn.execute(
+                "UPDATE candidates SET prescreen_rules = ?, prescreen_rejected = ? WHERE id = ?",
+                (prescreen_rules, int(prescreen_rejected), candidate_id)
+            )
+        return cursor.rowcount > 0
+
+    def get_prescreen(self, candidate_id: int) -> Optional[Dict[str, Any]]:
+        """候选人入库（或上次重新预筛）时所用的预筛规则和结论 {rules, rejected}，未预筛过返回None"""
+        with connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT prescreen_rules, prescreen_rejected FROM candidates WHERE id = ?", (candidate_id,)
+            ).fetchone()
+            if row is None or row[0] is None:
+                return None
+            return {"rules": row[0], "rejected": bool(row[1])}
+
+    def get_stale(self, position_id: int) -> List[Dict[str, Any]]:
+        """评估结果基于旧版岗位描述的候选人（id, file_name, blob_sha256, hr_tag）"""
+        with connect(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
-            # 排序sql
-            if sort_by == "tag_priority":
-                order_clause = """
-                    ORDER BY
-                        CASE hr_tag
-                            WHEN 'star' THEN 1
-                            WHEN 'interview' THEN 2
-                            WHEN 'pending' THEN 3
-                            WHEN NULL then 4
-                            WHEN 'rejected' THEN 5
-                            ELSE 6
-                        END,
-                        CASE recommendation_level
-                            WHEN '强烈推荐' THEN 1
-                            WHEN '推荐' THEN 2
-                            WHEN '可考虑' THEN 3
-                            WHEN '不推荐' THEN 4
-                            ELSE 5
-                        END,
-                        created_at DESC
-                    """
-            
-            elif sort_by == "recommendation":
-                order_clause = """
-                    ORDER BY
-                        CASE recommendation_level
-                            WHEN '强烈推荐' THEN 1
-                            WHEN '推荐' THEN 2
-                            WHEN '可考虑' THEN 3
-                            WHEN '不推荐' THEN 4
-                            ELSE 5
-                        END,
-                        created_at DESC
+            cursor = conn.execute(
                 """
-            
-            else: # time
-                order_clause = "ORDER BY created_at DESC"
+                SELECT c.id, c.file_name, c.blob_sha256, c.hr_tag
+                FROM candidates c
+                JOIN positions p ON p.id = c.position_id
+                WHERE c.position_id = ? AND c.jd_version < p.jd_version
+                """,
+                (position_id,)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    def count_stale(self, position_id: int) -> int:
+        """评估结果已过期的候选人数"""
+        with connect(self.db_path) as conn:
+            return conn.execute(
+                """
+                SELECT COUNT(*) FROM candidates c
+                JOIN positions p ON p.id = c.position_id
+                WHERE c.position_id = ? AND c.jd_version < p.jd_version
+                """,
+                (position_id,)
+            ).fetchone()[0]
+
+    def get_by_position(
+        self,
+        position_id:int,
+        sort_by:str = 'tag_priority',
+        include_notes:bool = False,
+        notes_per_candidate:int = 1,
+        limit:int = None,
+        offset:int = 0
+    ) -> List[Dict[str,Any]]:
+        """
+        获取岗位的候选人列表（'tag_priority','recommendation','time'）
+
+        include_notes为True时在同一次查询中附带note_count和latest_notes（最新notes_per_candidate条备注）；
+        stale为True表示评估基于旧版岗位描述，正在等待重新评估；
+        duplicate_count为本岗位下与该候选人简历近似重复的其他候选人数；
+        limit/offset用于分页（总数取get_stats_by_position的total）
+        """
+        with connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            order_clause = _order_clause(sort_by)
+
+            notes_columns = ""
+            params = [position_id]
+            if include_notes:
+                # 相关子查询按candidate_id走idx_candidate_notes索引，避免逐行再查备注
+                notes_columns = """,
+                    (SELECT COUNT(*) FROM candidate_notes n WHERE n.candidate_id = c.id) AS note_count,
+                    (
+                        SELECT json_group_array(json_object(
+                            'id', id, 'content', note_content, 'created_at', created_at
+                        ))
+                        FROM (
+                            SELECT id, note_content, created_at
+                            FROM candidate_notes n
+                            WHERE n.candidate_id = c.id
+                            ORDER BY created_at DESC, id DESC
+                            LIMIT ?
+                        )
+                    ) AS latest_notes
+                """
+                params.insert(0, notes_per_candidate)
             
             cursor = conn.execute(
                 f"""
                 SELECT 
-                    id, name, file_name, original_file_path,
-                    recommendation_level,
-                    ai_strengths, ai_concerns, ai_summary,
-                    hr_tag, hr_note, hr_tagged_at,
-                    parser_status, error_message,
-                    profile_json,
-                    created_at
-                FROM candidates
-                WHERE position_id = ?
+                    c.id, c.name, c.file_name, c.original_file_path, c.blob_sha256, c.person_id,
+                    c.recommendation_level,
+                    c.ai_strengths, c.ai_concerns, c.ai_summary,
+                    c.hr_tag, c.hr_note, c.hr_tagged_at,
+                    c.parser_status, c.error_message,
+                    COALESCE(
+                        (SELECT p.profile_json FROM person_profiles p WHERE p.id = c.person_id),
+                        c.profile_json
+                    ) AS profile_json,
+                    c.created_at,
+                    c.jd_version,
+                    c.jd_version < (SELECT p.jd_version FROM positions p WHERE p.id = c.position_id) AS stale,
+                    c.dup_cluster_id,
+                    (
+                        SELECT COUNT(*) FROM candidates d
+                        WHERE d.position_id = c.position_id AND d.dup_cluster_id = c.dup_cluster_id AND d.id != c.id
+                    ) AS duplicate_count
+                    {notes_columns}
+                FROM candidates c
+                WHERE c.position_id = ?
                 {order_clause}
+                {"LIMIT ? OFFSET ?" if limit is not None else ""}
                 """,
-                (position_id,)
+                params + ([limit, offset] if limit is not None else [])
             )
 
             results = []
@@ -195,6 +276,11 @@ class CandidateStore:
                 else:
                     data['work_experience'] = []
                     data['project_experience'] = []
+
+                data['stale'] = bool(data['stale'])
+
+                if include_notes:
+                    data['latest_notes'] = json.loads(data['latest_notes']) if data['latest_notes'] else []
                 
                 results.append(data)
                 
@@ -202,6 +288,10 @@ class CandidateStore:
             
     def update_hr_tag(self, candidate_id:int, tag:str = None, note:str = None) ->bool:
         """更新hr标签和标注"""
+        with connect(self.db_path) as conn:
+            return self._update_hr_tag(conn, candidate_id, tag, note)
+
+    def _update_hr_tag(self, conn: sqlite3.Connection, candidate_id:int, tag:str = None, note:str = None) -> bool:
         updates = []
         params = []
 
@@ -210,47 +300,111 @@ class CandidateStore:
             params.append(tag)
             updates.append("hr_tagged_at = CURRENT_TIMESTAMP")
 
-            if note is not None:
-                updates.append("hr_note = ?")
-                params.append(note)
+        if note is not None:
+            updates.append("hr_note = ?")
+            params.append(note)
             
-            if not updates:
-                return False
+        if not updates:
+            return False
             
-            params.append(candidate_id)
-            sql = f"UPDATE candidates SET {', '.join(updates)} WHERE id = ?"
-
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute(sql,params)
-                return cursor.rowcount > 0
+        params.append(candidate_id)
+        sql = f"UPDATE candidates SET {', '.join(updates)} WHERE id = ?"
+        cursor = conn.execute(sql,params)
+        return cursor.rowcount > 0
             
     def delete(self, candidate_id: int) -> bool:
-        """删除候选人"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute("DELETE FROM candidates WHERE id =?", (candidate_id,))
-            return cursor.rowcount > 0
+        """删除候选人（同时清理不再被引用的简历原文件）"""
+        with connect(self.db_path) as conn:
+            deleted = self._delete(conn, candidate_id)
+        if deleted:
+            self.blobs.collect_garbage()
+        return deleted
+
+    def _delete(self, conn: sqlite3.Connection, candidate_id: int) -> bool:
+        cursor = conn.execute("DELETE FROM candidates WHERE id =?", (candidate_id,))
+        return cursor.rowcount > 0
         
+    def get_data_version(self, position_id: int) -> int:
+        """岗位的数据版本号（候选人、备注、岗位有写入即变化），用作界面缓存的key"""
+        with connect(self.db_path) as conn:
+            return get_data_version(conn, position_id)
+
     def get_stats_by_position(self,position_id:int) -> Dict[str,int]:
         """获取岗位候选人的统计信息"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute("""
-            SELECT
-                COUNT(*) as total,
-                SUM(CASE WHEN hr_tag = 'star' THEN 1 ELSE 0 END) as star_count,
-                SUM(CASE WHEN hr_tag = 'interview' THEN 1 ELSE 0 END) as interview_count,
-                SUM(CASE WHEN hr_tag = 'pending' THEN 1 ELSE 0 END) as pending_count,
-                SUM(CASE WHEN hr_tag = 'rejected' THEN 1 ELSE 0 END) as rejected_count,
-                SUM(CASE WHEN hr_tag IS NULL THEN 1 ELSE 0 END) as untagged_count
-            FROM candidates
-            WHERE position_id = ?
-            """,(position_id,))
+        return self.get_stats_for_positions([position_id])[position_id]
 
-            row = cursor.fetchone()
-            return {
-                'total': row[0],
-                'star':row[1],
-                'interview':row[2],
-                'pending':row[3],
-                'rejected':row[4],
-                'untagged':row[5],
-            }
+    def get_stats_for_positions(self, position_ids: List[int]) -> Dict[int, Dict[str,int]]:
+        """批量获取多个岗位的统计信息（一次查询，读取物化统计表）"""
+        position_ids = list(dict.fromkeys(position_ids))
+        stats = {pid: _empty_stats() for pid in position_ids}
+        if not position_ids:
+            return stats
+
+        with connect(self.db_path) as conn:
+            # 分批避免超过SQLite变量数上限
+            for start in range(0, len(position_ids), _MAX_SQL_VARS):
+                batch = position_ids[start:start + _MAX_SQL_VARS]
+                placeholders = ", ".join("?" * len(batch))
+                cursor = conn.execute(
+                    f"""
+                    SELECT position_id, {", ".join(POSITION_STATS_COLUMNS)}
+                    FROM position_stats
+                    WHERE position_id IN ({placeholders})
+                    """,
+                    batch
+                )
+                for row in cursor.fetchall():
+                    stats[row[0]] = dict(zip(POSITION_STATS_KEYS, row[1:]))
+
+        return stats
+
+
+# 关联人员档案时不在候选人行重复保存的字段（工作年限仍冗余一份，用于排序和导出）
+_PERSON_ONLY_FIELDS = set(PERSON_PROFILE_FIELDS) - {"total_years_experience"}
+
+# SQLite单条语句默认最多999个绑定变量
+_MAX_SQL_VARS = 500
+
+
+def _order_clause(sort_by: str) -> str:
+    """候选人列表排序sql（'tag_priority','recommendation','time'），最后按id排序保证分页稳定"""
+    if sort_by == "tag_priority":
+        return """
+            ORDER BY
+                CASE
+                    WHEN hr_tag = 'star' THEN 1
+                    WHEN hr_tag = 'interview' THEN 2
+                    WHEN hr_tag = 'pending' THEN 3
+                    WHEN hr_tag IS NULL THEN 4
+                    WHEN hr_tag = 'rejected' THEN 5
+                    ELSE 6
+                END,
+                CASE recommendation_level
+                    WHEN '强烈推荐' THEN 1
+                    WHEN '推荐' THEN 2
+                    WHEN '可考虑' THEN 3
+                    WHEN '不推荐' THEN 4
+                    ELSE 5
+                END,
+                created_at DESC, id DESC
+            """
+
+    elif sort_by == "recommendation":
+        return """
+            ORDER BY
+                CASE recommendation_level
+                    WHEN '强烈推荐' THEN 1
+                    WHEN '推荐' THEN 2
+                    WHEN '可考虑' THEN 3
+                    WHEN '不推荐' THEN 4
+                    ELSE 5
+                END,
+                created_at DESC, id DESC
+        """
+
+    else: # time
+        return "ORDER BY created_at DESC, id DESC"
+
+
+def _empty_stats() -> Dict[str,int]:
+    return {key: 0 for key in POSITION_STATS_KEYS}
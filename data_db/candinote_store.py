@@ -5,51 +5,39 @@ from pathlib import Path
 from typing import List, Dict, Any
 from datetime import datetime
 
+from .database import DEFAULT_DB_PATH, connect, init_database
+from ..telemetry import traced_methods
 
+
+@traced_methods("store.note")
 class NoteStore:
     """数据管理"""
 
-    def __init__(self,db_path:str = "./data/candidates.db"):
+    def __init__(self,db_path:str = DEFAULT_DB_PATH):
         self.db_path = Path(db_path)
-        self.db_path.parent.mkdir(exist_ok=True)
-        self._init_database()
-
-    def _init_database(self):
-        """初始化表"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-            CREATE TABLE IF NOT EXISTS candidate_notes(
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                candidate_id INTEGER NOT NULL,
-                note_content TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (candidate_id) REFERENCES candidates(id) ON DELETE CASCADE
-                         )
-            """)
-
-            # 创建索引
-            conn.execute(
-                """
-                CREATE INDEX IF NOT EXISTS idx_candidate_notes
-                ON candidate_notes(candidate_id,created_at DESC)
-                """
-            )
-    
+        init_database(self.db_path)
+
     def add_note(self,candidate_id: int, content:str) -> bool:
         """添加备注"""
         if not content or not content.strip():
             return False
 
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
-                "INSERT INTO candidate_notes (candidate_id, note_content) VALUES (?, ?)",
-                (candidate_id, content.strip())
-            )
-            return True
+        with connect(self.db_path) as conn:
+            return self._add_note(conn, candidate_id, content)
+
+    def _add_note(self, conn: sqlite3.Connection, candidate_id: int, content: str) -> bool:
+        if not content or not content.strip():
+            return False
+
+        conn.execute(
+            "INSERT INTO candidate_notes (candidate_id, note_content) VALUES (?, ?)",
+            (candidate_id, content.strip())
+        )
+        return True
         
     def get_notes(self, candidate_id:int, limit:int = None) -> List[Dict[str,Any]]:
         """获取候选人备注（按时间倒序）"""
-        with sqlite3.connect(self.db_path) as conn:
+        with connect(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
             sql = """
                 SELECT id, note_content, created_at
@@ -75,18 +63,85 @@ class NoteStore:
         
     def delete_note(self, note_id:int) -> bool:
         """删除"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute("DELETE FROM candidate_notes WHERE id = ?", (note_id,))
-            return cursor.rowcount > 0
+        with connect(self.db_path) as conn:
+            return self._delete_note(conn, note_id)
+
+    def _delete_note(self, conn: sqlite3.Connection, note_id: int) -> bool:
+        cursor = conn.execute("DELETE FROM candidate_notes WHERE id = ?", (note_id,))
+        return cursor.rowcount > 0
         
     def get_note_count(self,candidate_id: int) -> int:
         """候选人备注数量"""
-        with sqlite3.connect(self.db_path) as conn:
+        with connect(self.db_path) as conn:
             cursor = conn.execute(
                 "SELECT COUNT(*) FROM candidate_notes WHERE candidate_id = ?",
                 (candidate_id,)
             )
             return cursor.fetchone()[0]
-        
+
+    def get_note_counts(self, candidate_ids: List[int]) -> Dict[int, int]:
+        """批量获取候选人备注数量（一次查询）"""
+        candidate_ids = list(dict.fromkeys(candidate_ids))
+        counts = {cid: 0 for cid in candidate_ids}
+        if not candidate_ids:
+            return counts
+
+        with connect(self.db_path) as conn:
+            for start in range(0, len(candidate_ids), _MAX_SQL_VARS):
+                batch = candidate_ids[start:start + _MAX_SQL_VARS]
+                placeholders = ", ".join("?" * len(batch))
+                cursor = conn.execute(
+                    f"""
+                    SELECT candidate_id, COUNT(*)
+                    FROM candidate_notes
+                    WHERE candidate_id IN ({placeholders})
+                    GROUP BY candidate_id
+                    """,
+                    batch
+                )
+                counts.update(cursor.fetchall())
+
+        return counts
+
+    def get_latest_notes(self, candidate_ids: List[int], per_candidate: int = 1) -> Dict[int, List[Dict[str, Any]]]:
+        """批量获取每个候选人最新的n条备注（按时间倒序，走idx_candidate_notes索引）"""
+        candidate_ids = list(dict.fromkeys(candidate_ids))
+        notes = {cid: [] for cid in candidate_ids}
+        if not candidate_ids or per_candidate <= 0:
+            return notes
+
+        with connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            for start in range(0, len(candidate_ids), _MAX_SQL_VARS):
+                batch = candidate_ids[start:start + _MAX_SQL_VARS]
+                placeholders = ", ".join("?" * len(batch))
+                cursor = conn.execute(
+                    f"""
+                    SELECT candidate_id, id, note_content, created_at
+                    FROM (
+                        SELECT
+                            candidate_id, id, note_content, created_at,
+                            ROW_NUMBER() OVER (
+                                PARTITION BY candidate_id
+                                ORDER BY created_at DESC, id DESC
+                            ) AS rn
+                        FROM candidate_notes
+                        WHERE candidate_id IN ({placeholders})
+                    )
+                    WHERE rn <= ?
+                    ORDER BY candidate_id, rn
+                    """,
+                    (*batch, per_candidate)
+                )
+                for row in cursor.fetchall():
+                    notes[row['candidate_id']].append({
+                        'id': row['id'],
+                        'content': row['note_content'],
+                        'created_at': row['created_at']
+                    })
+
+        return notes
 
 
+# SQLite单条语句默认最多999个绑定变量
+_MAX_SQL_VARS = 500
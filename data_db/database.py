@@ -0,0 +1,527 @@
+"""数据库连接与版本化迁移
+
+岗位、候选人、备注共用一个SQLite库，表结构由MIGRATIONS按顺序升级，
+当前版本记录在 PRAGMA user_version 中，启动时只执行尚未应用的迁移。
+"""
+
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "./data/candidates.db"
+
+# 后台筛选任务队列单独一个库，频繁的领取/心跳写入不和候选人库抢写锁
+DEFAULT_JOBS_DB_PATH = "./data/jobs.db"
+
+# 统一之前岗位单独存放的库
+LEGACY_POSITIONS_DB_PATH = "./data_db/positions.db"
+
+_initialized = set()
+_init_lock = threading.Lock()
+
+
+def connect(db_path: Union[str, Path]) -> sqlite3.Connection:
+    """打开连接并开启外键约束（SQLite默认关闭，每个连接都要单独开启）"""
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def init_database(db_path: Union[str, Path], migrations: Optional[List[Callable[[sqlite3.Connection], None]]] = None) -> None:
+    """确保数据库已迁移到最新版本（每个进程每个库只检查一次），migrations默认为候选人库的MIGRATIONS"""
+    path = Path(db_path).resolve()
+    with _init_lock:
+        if path in _initialized:
+            return
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = connect(path)
+        try:
+            # WAL允许读写并发，设置后持久保存在库文件中
+            conn.execute("PRAGMA journal_mode = WAL")
+            migrate(conn, migrations)
+        finally:
+            conn.close()
+        _initialized.add(path)
+
+
+def migrate(conn: sqlite3.Connection, migrations: Optional[List[Callable[[sqlite3.Connection], None]]] = None) -> int:
+    """依次应用未执行的迁移，返回迁移后的版本号"""
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None  # 手动管理事务
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for target, migration in enumerate(migrations or MIGRATIONS, start=1):
+            if target <= version:
+                continue
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # 拿到写锁后再确认一次，其他进程可能已经完成了迁移
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+                if target <= version:
+                    conn.execute("ROLLBACK")
+                    continue
+
+                migration(conn)
+                conn.execute(f"PRAGMA user_version = {target}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            version = target
+            logger.info(f"数据库迁移到版本{target}: {migration.__doc__}")
+        return version
+    finally:
+        conn.isolation_level = isolation_level
+
+
+def _column_names(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _add_column_if_missing(conn: sqlite3.Connection, table: str, column: str, ddl: str) -> None:
+    if column not in _column_names(conn, table):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+
+# ---------------- 岗位统计 ----------------
+
+POSITION_STATS_COLUMNS = (
+    "total",
+    "star_count", "interview_count", "pending_count", "rejected_count", "untagged_count",
+    "highly_recommended_count", "recommended_count", "consider_count", "not_recommended_count",
+)
+
+# 与POSITION_STATS_COLUMNS一一对应的对外字段名
+POSITION_STATS_KEYS = (
+    "total",
+    "star", "interview", "pending", "rejected", "untagged",
+    "highly_recommended", "recommended", "consider", "not_recommended",
+)
+
+
+def _stats_delta_sql(row: str, sign: str) -> str:
+    """生成对position_stats按某一行(NEW/OLD)加减计数的UPDATE语句"""
+    return f"""
+        UPDATE position_stats SET
+            total = total {sign} 1,
+            star_count = star_count {sign} ({row}.hr_tag IS 'star'),
+            interview_count = interview_count {sign} ({row}.hr_tag IS 'interview'),
+            pending_count = pending_count {sign} ({row}.hr_tag IS 'pending'),
+            rejected_count = rejected_count {sign} ({row}.hr_tag IS 'rejected'),
+            untagged_count = untagged_count {sign} ({row}.hr_tag IS NULL),
+            highly_recommended_count = highly_recommended_count {sign} ({row}.recommendation_level IS '强烈推荐'),
+            recommended_count = recommended_count {sign} ({row}.recommendation_level IS '推荐'),
+            consider_count = consider_count {sign} ({row}.recommendation_level IS '可考虑'),
+            not_recommended_count = not_recommended_count {sign} ({row}.recommendation_level IS '不推荐')
+        WHERE position_id = {row}.position_id;
+    """
+
+
+def rebuild_position_stats(conn: sqlite3.Connection) -> None:
+    """从candidates全量重算统计表"""
+    conn.execute("DELETE FROM position_stats")
+    conn.execute(f"""
+        INSERT INTO position_stats (position_id, {", ".join(POSITION_STATS_COLUMNS)})
+        SELECT
+            position_id,
+            COUNT(*),
+            SUM(hr_tag IS 'star'),
+            SUM(hr_tag IS 'interview'),
+            SUM(hr_tag IS 'pending'),
+            SUM(hr_tag IS 'rejected'),
+            SUM(hr_tag IS NULL),
+            SUM(recommendation_level IS '强烈推荐'),
+            SUM(recommendation_level IS '推荐'),
+            SUM(recommendation_level IS '可考虑'),
+            SUM(recommendation_level IS '不推荐')
+        FROM candidates
+        GROUP BY position_id
+    """)
+
+
+# ---------------- 迁移 ----------------
+
+def _v1_base_schema(conn: sqlite3.Connection) -> None:
+    """岗位/候选人/备注基础表、索引、触发器和岗位统计表"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS positions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            description TEXT NOT NULL,
+            status TEXT DEFAULT 'active',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS candidates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            position_id INTEGER NOT NULL REFERENCES positions(id) ON DELETE CASCADE,
+            file_name TEXT NOT NULL,
+            original_file_path TEXT,
+
+            -- 基础档案
+            total_years_experience INTEGER,
+            profile_json TEXT,
+
+            -- AI分析结果
+            recommendation_level TEXT DEFAULT '可考虑',
+            ai_strengths TEXT,
+            ai_concerns TEXT,
+            ai_summary TEXT,
+
+            -- HR标签
+            hr_tag TEXT DEFAULT NULL,
+            hr_note TEXT DEFAULT NULL,
+            hr_tagged_at TIMESTAMP,
+
+            -- 解析状态
+            parser_status TEXT DEFAULT 'success',
+            error_message TEXT,
+
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # 旧版本建出来的表缺少的列
+    _add_column_if_missing(conn, "candidates", "original_file_path", "TEXT")
+    _add_column_if_missing(conn, "candidates", "ai_strengths", "TEXT")
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS candidate_notes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            candidate_id INTEGER NOT NULL,
+            note_content TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (candidate_id) REFERENCES candidates(id) ON DELETE CASCADE
+        )
+    """)
+
+    # 索引
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_position_id ON candidates(position_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_position_hr_tag ON candidates(position_id, hr_tag)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_position_recommendation ON candidates(position_id, recommendation_level)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_candidate_notes ON candidate_notes(candidate_id, created_at DESC)")
+
+    # 自动更新updated_at
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS update_positions_timestamp
+        AFTER UPDATE ON positions
+        BEGIN
+            UPDATE positions SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS update_candidates_timestamp
+        AFTER UPDATE ON candidates
+        BEGIN
+            UPDATE candidates SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+        END
+    """)
+
+    # 岗位统计物化表，由触发器增量维护
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS position_stats (
+            position_id INTEGER PRIMARY KEY,
+            total INTEGER NOT NULL DEFAULT 0,
+
+            -- HR标签
+            star_count INTEGER NOT NULL DEFAULT 0,
+            interview_count INTEGER NOT NULL DEFAULT 0,
+            pending_count INTEGER NOT NULL DEFAULT 0,
+            rejected_count INTEGER NOT NULL DEFAULT 0,
+            untagged_count INTEGER NOT NULL DEFAULT 0,
+
+            -- 推荐等级
+            highly_recommended_count INTEGER NOT NULL DEFAULT 0,
+            recommended_count INTEGER NOT NULL DEFAULT 0,
+            consider_count INTEGER NOT NULL DEFAULT 0,
+            not_recommended_count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS position_stats_after_insert
+        AFTER INSERT ON candidates
+        BEGIN
+            INSERT OR IGNORE INTO position_stats (position_id) VALUES (NEW.position_id);
+            {_stats_delta_sql('NEW', '+')}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS position_stats_after_delete
+        AFTER DELETE ON candidates
+        BEGIN
+            {_stats_delta_sql('OLD', '-')}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS position_stats_after_update
+        AFTER UPDATE OF position_id, hr_tag, recommendation_level ON candidates
+        BEGIN
+            {_stats_delta_sql('OLD', '-')}
+            INSERT OR IGNORE INTO position_stats (position_id) VALUES (NEW.position_id);
+            {_stats_delta_sql('NEW', '+')}
+        END
+    """)
+    rebuild_position_stats(conn)
+
+
+def _v2_import_legacy_positions(conn: sqlite3.Connection) -> None:
+    """导入旧的独立岗位库（保留岗位id，候选人的position_id不变）"""
+    legacy_path = Path(LEGACY_POSITIONS_DB_PATH)
+    if not legacy_path.exists():
+        return
+
+    legacy = sqlite3.connect(legacy_path)
+    try:
+        legacy.row_factory = sqlite3.Row
+        rows = legacy.execute("SELECT * FROM positions").fetchall()
+    except sqlite3.OperationalError:
+        rows = []
+    finally:
+        legacy.close()
+
+    conn.executemany(
+        """
+        INSERT OR IGNORE INTO positions (id, name, description, status, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (row.get("id"), row.get("name"), row.get("description"), row.get("status", "active"),
+             row.get("created_at"), row.get("updated_at"))
+            for row in map(dict, rows)
+        ]
+    )
+    logger.info(f"从{legacy_path}导入{len(rows)}个岗位")
+
+
+def _v3_resume_blobs(conn: sqlite3.Connection) -> None:
+    """简历原文件内容寻址存储，引用计数随候选人行增删自动维护"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS resume_blobs (
+            sha256 TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            ext TEXT,
+            ref_count INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_put_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # 只索引无引用的blob，垃圾回收时直接定位
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_resume_blobs_orphan ON resume_blobs(last_put_at) WHERE ref_count <= 0")
+
+    _add_column_if_missing(conn, "candidates", "blob_sha256", "TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_candidates_blob ON candidates(blob_sha256)")
+
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS resume_blobs_ref_after_insert
+        AFTER INSERT ON candidates
+        WHEN NEW.blob_sha256 IS NOT NULL
+        BEGIN
+            UPDATE resume_blobs SET ref_count = ref_count + 1 WHERE sha256 = NEW.blob_sha256;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS resume_blobs_ref_after_delete
+        AFTER DELETE ON candidates
+        WHEN OLD.blob_sha256 IS NOT NULL
+        BEGIN
+            UPDATE resume_blobs SET ref_count = ref_count - 1 WHERE sha256 = OLD.blob_sha256;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS resume_blobs_ref_after_update
+        AFTER UPDATE OF blob_sha256 ON candidates
+        WHEN OLD.blob_sha256 IS NOT NEW.blob_sha256
+        BEGIN
+            UPDATE resume_blobs SET ref_count = ref_count - 1 WHERE sha256 = OLD.blob_sha256;
+            UPDATE resume_blobs SET ref_count = ref_count + 1 WHERE sha256 = NEW.blob_sha256;
+        END
+    """)
+
+
+def _v4_prescreen_rules(conn: sqlite3.Connection) -> None:
+    """岗位的规则预筛阈值（JSON）"""
+    _add_column_if_missing(conn, "positions", "prescreen_rules", "TEXT")
+
+
+def _v5_person_profiles(conn: sqlite3.Connection) -> None:
+    """与岗位无关的人员档案（按简历内容hash），同一份简历投多个岗位时共用"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS person_profiles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            blob_sha256 TEXT NOT NULL UNIQUE,
+            name TEXT,
+            profile_json TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    _add_column_if_missing(conn, "candidates", "person_id", "INTEGER REFERENCES person_profiles(id) ON DELETE SET NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_candidates_person ON candidates(person_id)")
+
+    # 最后一个岗位的候选人删除后，人员档案随之删除
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS person_profiles_after_candidate_delete
+        AFTER DELETE ON candidates
+        WHEN OLD.person_id IS NOT NULL
+        BEGIN
+            DELETE FROM person_profiles
+            WHERE id = OLD.person_id
+              AND NOT EXISTS (SELECT 1 FROM candidates WHERE person_id = OLD.person_id);
+        END
+    """)
+
+
+def _v6_jd_versions(conn: sqlite3.Connection) -> None:
+    """岗位描述版本号：修改描述时自动加1，候选人记录评估所依据的版本，版本落后即为过期"""
+    _add_column_if_missing(conn, "positions", "jd_version", "INTEGER NOT NULL DEFAULT 1")
+    _add_column_if_missing(conn, "candidates", "jd_version", "INTEGER")
+    # 已有的评估视为基于当前版本
+    conn.execute("UPDATE candidates SET jd_version = 1 WHERE jd_version IS NULL")
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS positions_jd_version_after_update
+        AFTER UPDATE OF description ON positions
+        WHEN NEW.description IS NOT OLD.description
+        BEGIN
+            UPDATE positions SET jd_version = OLD.jd_version + 1 WHERE id = NEW.id;
+        END
+    """)
+
+
+def _bump_version_sql(select: str) -> str:
+    """生成把岗位数据版本号加1的语句，select产出岗位id（岗位0为全局版本：岗位列表和统计）"""
+    return f"""
+        INSERT INTO data_versions (position_id, version) {select}
+        ON CONFLICT(position_id) DO UPDATE SET version = version + 1;
+    """
+
+
+def _v7_data_versions(conn: sqlite3.Connection) -> None:
+    """按岗位的数据版本号，候选人/备注/岗位写入时由触发器加1，界面缓存以版本号为key"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS data_versions (
+            position_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+
+    def _values(*positions: str) -> str:
+        return "".join(_bump_version_sql(f"VALUES ({position}, 1)") for position in positions)
+
+    def _note_position(row: str) -> str:
+        return _bump_version_sql(f"SELECT position_id, 1 FROM candidates WHERE id = {row}.candidate_id")
+
+    triggers = {
+        "data_versions_candidates_insert": ("AFTER INSERT ON candidates", _values("NEW.position_id", "0")),
+        "data_versions_candidates_delete": ("AFTER DELETE ON candidates", _values("OLD.position_id", "0")),
+        "data_versions_notes_insert": ("AFTER INSERT ON candidate_notes", _note_position("NEW")),
+        "data_versions_notes_update": ("AFTER UPDATE ON candidate_notes", _note_position("NEW")),
+        "data_versions_notes_delete": ("AFTER DELETE ON candidate_notes", _note_position("OLD")),
+        "data_versions_positions_insert": ("AFTER INSERT ON positions", _values("NEW.id", "0")),
+        "data_versions_positions_delete": ("AFTER DELETE ON positions", _values("OLD.id", "0")),
+        # 人员档案被多个岗位共用，更新时这些岗位都要失效
+        "data_versions_person_profiles_update": ("AFTER UPDATE ON person_profiles", _bump_version_sql(
+            "SELECT DISTINCT position_id, 1 FROM candidates WHERE person_id = NEW.id"
+        )),
+    }
+    for name, (event, body) in triggers.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END")
+    _create_update_version_triggers(conn)
+
+
+# 由其他触发器嵌套更新的列（updated_at时间戳、描述修改后的jd_version），外层的写入已经加过版本号
+_VERSION_EXEMPT_COLUMNS = {
+    "candidates": ("updated_at",),
+    "positions": ("updated_at", "jd_version"),
+}
+
+
+def _create_update_version_triggers(conn: sqlite3.Connection) -> None:
+    """
+    候选人/岗位UPDATE时加版本号的触发器，用UPDATE OF限定为业务列，一次写入只加一次版本号
+
+    列清单在建触发器时确定，之后给这两张表加列的迁移需要再调用一次。
+    """
+    keys = {"candidates": "position_id", "positions": "id"}
+    for table, key in keys.items():
+        columns = [col for col in _column_names(conn, table) if col not in _VERSION_EXEMPT_COLUMNS[table]]
+        # 候选人换了岗位时原岗位也要失效
+        body = (_bump_version_sql(f"VALUES (NEW.{key}, 1), (0, 1)")
+                + _bump_version_sql(f"SELECT OLD.{key}, 1 WHERE OLD.{key} IS NOT NEW.{key}"))
+        conn.execute(f"DROP TRIGGER IF EXISTS data_versions_{table}_update")
+        conn.execute(f"""
+            CREATE TRIGGER data_versions_{table}_update
+            AFTER UPDATE OF {", ".join(columns)} ON {table}
+            BEGIN {body} END
+        """)
+
+
+def _v8_resume_fingerprints(conn: sqlite3.Connection) -> None:
+    """简历文本的MinHash签名和近似重复簇，候选人记录所属的簇（同簇即疑似同一人重复投递）"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS resume_fingerprints (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            blob_sha256 TEXT NOT NULL UNIQUE,
+            signature BLOB NOT NULL,
+            cluster_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    _add_column_if_missing(conn, "candidates", "dup_cluster_id", "INTEGER")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_candidates_dup_cluster ON candidates(position_id, dup_cluster_id)")
+
+
+def _v9_retrieval_labels(conn: sqlite3.Connection) -> None:
+    """检索评估用的标注：岗位描述对应的相关简历及相关程度（见bench.retrieval_eval）"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS retrieval_labels (
+            position_id INTEGER NOT NULL REFERENCES positions(id) ON DELETE CASCADE,
+            blob_sha256 TEXT NOT NULL,
+            relevance INTEGER NOT NULL DEFAULT 1,  -- 0不相关 1相关 2很相关 3最佳
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (position_id, blob_sha256)
+        )
+    """)
+
+
+def _v10_data_version_update_columns(conn: sqlite3.Connection) -> None:
+    """数据版本号的UPDATE触发器不再响应updated_at/jd_version的嵌套更新（此前每次写入加两次版本号）"""
+    _create_update_version_triggers(conn)
+
+
+def _v11_candidate_prescreen(conn: sqlite3.Connection) -> None:
+    """候选人入库时所用的预筛规则和结论：岗位描述修改后的重新评估只在规则改过时重新预筛"""
+    _add_column_if_missing(conn, "candidates", "prescreen_rules", "TEXT")  # 预筛规则JSON，NULL为未预筛
+    _add_column_if_missing(conn, "candidates", "prescreen_rejected", "INTEGER NOT NULL DEFAULT 0")
+    _create_update_version_triggers(conn)
+
+
+def get_data_version(conn: sqlite3.Connection, position_id: int = 0) -> int:
+    """岗位的数据版本号（position_id为0时为全局版本），数据有任何写入都会变化"""
+    row = conn.execute("SELECT version FROM data_versions WHERE position_id = ?", (position_id,)).fetchone()
+    return row[0] if row else 0
+
+
+MIGRATIONS: List[Callable[[sqlite3.Connection], None]] = [
+    _v1_base_schema,
+    _v2_import_legacy_positions,
+    _v3_resume_blobs,
+    _v4_prescreen_rules,
+    _v5_person_profiles,
+    _v6_jd_versions,
+    _v7_data_versions,
+    _v8_resume_fingerprints,
+    _v9_retrieval_labels,
+    _v10_data_version_update_columns,
+    _v11_candidate_prescreen,
+]
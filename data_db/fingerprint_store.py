@@ -0,0 +1,75 @@
+"""简历指纹数据访问
+
+保存每份简历文本的MinHash签名和所属的近似重复簇，供doc_ana.near_dup建立内存索引。
+指纹不随候选人删除：同一个人之后再投递时仍能识别为重复。
+"""
+
+import sqlite3
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from .database import DEFAULT_DB_PATH, connect, init_database
+from ..telemetry import traced_methods
+
+
+@traced_methods("store.fingerprint")
+class FingerprintStore:
+    """简历指纹管理"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+        init_database(self.db_path)
+
+    def add(
+        self,
+        blob_sha256: str,
+        signature: bytes,
+        find_cluster: Callable[[sqlite3.Connection], Optional[int]] = None,
+    ) -> Tuple[int, int]:
+        """
+        登记简历签名并归簇；已登记过的保持原记录
+
+        find_cluster在写事务（BEGIN IMMEDIATE）内调用，返回要加入的簇id（None为自成一簇）：
+        查找和登记之间其他进程插入不了新签名，多个worker同时登记近似相同的简历也会归入同一簇。
+
+        Returns:
+            (指纹id, 簇id)
+        """
+        with connect(self.db_path) as conn:
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cluster_id = find_cluster(conn) if find_cluster else None
+                conn.execute(
+                    "INSERT OR IGNORE INTO resume_fingerprints (blob_sha256, signature, cluster_id) VALUES (?, ?, ?)",
+                    (blob_sha256, signature, cluster_id)
+                )
+                conn.execute(
+                    "UPDATE resume_fingerprints SET cluster_id = id WHERE blob_sha256 = ? AND cluster_id IS NULL",
+                    (blob_sha256,)
+                )
+                row = conn.execute(
+                    "SELECT id, cluster_id FROM resume_fingerprints WHERE blob_sha256 = ?", (blob_sha256,)
+                ).fetchone()
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return tuple(row)
+
+    def load_since(self, last_id: int = 0) -> List[Tuple[int, str, bytes, int]]:
+        """id大于last_id的签名 [(id, blob_sha256, signature, cluster_id)]，按id升序"""
+        with connect(self.db_path) as conn:
+            return self._load_since(conn, last_id)
+
+    def _load_since(self, conn: sqlite3.Connection, last_id: int = 0) -> List[Tuple[int, str, bytes, int]]:
+        return conn.execute(
+            "SELECT id, blob_sha256, signature, cluster_id FROM resume_fingerprints WHERE id > ? ORDER BY id",
+            (last_id,)
+        ).fetchall()
+
+    def get_cluster(self, blob_sha256: str) -> Optional[int]:
+        """简历所属的近似重复簇id，未登记返回None"""
+        with connect(self.db_path) as conn:
+            row = conn.execute("SELECT cluster_id FROM resume_fingerprints WHERE blob_sha256 = ?", (blob_sha256,)).fetchone()
+            return row[0] if row else None
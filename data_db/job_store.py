@@ -0,0 +1,563 @@
+"""后台筛选任务队列
+
+批量上传的简历按文件拆成任务，存放在candidates.db旁边的jobs.db中，由独立的worker进程
+（见job_worker.py）按阶段 extract → embed → analyze → save 推进：
+    - 领取任务用BEGIN IMMEDIATE加租约，worker每完成一个阶段记录一次检查点并续租；
+      worker崩溃后任务从最后完成的阶段继续，不必整份重做
+    - 失败按指数退避+随机抖动重试，超过max_attempts后标记为failed，可手动重试
+    - 同一岗位重复上传同一份文件（内容sha256相同）不会重复建任务；之前的任务失败了、
+      或已完成但候选人已被删除时允许重新上传
+    - 岗位描述修改后，已有候选人的重新评估也作为任务入队（kind=reevaluate），按HR标签排优先级
+上传的文件先暂存到 <jobs.db目录>/job_files/<任务key>/<原文件名>，任务完成后删除。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .database import DEFAULT_JOBS_DB_PATH, connect, init_database
+from ..telemetry import traced_methods
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("extract", "embed", "analyze", "save")
+
+KIND_SCREEN = "screen"
+KIND_REEVALUATE = "reevaluate"
+
+# 重新评估的优先级（按HR标签）：星标、面试、未标记/待定的候选人排在新上传简历（0）之前，已淘汰的排最后
+REEVALUATION_PRIORITY = {"star": 3, "interview": 2, None: 1, "pending": 1, "rejected": -1}
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_CHUNK_SIZE = 1 << 20
+
+
+def _v1_job_schema(conn: sqlite3.Connection) -> None:
+    """任务批次与任务表（阶段检查点、租约、重试、幂等key）"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS job_batches(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            position_id INTEGER NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            duplicate_count INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            batch_id INTEGER NOT NULL REFERENCES job_batches(id) ON DELETE CASCADE,
+            position_id INTEGER NOT NULL,
+            file_name TEXT NOT NULL,
+            file_sha256 TEXT NOT NULL,
+            idempotency_key TEXT NOT NULL UNIQUE,
+            stage TEXT NOT NULL DEFAULT 'extract',
+            status TEXT NOT NULL DEFAULT 'queued',
+            priority INTEGER NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 5,
+            next_run_at REAL NOT NULL DEFAULT 0,
+            lease_owner TEXT,
+            lease_expires_at REAL,
+            payload TEXT NOT NULL DEFAULT '{}',
+            candidate_id INTEGER,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # 领取顺序：优先级高的先做，同优先级按入队顺序
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(status, priority DESC, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs(lease_expires_at) WHERE status = 'running'")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_batch ON jobs(batch_id, status)")
+
+
+def _v2_job_kinds(conn: sqlite3.Connection) -> None:
+    """任务类型：screen为新上传简历，reevaluate为岗位描述修改后重新评估已有候选人"""
+    for table in ("job_batches", "jobs"):
+        if "kind" not in [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN kind TEXT NOT NULL DEFAULT 'screen'")
+
+
+JOB_MIGRATIONS = [
+    _v1_job_schema,
+    _v2_job_kinds,
+]
+
+
+def job_key(position_id: int, file_sha256: str) -> str:
+    """幂等key：同一岗位同一份文件只处理一次"""
+    return f"{position_id}-{file_sha256}"
+
+
+def backoff_delay(attempts: int, base: float = 5.0, cap: float = 300.0) -> float:
+    """第attempts次失败后的等待秒数：指数退避，一半固定一半随机抖动，避免多个任务同时重试"""
+    delay = min(cap, base * 2 ** max(attempts - 1, 0))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+@traced_methods("store.job", exclude=("spool_path",))
+class JobStore:
+    """筛选任务队列"""
+
+    def __init__(self, db_path: str = DEFAULT_JOBS_DB_PATH, spool_dir: Optional[str] = None):
+        self.db_path = Path(db_path)
+        init_database(self.db_path, JOB_MIGRATIONS)
+        self.spool_dir = Path(spool_dir) if spool_dir else self.db_path.parent / "job_files"
+        self._tmp_dir = self.spool_dir / "tmp"
+        self._tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    def spool_path(self, job: Dict[str, Any]) -> Path:
+        """任务文件的暂存位置（保留原文件名，解析时候选人名取自文件名）"""
+        return self.spool_dir / job["idempotency_key"] / job["file_name"]
+
+    # ---------------- 入队 ----------------
+
+    def enqueue_batch(
+        self,
+        position_id: int,
+        files: Iterable[Tuple[str, BinaryIO]],
+        priority: int = 0,
+        max_attempts: int = 5,
+        candidate_exists: Callable[[int], bool] = None,
+    ) -> int:
+        """
+        一批简历入队
+
+        Args:
+            position_id: 岗位ID
+            files: (原文件名, 文件流) 列表，如Streamlit的UploadedFile可传 (f.name, f)
+            priority: 优先级，越大越先处理
+            max_attempts: 每个任务的最大尝试次数
+            candidate_exists: 判断候选人是否仍存在（CandidateStore.exists），
+                传入时已完成任务的候选人被删除后可以重新上传；不传时已完成的任务一律视为重复
+
+        Returns:
+            批次ID
+        """
+        with connect(self.db_path) as conn:
+            batch_id = conn.execute(
+                "INSERT INTO job_batches(position_id) VALUES (?)", (position_id,)
+            ).lastrowid
+
+        total, duplicates = 0, 0
+        for file_name, stream in files:
+            file_name = Path(file_name).name
+            tmp_name, sha256 = self._spool(stream)
+            key = job_key(position_id, sha256)
+            target = self.spool_dir / key / file_name
+            try:
+                with connect(self.db_path) as conn:
+                    existing = conn.execute(
+                        "SELECT id, batch_id, status, candidate_id FROM jobs WHERE idempotency_key = ?", (key,)
+                    ).fetchone()
+                    if existing and not self._release_key(conn, key, *existing, candidate_exists):
+                        duplicates += 1
+                        continue
+
+                    # 先落盘再登记：登记成功的任务一定能找到文件
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(tmp_name, target)
+                    cursor = conn.execute(
+                        """
+                        INSERT INTO jobs(batch_id, position_id, file_name, file_sha256, idempotency_key, priority, max_attempts)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(idempotency_key) DO NOTHING
+                        """,
+                        (batch_id, position_id, file_name, sha256, key, priority, max_attempts)
+                    )
+                    if cursor.rowcount:
+                        total += 1
+                    else:
+                        duplicates += 1
+            finally:
+                if os.path.exists(tmp_name):
+                    os.unlink(tmp_name)
+
+        with connect(self.db_path) as conn:
+            conn.execute(
+                "UPDATE job_batches SET total = ?, duplicate_count = ? WHERE id = ?",
+                (total, duplicates, batch_id)
+            )
+        logger.info(f"批次{batch_id}入队: 岗位{position_id}, 新任务{total}个, 重复{duplicates}个")
+        return batch_id
+
+    def _release_key(self, conn: sqlite3.Connection, key: str, job_id: int, batch_id: int, status: str, candidate_id: Optional[int], candidate_exists: Optional[Callable[[int], bool]]) -> bool:
+        """
+        同一文件再次上传时，之前的任务已失败、或已完成但候选人已被删除，则让出幂等key，返回是否已让出
+
+        失败的任务连同暂存文件删除，由新上传的任务代替；已完成的任务保留记录（所在批次的进度不变），
+        只给key加上任务id后缀。并发上传同一文件时只有一方能让出成功，另一方按重复处理。
+        """
+        if status == STATUS_FAILED:
+            if not conn.execute("DELETE FROM jobs WHERE id = ? AND status = ?", (job_id, STATUS_FAILED)).rowcount:
+                return False
+            conn.execute("UPDATE job_batches SET total = total - 1 WHERE id = ?", (batch_id,))
+            shutil.rmtree(self.spool_dir / key, ignore_errors=True)
+            logger.info(f"任务{job_id}此前失败，由重新上传的文件代替")
+            return True
+
+        if status == STATUS_DONE and candidate_id is not None and candidate_exists is not None and not candidate_exists(candidate_id):
+            cursor = conn.execute(
+                "UPDATE jobs SET idempotency_key = idempotency_key || '#' || id WHERE id = ? AND idempotency_key = ?",
+                (job_id, key)
+            )
+            if cursor.rowcount:
+                logger.info(f"任务{job_id}的候选人{candidate_id}已删除，允许重新上传")
+            return cursor.rowcount > 0
+        return False
+
+    def enqueue_reevaluation(self, position_id: int, jd_version: int, candidates: Iterable[Dict[str, Any]], source_path: Callable[[str], Path]) -> Optional[int]:
+        """
+        岗位描述修改后，已有候选人重新评估的任务入队
+
+        Args:
+            position_id: 岗位ID
+            jd_version: 修改后的岗位描述版本（同一版本重复入队是幂等的）
+            candidates: CandidateStore.get_stale的结果（id, file_name, blob_sha256, hr_tag）
+            source_path: 由blob hash取简历原文件路径（ResumeBlobStore.path）
+
+        Returns:
+            批次ID，没有过期的候选人时返回None；没有保存原文件（早于内容寻址存储的记录）或原文件已被清理的
+            候选人无法自动重新评估，计入批次的跳过数（duplicate_count），需要在界面上手动重新分析
+        """
+        candidates = list(candidates)
+        if not candidates:
+            return None
+        without_blob = sum(1 for c in candidates if not c.get("blob_sha256"))
+        candidates = [c for c in candidates if c.get("blob_sha256")]
+
+        with connect(self.db_path) as conn:
+            # 旧版本还没开始执行的重新评估任务作废，由新版本的任务代替
+            superseded = conn.execute(
+                "SELECT id, batch_id, idempotency_key FROM jobs WHERE kind = ? AND status = 'queued' AND position_id = ? AND attempts = 0",
+                (KIND_REEVALUATE, position_id)
+            ).fetchall()
+            for job_id, old_batch_id, old_key in superseded:
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+                conn.execute("UPDATE job_batches SET total = total - 1 WHERE id = ?", (old_batch_id,))
+                shutil.rmtree(self.spool_dir / old_key, ignore_errors=True)
+            conn.execute(
+                "DELETE FROM job_batches WHERE kind = ? AND position_id = ? AND NOT EXISTS (SELECT 1 FROM jobs WHERE batch_id = job_batches.id)",
+                (KIND_REEVALUATE, position_id)
+            )
+            batch_id = conn.execute(
+                "INSERT INTO job_batches(position_id, kind) VALUES (?, ?)", (position_id, KIND_REEVALUATE)
+            ).lastrowid
+
+        total, skipped = 0, without_blob
+        for candidate in candidates:
+            key = f"reevaluate-{candidate['id']}-v{jd_version}"
+            target = self.spool_dir / key / Path(candidate["file_name"]).name
+            source = Path(source_path(candidate["blob_sha256"]))
+            if not source.exists():
+                skipped += 1
+                continue
+
+            # 暂存一份带原文件名的链接（文本提取按扩展名识别格式），任务完成后随暂存目录删除
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if not target.exists():
+                try:
+                    os.link(source, target)
+                except OSError:
+                    shutil.copyfile(source, target)
+            with connect(self.db_path) as conn:
+                cursor = conn.execute(
+                    """
+                    INSERT INTO jobs(batch_id, position_id, file_name, file_sha256, idempotency_key, priority, kind, candidate_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(idempotency_key) DO NOTHING
+                    """,
+                    (batch_id, position_id, target.name, candidate["blob_sha256"], key,
+                     REEVALUATION_PRIORITY.get(candidate.get("hr_tag"), 1), KIND_REEVALUATE, candidate["id"])
+                )
+                if cursor.rowcount:
+                    total += 1
+                else:
+                    skipped += 1
+
+        with connect(self.db_path) as conn:
+            conn.execute(
+                "UPDATE job_batches SET total = ?, duplicate_count = ? WHERE id = ?",
+                (total, skipped, batch_id)
+            )
+        logger.info(f"岗位{position_id}描述更新到v{jd_version}，重新评估任务{total}个，跳过{skipped}个"
+                    f"（其中{without_blob}个没有保存原简历文件）")
+        return batch_id
+
+    def _spool(self, stream: BinaryIO) -> Tuple[str, str]:
+        """写入临时文件并计算sha256"""
+        digest = hashlib.sha256()
+        fd, tmp_name = tempfile.mkstemp(dir=self._tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                while True:
+                    chunk = stream.read(_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    tmp.write(chunk)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+        return tmp_name, digest.hexdigest()
+
+    # ---------------- worker ----------------
+
+    def claim(self, worker_id: str, lease_seconds: float = 600) -> Optional[Dict[str, Any]]:
+        """领取一个可执行的任务（排队中且已到重试时间，或租约已过期的运行中任务）"""
+        now = time.time()
+        with connect(self.db_path) as conn:
+            conn.isolation_level = None
+            conn.row_factory = sqlite3.Row
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    row = conn.execute(
+                        """
+                        SELECT * FROM jobs
+                        WHERE (status = 'queued' AND next_run_at <= ?)
+                           OR (status = 'running' AND lease_expires_at < ?)
+                        ORDER BY priority DESC, id
+                        LIMIT 1
+                        """,
+                        (now, now)
+                    ).fetchone()
+                    if row is None:
+                        conn.execute("COMMIT")
+                        return None
+                    if row["status"] == STATUS_QUEUED or row["attempts"] < row["max_attempts"]:
+                        break
+                    # 每次执行都让worker中断的任务不再重试
+                    conn.execute(
+                        """
+                        UPDATE jobs SET status = 'failed', last_error = ?, lease_owner = NULL,
+                            lease_expires_at = NULL, updated_at = CURRENT_TIMESTAMP
+                        WHERE id = ?
+                        """,
+                        (f"执行{row['attempts']}次均未完成（worker中断或超时）", row["id"])
+                    )
+
+                conn.execute(
+                    """
+                    UPDATE jobs SET status = 'running', lease_owner = ?, lease_expires_at = ?,
+                        attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                    """,
+                    (worker_id, now + lease_seconds, row["id"])
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        job = _row_to_job(row)
+        job.update(status=STATUS_RUNNING, lease_owner=worker_id, attempts=row["attempts"] + 1)
+        return job
+
+    def checkpoint(self, job_id: int, worker_id: str, next_stage: str, payload: Dict[str, Any], lease_seconds: float = 600) -> bool:
+        """记录阶段完成（保存中间结果并续租），租约已被其他worker接管时返回False"""
+        with connect(self.db_path) as conn:
+            cursor = conn.execute(
+                """
+                UPDATE jobs SET stage = ?, payload = ?, lease_expires_at = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND lease_owner = ? AND status = 'running'
+                """,
+                (next_stage, json.dumps(payload, ensure_ascii=False), time.time() + lease_seconds, job_id, worker_id)
+            )
+            return cursor.rowcount > 0
+
+    def complete(self, job_id: int, worker_id: str, candidate_id: int) -> bool:
+        """任务完成，删除暂存文件"""
+        with connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(
+                """
+                UPDATE jobs SET status = 'done', candidate_id = ?, payload = '{}', last_error = NULL,
+                    lease_owner = NULL, lease_expires_at = NULL, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND lease_owner = ? AND status = 'running'
+                """,
+                (candidate_id, job_id, worker_id)
+            )
+            if not cursor.rowcount:
+                return False
+            row = conn.execute("SELECT idempotency_key FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+        shutil.rmtree(self.spool_dir / row["idempotency_key"], ignore_errors=True)
+        return True
+
+    def fail(self, job_id: int, worker_id: str, error: str, retryable: bool = True) -> str:
+        """记录失败：可重试且次数未用完时退避后重新排队，否则标记failed，返回新状态"""
+        with connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                (job_id, worker_id)
+            ).fetchone()
+            if row is None:
+                return STATUS_RUNNING  # 租约已被接管，由新的worker处理
+
+            attempts, max_attempts = row
+            if retryable and attempts < max_attempts:
+                status, next_run_at = STATUS_QUEUED, time.time() + backoff_delay(attempts)
+            else:
+                status, next_run_at = STATUS_FAILED, 0
+
+            conn.execute(
+                """
+                UPDATE jobs SET status = ?, next_run_at = ?, last_error = ?,
+                    lease_owner = NULL, lease_expires_at = NULL, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+                """,
+                (status, next_run_at, error[:2000], job_id)
+            )
+        logger.warning(f"任务{job_id}失败(第{attempts}次, {status}): {error}")
+        return status
+
+    def requeue_expired(self, owner_prefix: str = None) -> int:
+        """
+        把租约过期的运行中任务放回队列（worker池启动时调用）
+
+        owner_prefix: 同时回收该前缀（如本机hostname）下的所有运行中任务，
+        本机重启后不必等租约过期
+        """
+        now = time.time()
+        with connect(self.db_path) as conn:
+            cursor = conn.execute(
+                """
+                UPDATE jobs SET status = 'queued', next_run_at = 0,
+                    lease_owner = NULL, lease_expires_at = NULL, updated_at = CURRENT_TIMESTAMP
+                WHERE status = 'running'
+                  AND (lease_expires_at < ? OR (? IS NOT NULL AND substr(lease_owner, 1, length(?)) = ?))
+                """,
+                (now, owner_prefix, owner_prefix, owner_prefix)
+            )
+            count = cursor.rowcount
+        if count:
+            logger.info(f"恢复未完成任务{count}个")
+        return count
+
+    def retry_failed(self, batch_id: int = None) -> int:
+        """失败任务重新排队（重新计算尝试次数）"""
+        with connect(self.db_path) as conn:
+            cursor = conn.execute(
+                """
+                UPDATE jobs SET status = 'queued', attempts = 0, next_run_at = 0, updated_at = CURRENT_TIMESTAMP
+                WHERE status = 'failed' AND (? IS NULL OR batch_id = ?)
+                """,
+                (batch_id, batch_id)
+            )
+            return cursor.rowcount
+
+    # ---------------- 进度 ----------------
+
+    def get_batch_progress(self, batch_id: int, error_limit: int = 20) -> Optional[Dict[str, Any]]:
+        """批次进度：各状态数量、运行中任务所处阶段、最近的失败原因"""
+        with connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            batch = conn.execute("SELECT * FROM job_batches WHERE id = ?", (batch_id,)).fetchone()
+            if batch is None:
+                return None
+
+            progress = _empty_progress(batch)
+            for row in conn.execute(
+                "SELECT status, stage, COUNT(*) AS n FROM jobs WHERE batch_id = ? GROUP BY status, stage",
+                (batch_id,)
+            ):
+                progress[row["status"]] += row["n"]
+                if row["status"] in (STATUS_QUEUED, STATUS_RUNNING):
+                    progress["stages"][row["stage"]] += row["n"]
+
+            progress["errors"] = [
+                dict(row) for row in conn.execute(
+                    """
+                    SELECT id, file_name, stage, status, attempts, last_error FROM jobs
+                    WHERE batch_id = ? AND last_error IS NOT NULL AND status != 'done'
+                    ORDER BY updated_at DESC LIMIT ?
+                    """,
+                    (batch_id, error_limit)
+                )
+            ]
+        return _finish_progress(progress)
+
+    def list_batches(self, position_id: int = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """最近的批次及其进度（不含失败明细）"""
+        with connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            batches = conn.execute(
+                """
+                SELECT * FROM job_batches
+                WHERE ? IS NULL OR position_id = ?
+                ORDER BY id DESC LIMIT ?
+                """,
+                (position_id, position_id, limit)
+            ).fetchall()
+            if not batches:
+                return []
+
+            progress = {batch["id"]: _empty_progress(batch) for batch in batches}
+            placeholders = ",".join("?" * len(progress))
+            for row in conn.execute(
+                f"""
+                SELECT batch_id, status, stage, COUNT(*) AS n FROM jobs
+                WHERE batch_id IN ({placeholders})
+                GROUP BY batch_id, status, stage
+                """,
+                list(progress)
+            ):
+                item = progress[row["batch_id"]]
+                item[row["status"]] += row["n"]
+                if row["status"] in (STATUS_QUEUED, STATUS_RUNNING):
+                    item["stages"][row["stage"]] += row["n"]
+
+        return [_finish_progress(item) for item in progress.values()]
+
+    def has_pending(self, batch_id: int = None) -> bool:
+        with connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT 1 FROM jobs WHERE status IN ('queued', 'running') AND (? IS NULL OR batch_id = ?) LIMIT 1",
+                (batch_id, batch_id)
+            ).fetchone()
+            return row is not None
+
+
+def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"] or "{}")
+    return job
+
+
+def _empty_progress(batch: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "batch_id": batch["id"],
+        "position_id": batch["position_id"],
+        "kind": batch["kind"],
+        "total": batch["total"],
+        "duplicate_count": batch["duplicate_count"],
+        "created_at": batch["created_at"],
+        STATUS_QUEUED: 0,
+        STATUS_RUNNING: 0,
+        STATUS_DONE: 0,
+        STATUS_FAILED: 0,
+        "stages": {stage: 0 for stage in STAGES},
+    }
+
+
+def _finish_progress(progress: Dict[str, Any]) -> Dict[str, Any]:
+    finished = progress[STATUS_DONE] + progress[STATUS_FAILED]
+    progress["finished"] = progress[STATUS_QUEUED] + progress[STATUS_RUNNING] == 0
+    progress["percent"] = round(finished / progress["total"] * 100, 1) if progress["total"] else 100.0
+    return progress
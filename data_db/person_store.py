@@ -0,0 +1,53 @@
+"""人员档案数据访问
+
+同一份简历（内容sha256相同）投递多个岗位时，工作经历、项目经历、技能、教育经历和工作年限只提取一次，
+保存在person_profiles中；各岗位的候选人行通过person_id关联，只保存与岗位描述相关的评估结果。
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .database import DEFAULT_DB_PATH, connect, init_database
+from ..data_model.candidate import PERSON_PROFILE_FIELDS, CandidateProfile
+from ..telemetry import traced_methods
+
+
+@traced_methods("store.person")
+class PersonStore:
+    """人员档案管理"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+        init_database(self.db_path)
+
+    def get_by_blob(self, blob_sha256: str) -> Optional[Dict[str, Any]]:
+        """按简历内容hash获取人员档案 {id, name, profile}，不存在返回None"""
+        with connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT id, name, profile_json FROM person_profiles WHERE blob_sha256 = ?",
+                (blob_sha256,)
+            ).fetchone()
+            if row is None:
+                return None
+            return {"id": row[0], "name": row[1], "profile": json.loads(row[2])}
+
+    def save(self, blob_sha256: str, profile: CandidateProfile) -> int:
+        """保存（或覆盖）简历对应的人员档案，只取与岗位无关的字段，返回档案id"""
+        with connect(self.db_path) as conn:
+            return self._save(conn, blob_sha256, profile)
+
+    def _save(self, conn: sqlite3.Connection, blob_sha256: str, profile: CandidateProfile) -> int:
+        conn.execute(
+            """
+            INSERT INTO person_profiles (blob_sha256, name, profile_json)
+            VALUES (?, ?, ?)
+            ON CONFLICT(blob_sha256) DO UPDATE SET
+                name = excluded.name,
+                profile_json = excluded.profile_json,
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            (blob_sha256, profile.name, profile.model_dump_json(include=set(PERSON_PROFILE_FIELDS)))
+        )
+        return conn.execute("SELECT id FROM person_profiles WHERE blob_sha256 = ?", (blob_sha256,)).fetchone()[0]
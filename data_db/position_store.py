@@ -2,56 +2,42 @@
 
 import sqlite3
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Dict, Any
 from datetime import datetime
-from ..data_model.position import Position
 
+from .blob_store import ResumeBlobStore
+from .database import DEFAULT_DB_PATH, POSITION_STATS_COLUMNS, POSITION_STATS_KEYS, connect, get_data_version, init_database
+from ..data_model.position import STATUS_DELETED, Position, PrescreenRules
+from ..telemetry import traced_methods
+
+@traced_methods("store.position")
 class PositionStore:
     """数据库岗位数据管理"""
 
-    def __init__(self,db_path:str = "./data_db/positions.db"):
+    def __init__(self,db_path:str = DEFAULT_DB_PATH):
         self.db_path = Path(db_path)
-        self.db_path.parent.mkdir(exist_ok=True)
-        self._init_database()
-
-    def _init_database(self):
-        """初始化数据库表"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS positions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    description TEXT NOT NULL,
-                    status TEXT DEFAULT 'active,'
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                            )
-            """)
-        
-            # 创建触发器:自动更新updated_at
-            conn.execute("""
-                CREATE TRIGGER IF NOT EXISTS update_positions_timestamp
-                AFTER UPDATE ON positions
-                BEGIN 
-                    UPDATE positions SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
-                END
-            """)
+        init_database(self.db_path)
+        self.blobs = ResumeBlobStore(db_path)
     
     def create(self, position:Position) -> int:
         """创建岗位"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute(
-                """
-                INSERT INTO positions (name, description,status),
-                VALUES(?, ?, ?)
-                """,
-                (position.name, position.description,position.status)
-            )
+        with connect(self.db_path) as conn:
+            return self._create(conn, position)
+
+    def _create(self, conn: sqlite3.Connection, position:Position) -> int:
+        cursor = conn.execute(
+            """
+            INSERT INTO positions (name, description,status,prescreen_rules)
+            VALUES(?, ?, ?, ?)
+            """,
+            (position.name, position.description,position.status,
+             position.prescreen_rules.model_dump_json() if position.prescreen_rules else None)
+        )
         return cursor.lastrowid
     
     def get_by_id(self, position_id:int) -> Optional[Position]:
         """根据id获取岗位信息"""
-        with sqlite3.connect(self.db_path) as conn:
+        with connect(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.execute(
                 "SELECT * FROM positions WHERE id = ?",
@@ -64,7 +50,7 @@ class PositionStore:
         
     def get_all(self,status:str = "active") -> List[Position]:
         """根据岗位状态获取所有岗位（默认active）"""
-        with sqlite3.connect(self.db_path) as conn:
+        with connect(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
             if status == "all":
                 cursor = conn.execute(
@@ -72,7 +58,7 @@ class PositionStore:
                 )
             else:
                 cursor = conn.execute(
-                    "SELECT * FROM positions WHERE status = ? ORDER BY created_at QESC",
+                    "SELECT * FROM positions WHERE status = ? ORDER BY created_at DESC",
                     (status,)
                 )
             rows = cursor.fetchall()
@@ -80,6 +66,10 @@ class PositionStore:
         
     def update(self,position_id:int, name:str = None,description:str = None,status: str = None) -> bool:
         """更新岗位信息"""
+        with connect(self.db_path) as conn:
+            return self._update(conn, position_id, name, description, status)
+
+    def _update(self, conn: sqlite3.Connection, position_id:int, name:str = None,description:str = None,status: str = None) -> bool:
         updates = []
         params=[]
 
@@ -98,27 +88,137 @@ class PositionStore:
         
         params.append(position_id)
         sql = f"UPDATE positions SET {', '.join(updates)} WHERE id =?"
+        cursor = conn.execute(sql, params)
+        return cursor.rowcount > 0
+        
+    def get_prescreen_rules(self, position_id:int) -> Optional[PrescreenRules]:
+        """获取岗位的规则预筛阈值（未设置返回None）"""
+        with connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT prescreen_rules FROM positions WHERE id = ?",
+                (position_id,)
+            ).fetchone()
+            return PrescreenRules.model_validate_json(row[0]) if row and row[0] else None
 
-        with  sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute(sql, params)
+    def set_prescreen_rules(self, position_id:int, rules:Optional[PrescreenRules]) -> bool:
+        """设置岗位的规则预筛阈值（None为取消预筛）"""
+        with connect(self.db_path) as conn:
+            cursor = conn.execute(
+                "UPDATE positions SET prescreen_rules = ? WHERE id = ?",
+                (rules.model_dump_json() if rules else None, position_id)
+            )
             return cursor.rowcount > 0
-        
+
+    def set_retrieval_labels(self, position_id:int, labels:Dict[str, int], replace:bool = False) -> int:
+        """
+        标注岗位描述对应的相关简历（用于检索评估）
+
+        Args:
+            labels: {简历文件hash: 相关程度}，0不相关 1相关 2很相关 3最佳
+            replace: 是否先清空该岗位已有的标注
+
+        Returns:
+            写入的条数
+        """
+        with connect(self.db_path) as conn:
+            if replace:
+                conn.execute("DELETE FROM retrieval_labels WHERE position_id = ?", (position_id,))
+            conn.executemany(
+                """
+                INSERT INTO retrieval_labels (position_id, blob_sha256, relevance) VALUES (?, ?, ?)
+                ON CONFLICT(position_id, blob_sha256) DO UPDATE SET relevance = excluded.relevance
+                """,
+                [(position_id, sha256, int(relevance)) for sha256, relevance in labels.items()]
+            )
+            return len(labels)
+
+    def label_from_hr_tags(self, position_id:int) -> int:
+        """按HR标签生成检索标注（star 3、interview 2、pending 1、rejected 0），不覆盖已有标注，返回新增条数"""
+        with connect(self.db_path) as conn:
+            cursor = conn.execute(
+                """
+                INSERT OR IGNORE INTO retrieval_labels (position_id, blob_sha256, relevance)
+                SELECT position_id, blob_sha256,
+                    CASE hr_tag WHEN 'star' THEN 3 WHEN 'interview' THEN 2 WHEN 'pending' THEN 1 ELSE 0 END
+                FROM candidates
+                WHERE position_id = ? AND blob_sha256 IS NOT NULL
+                  AND hr_tag IN ('star', 'interview', 'pending', 'rejected')
+                """,
+                (position_id,)
+            )
+            return cursor.rowcount
+
+    def get_retrieval_labels(self, position_id:int) -> Dict[str, int]:
+        """岗位的检索标注 {简历文件hash: 相关程度}"""
+        with connect(self.db_path) as conn:
+            rows = conn.execute(
+                "SELECT blob_sha256, relevance FROM retrieval_labels WHERE position_id = ?",
+                (position_id,)
+            ).fetchall()
+            return dict(rows)
+
+    def get_labelled_position_ids(self) -> List[int]:
+        """有检索标注（至少一份相关简历）的岗位id"""
+        with connect(self.db_path) as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT position_id FROM retrieval_labels WHERE relevance > 0 ORDER BY position_id"
+            ).fetchall()
+            return [row[0] for row in rows]
+
     def delete(self,position_id:int ,soft_delete:bool = True) -> bool:
-        """删除岗位"""
-        with sqlite3.connect(self.db_path) as conn:
-            if soft_delete:
-                cursor = conn.execute(
-                    "UPDATE positions SET status = 'delete' WHERE id = ?",
-                    (position_id,)
-                )
-            else:
-                cursor = conn.execute(
-                    "DELETE FROM positions WHERE id = ?",
-                    (position_id,)
-                )
-            return cursor.rowcount > 0
+        """删除岗位（硬删除会级联删除候选人，并清理不再被引用的简历原文件）"""
+        with connect(self.db_path) as conn:
+            deleted = self._delete(conn, position_id, soft_delete)
+        if deleted and not soft_delete:
+            self.blobs.collect_garbage()
+        return deleted
+
+    def _delete(self, conn: sqlite3.Connection, position_id:int, soft_delete:bool = True) -> bool:
+        if soft_delete:
+            cursor = conn.execute(
+                "UPDATE positions SET status = ? WHERE id = ?",
+                (STATUS_DELETED, position_id)
+            )
+        else:
+            cursor = conn.execute(
+                "DELETE FROM positions WHERE id = ?",
+                (position_id,)
+            )
+        return cursor.rowcount > 0
         
-    # def count_candidates(self,positions_id:int) -> int:
-    #     """统计岗位总候选人数量"""
+    def get_data_version(self) -> int:
+        """全局数据版本号（岗位列表或任一岗位统计有变化即变化），用作界面缓存的key"""
+        with connect(self.db_path) as conn:
+            return get_data_version(conn)
 
+    def count_candidates(self,position_id:int) -> int:
+        """统计岗位总候选人数量"""
+        with connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT total FROM position_stats WHERE position_id = ?",
+                (position_id,)
+            ).fetchone()
+            return row[0] if row else 0
 
+    def get_all_with_stats(self,status:str = "active") -> List[Dict[str,Any]]:
+        """获取岗位列表及其候选人统计（岗位与统计表联表，一次查询）"""
+        stats_columns = ", ".join(f"IFNULL(s.{col}, 0) AS {col}" for col in POSITION_STATS_COLUMNS)
+        sql = f"""
+            SELECT p.*, {stats_columns}
+            FROM positions p
+            LEFT JOIN position_stats s ON s.position_id = p.id
+        """
+        params = []
+        if status != "all":
+            sql += " WHERE p.status = ?"
+            params.append(status)
+        sql += " ORDER BY p.created_at DESC"
+
+        with connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            results = []
+            for row in conn.execute(sql, params).fetchall():
+                data = dict(row)
+                data['stats'] = {key: data.pop(col) for key, col in zip(POSITION_STATS_KEYS, POSITION_STATS_COLUMNS)}
+                results.append(data)
+            return results
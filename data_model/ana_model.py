@@ -20,6 +20,14 @@ class ProjectExperienceExtracted(BaseModel):
     description:str = Field(default="")
 
 
+class EducationExtracted(BaseModel):
+    """提取教育经历模型"""
+    school:Optional[str] = None
+    major:Optional[str] = None
+    degree:Optional[str] = None
+    end_time:Optional[str] = None
+
+
 class ResumeAnalysis(BaseModel):
     recommendation_level:str = Field(
         default="可考虑",
@@ -57,6 +65,16 @@ class ResumeAnalysis(BaseModel):
         description="项目经验列表"
     )
 
+    education: List[EducationExtracted] = Field(
+        default_factory=list,
+        description="教育经历列表"
+    )
+
+    skills: List[str] = Field(
+        default_factory=list,
+        description="简历中出现的技能关键词"
+    )
+
     analysis_success: bool = Field(default=True, description="AI是否分析完成")
     @field_validator('key_strengths', 'key_concerns')
     @classmethod
@@ -66,6 +84,20 @@ class ResumeAnalysis(BaseModel):
             return [item.strip() for item in v if item and item.strip()]
         return v
     
+    @field_validator('skills', mode='before')
+    @classmethod
+    def flatten_skills(cls, v):
+        """模型有时按类别分组返回技能（{"category":..., "items":[...]}），展开为关键词列表"""
+        if not isinstance(v, list):
+            return []
+        skills = []
+        for item in v:
+            if isinstance(item, dict):
+                skills.extend(str(s).strip() for s in item.get("items") or [] if s)
+            elif item:
+                skills.append(str(item).strip())
+        return [s for s in skills if s]
+
     @field_validator('recommendation_level')
     @classmethod
     def validate_level(cls,v):
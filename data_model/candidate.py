@@ -23,6 +23,16 @@ class Skills(BaseModel):
     category: str = Field(description="技能类别（例如：AI与数据技术，产品管理，编程语言）")
     items: List[str] = Field(description="该类别下的具体技能列表")
 
+class Education(BaseModel):
+    """教育经历"""
+    school: Optional[str] = Field(description="学校",default=None)
+    major: Optional[str] = Field(description="专业",default=None)
+    degree: Optional[str] = Field(description="学历（大专/本科/硕士/博士）",default=None)
+    end_time: Optional[str] = Field(description="毕业时间",default=None)
+
+# 与岗位无关的档案字段：同一份简历只提取一次，保存在人员档案（person_profiles）中
+PERSON_PROFILE_FIELDS = ("total_years_experience", "work_experience", "project_experience", "skills", "education")
+
 class CandidateProfile(BaseModel):
     """候选人完整档案"""
     # 基础信息
@@ -36,6 +46,7 @@ class CandidateProfile(BaseModel):
     work_experience: List[WorkExperience] = Field(description="工作经验列表",default_factory=list)
     project_experience: List[ProjectExperience] = Field(description="项目经历列表",default_factory=list)
     skills: List[Skills] = Field(description="技能列表",default_factory=list)
+    education: List[Education] = Field(description="教育经历列表",default_factory=list)
 
     # 2、AI分析
     recommendation_level: str = Field(default="可考虑",description="推荐等级")
@@ -58,7 +69,7 @@ class CandidateProfile(BaseModel):
 
     class Config:
         json_encoders = {
-            datetime: lambda v: v.isotime()if v else None
+            datetime: lambda v: v.isoformat() if v else None
         }
 
 
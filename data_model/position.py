@@ -1,16 +1,50 @@
 """岗位模型"""
-from typing import Optional
+import json
+from typing import List, Optional
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+
+# 学历从低到高
+DEGREE_LEVELS = ["大专", "本科", "硕士", "博士"]
+
+# 软删除后的岗位状态（已有数据库中即为'delete'）
+STATUS_DELETED = "delete"
+
+
+class PrescreenRules(BaseModel):
+    """岗位的规则预筛阈值（LLM分析前执行，见doc_ana.prescreen）"""
+    enabled: bool = Field(default=True, description="是否启用预筛")
+    must_have: List[str] = Field(default_factory=list, description="必备关键词，同义写法用|分隔，如 Python|py")
+    min_term_ratio: float = Field(default=1.0, ge=0, le=1, description="必备关键词至少命中的比例")
+    min_degree: Optional[str] = Field(default=None, description="最低学历：大专/本科/硕士/博士")
+    min_years: Optional[float] = Field(default=None, ge=0, description="最低工作年限")
+
+    @field_validator('min_degree')
+    @classmethod
+    def validate_degree(cls, v):
+        if v and v not in DEGREE_LEVELS:
+            raise ValueError(f"学历必须是{'/'.join(DEGREE_LEVELS)}之一")
+        return v or None
+
 
 class Position(BaseModel):
     id:Optional[int] = None
     name: str = Field(description="岗位的名称")
     description: str = Field(description="详细、完整的岗位描述")
-    status: str = Field(default="active", description="该岗位的状态:active/inactive/deleted")
+    status: str = Field(default="active", description="该岗位的状态:active/inactive/delete")
+    jd_version: int = Field(default=1, description="岗位描述版本号，每次修改描述加1")
+    prescreen_rules: Optional[PrescreenRules] = Field(default=None, description="规则预筛阈值，None为不预筛")
     created_at: Optional[datetime] = None
     updated_at:Optional[datetime] = None
 
+    @field_validator('prescreen_rules', mode='before')
+    @classmethod
+    def parse_rules(cls, v):
+        """数据库中以JSON文本保存"""
+        if isinstance(v, str):
+            return json.loads(v) if v else None
+        return v
+
     class Config:
         json_encoders = {
             datetime:lambda v:v.isoformat() if v else None
@@ -0,0 +1,264 @@
+"""简历文本压缩
+
+在extract_text_from_file之后、拼接Prompt之前执行，减少送给LLM的prompt token：
+    1. 规范空白：全角空格/不间断空格/零宽字符、连续空格、多余空行
+    2. 去掉页面装饰：页码行，多页PDF每页重复的页眉页脚（保留第一次出现；只有页码不同也算重复，
+       含日期的行不算页眉页脚）
+    3. 去掉联系方式：电话、邮箱、微信、QQ、住址、身份证等（与评估无关）
+    4. 按小节切分，兴趣爱好、作品集等低价值小节直接丢弃
+    5. 超出token预算时按小节优先级保留（工作经历 > 项目经历 > 技能 > 教育 > ...），
+       放不下的小节从前往后截断（简历通常按时间倒序，靠前的是最近的经历）
+"""
+
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKEN_BUDGET = 3000
+
+# 小节关键词 -> (小节类型, 优先级)，优先级数字越小越先保留
+SECTION_KEYWORDS: List[Tuple[Tuple[str, ...], str, int]] = [
+    (("工作经历", "工作经验", "职业经历", "实习经历", "任职经历"), "work", 0),
+    (("项目经历", "项目经验", "项目案例"), "projects", 1),
+    (("核心技能", "专业技能", "技能特长", "技术栈", "技能"), "skills", 2),
+    (("教育背景", "教育经历", "学历"), "education", 3),
+    (("基本信息", "个人信息", "个人资料", "联系方式"), "basic_info", 4),
+    (("求职意向", "期望职位"), "objective", 4),
+    (("证书", "资格证书", "荣誉", "获奖", "所获奖项"), "awards", 5),
+    (("培训经历", "培训"), "training", 5),
+    (("语言能力", "外语"), "languages", 6),
+    (("自我评价", "个人评价", "自我介绍", "个人总结"), "self_evaluation", 6),
+    (("兴趣爱好", "爱好", "个人爱好"), "hobbies", 9),
+    (("作品集", "作品展示", "作品", "附件"), "portfolio", 9),
+]
+
+# 不送给LLM的小节
+DEFAULT_DROP_SECTIONS = ("hobbies", "portfolio")
+
+# 第一个标题之前的内容（通常是姓名和一句话介绍）
+_HEADER_PRIORITY = 4
+
+_HEADING_STRIP = "•·●■◆◇□▪►▶-—*#【】[]（）()：:|　 \t0123456789一二三四五六七八九十、.．"
+
+_PAGE_NUMBER = re.compile(
+    r"^(第\s*\d+\s*页(\s*[/／,，]?\s*共\s*\d+\s*页)?|[-—–\s]*\d+\s*[-—–\s]*|page\s*\d+(\s*(of|/)\s*\d+)?|\d+\s*/\s*\d+)$",
+    re.I,
+)
+
+# 页眉页脚中随页变化的页码部分，判断重复时忽略；其他数字（如工作经历的起止日期）保持原样
+_PAGE_FRAGMENT = re.compile(r"第\s*\d+\s*页|共\s*\d+\s*页|page\s*\d+(\s*(of|/)\s*\d+)?|(?<![\d.])\d+\s*/\s*\d+(?![\d.])", re.I)
+
+# 含日期的行是经历内容，即使重复出现多次也不当作页眉页脚
+_DATE = re.compile(r"(19|20)\d{2}\s*[./／年\-—–]|至今")
+
+_CONTACT_PATTERNS = [
+    re.compile(r"(?<!\d)1[3-9]\d[\s-]?\d{4}[\s-]?\d{4}(?!\d)"),           # 手机
+    re.compile(r"(?<!\d)0\d{2,3}[\s-]?\d{7,8}(?!\d)"),                    # 座机
+    re.compile(r"[\w.+-]+@[\w-]+(\.[\w-]+)+"),                            # 邮箱
+    re.compile(r"(?<![\dXx])\d{17}[\dXx](?![\dXx])"),                      # 身份证
+    re.compile(r"(电话|手机|联系方式|邮箱|e-?mail|微信|wechat|qq|住址|家庭住址|通讯地址|现居|身份证|籍贯|出生日期|政治面貌|民族|婚姻)\s*[:：]", re.I),
+]
+
+_CJK = re.compile(r"[一-鿿]")
+_INVISIBLE = re.compile(r"[​‌‍⁠﻿]")
+
+
+@dataclass
+class Section:
+    kind: str
+    priority: int
+    lines: List[str] = field(default_factory=list)
+
+
+@dataclass
+class CompactionResult:
+    text: str
+    original_tokens: int
+    compacted_tokens: int
+    dropped_sections: List[str] = field(default_factory=list)
+    truncated_sections: List[str] = field(default_factory=list)
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens - self.compacted_tokens
+
+
+def estimate_tokens(text: str) -> int:
+    """估算token数：中文约1字1token，其余约4个字符1token（与Qwen分词器的量级一致）"""
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def compact_resume(
+    text: str,
+    token_budget: Optional[int] = DEFAULT_TOKEN_BUDGET,
+    drop_sections: Tuple[str, ...] = DEFAULT_DROP_SECTIONS,
+    strip_contacts: bool = True,
+) -> CompactionResult:
+    """
+    压缩简历文本
+
+    Args:
+        text: extract_text_from_file得到的简历全文
+        token_budget: 压缩后的token上限，None为不限制
+        drop_sections: 直接丢弃的小节类型
+        strip_contacts: 是否去掉联系方式行
+
+    Returns:
+        压缩结果（含压缩前后的token估算）
+    """
+    original_tokens = estimate_tokens(text)
+    lines = _normalize_lines(text)
+    lines = _strip_page_furniture(lines)
+    if strip_contacts:
+        lines = [line for line in lines if not _is_contact_line(line)]
+
+    sections = _split_sections(lines)
+    dropped = [s.kind for s in sections if s.kind in drop_sections]
+    sections = [s for s in sections if s.kind not in drop_sections]
+
+    truncated: List[str] = []
+    if token_budget is not None:
+        sections, truncated = _fit_budget(sections, token_budget)
+
+    compacted = _join(sections)
+    result = CompactionResult(
+        text=compacted,
+        original_tokens=original_tokens,
+        compacted_tokens=estimate_tokens(compacted),
+        dropped_sections=dropped,
+        truncated_sections=truncated,
+    )
+    logger.debug(f"简历压缩: {result.original_tokens} -> {result.compacted_tokens} tokens"
+                 f"（丢弃{dropped or '无'}，截断{truncated or '无'}）")
+    return result
+
+
+def _normalize_lines(text: str) -> List[str]:
+    text = _INVISIBLE.sub("", text).replace("　", " ").replace("\xa0", " ").replace("\r", "\n")
+    lines = []
+    previous = None
+    for raw in text.split("\n"):
+        line = re.sub(r"[ \t\f\v]+", " ", raw).strip()
+        if not line:
+            # 连续空行只保留一个
+            if lines and lines[-1] != "":
+                lines.append("")
+            continue
+        if line == previous:
+            continue  # 紧邻重复行（PDF提取时常见）
+        lines.append(line)
+        previous = line
+    while lines and lines[-1] == "":
+        lines.pop()
+    return lines
+
+
+def _furniture_key(line: str) -> Optional[str]:
+    """页眉页脚候选行的比较key（去掉页码），不可能是页眉页脚的行返回None"""
+    if not line or len(line) > 40 or _DATE.search(line):
+        return None
+    return _PAGE_FRAGMENT.sub("#", line)
+
+
+def _strip_page_furniture(lines: List[str]) -> List[str]:
+    """
+    去掉页码行，以及重复出现3次以上的短行（页眉页脚，只有页码不同也算同一行）
+
+    多段工作经历的起止日期格式相同，不能当作页眉页脚去重：
+
+    >>> jobs = ["2021.07 - 2024.03", "产品经理", "2018.07 - 2021.06", "产品专员", "2016.07 - 2018.06", "助理", "2014.07 - 2016.06"]
+    >>> _strip_page_furniture(jobs) == jobs
+    True
+    >>> _strip_page_furniture(["张三 个人简历 第1页", "工作经历", "张三 个人简历 第2页", "项目经历", "张三 个人简历 第3页"])
+    ['张三 个人简历 第1页', '工作经历', '项目经历']
+    """
+    counts = Counter(key for key in map(_furniture_key, lines) if key is not None)
+    seen = set()
+    kept = []
+    for line in lines:
+        if line and _PAGE_NUMBER.match(line):
+            continue
+        key = _furniture_key(line)
+        if key is not None and counts[key] >= 3 and not _heading_kind(line):
+            if key in seen:
+                continue
+            seen.add(key)
+        kept.append(line)
+    return kept
+
+
+def _is_contact_line(line: str) -> bool:
+    """整行主要是联系方式时返回True（夹在经历描述里的号码不影响整行）"""
+    if not line:
+        return False
+    rest = line
+    for pattern in _CONTACT_PATTERNS:
+        rest = pattern.sub("", rest)
+    if rest == line:
+        return False
+    return len(rest.strip(_HEADING_STRIP + ",，;；/")) <= 4
+
+
+def _heading_kind(line: str) -> Optional[Tuple[str, int]]:
+    if len(line) > 20:
+        return None
+    title = line.strip(_HEADING_STRIP)
+    if not title or len(title) > 8:
+        return None
+    for keywords, kind, priority in SECTION_KEYWORDS:
+        if any(title == keyword or (title.startswith(keyword) and len(title) <= len(keyword) + 4) for keyword in keywords):
+            return kind, priority
+    return None
+
+
+def _split_sections(lines: List[str]) -> List[Section]:
+    sections = [Section("header", _HEADER_PRIORITY)]
+    for line in lines:
+        heading = _heading_kind(line) if line else None
+        if heading:
+            sections.append(Section(heading[0], heading[1], [line]))
+        else:
+            sections[-1].lines.append(line)
+    return [s for s in sections if any(s.lines)]
+
+
+def _fit_budget(sections: List[Section], budget: int) -> Tuple[List[Section], List[str]]:
+    """按优先级分配token预算，返回保留下来的小节（原顺序）和被截断的小节类型"""
+    order = sorted(range(len(sections)), key=lambda i: (sections[i].priority, i))
+    remaining = budget
+    kept: Dict[int, Section] = {}
+    truncated = []
+    for i in order:
+        section = sections[i]
+        cost = estimate_tokens("\n".join(section.lines)) + 1
+        if cost <= remaining:
+            kept[i] = section
+            remaining -= cost
+            continue
+
+        # 放不下时保留靠前的行（标题 + 最近的经历）
+        partial = Section(section.kind, section.priority)
+        for line in section.lines:
+            line_cost = estimate_tokens(line) + 1
+            if line_cost > remaining:
+                break
+            partial.lines.append(line)
+            remaining -= line_cost
+        if len(partial.lines) > (1 if _heading_kind(section.lines[0] or "") else 0):
+            kept[i] = partial
+        truncated.append(section.kind)
+    return [kept[i] for i in sorted(kept)], truncated
+
+
+def _join(sections: List[Section]) -> str:
+    blocks = []
+    for section in sections:
+        block = "\n".join(section.lines).strip("\n")
+        if block:
+            blocks.append(block)
+    return "\n\n".join(blocks)
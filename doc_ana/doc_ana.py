@@ -1,18 +1,28 @@
 import logging
 from pathlib import Path
-from typing import Tuple
+from typing import Any, Dict, Tuple
 from llama_index.core import  SimpleDirectoryReader
 import pypdf
 import docx2txt
 
+from ..telemetry import traced
+from .ocr import ocr_fallback
+from .prescreen import AhoCorasick
 
 logger = logging.getLogger(__name__)
 
-def extract_text_from_file(file_path:str) ->  Tuple[str, bool]:
+_RESUME_KEYWORDS = AhoCorasick([
+    "教育", "学历", "工作", "经验", "技能", "项目",
+    "姓名", "联系", "电话", "邮箱", "职责", "任职",
+    "大学", "本科", "硕士", "博士", "公司", "负责"
+])
+
+@traced("extract", outcome=lambda result: result[1])
+def extract_text_from_file(file_path:str, ocr: Dict[str, Any] = None, sha256: str = None) ->  Tuple[str, bool]:
     """
-    从简历文件路径提取文本
-    
-    Args:简历路径
+    从简历文件路径提取文本，PDF提取不到文字（扫描件）时OCR识别
+
+    Args:简历路径；ocr为config["ocr"]；sha256为文件hash（OCR缓存键，已知时传入）
     Returns:提取是否成功
     """
     # llamaindex simpleDirectoryReader
@@ -72,7 +82,14 @@ def extract_text_from_file(file_path:str) ->  Tuple[str, bool]:
             logger.warning(f"TXT提取失败{e}")
 
 
-    # ===== 策略 3: 完全失败 =====
+    # ===== 策略 3: 扫描件OCR =====
+    if ext == '.pdf':
+        text = ocr_fallback(file_path, ocr, sha256)
+        if len(text.strip()) > 50:
+            logger.info(f"OCR提取成功{file_path}")
+            return text, True
+
+    # ===== 策略 4: 完全失败 =====
     logger.error(f"提取失败: {file_path}")
     return "", False
 
@@ -90,14 +107,8 @@ def validate_resume_content(text: str) -> bool:
         logger.warning(f"⚠️ 文本过短: {len(text)} 字符")
         return False
 
-    # 规则 2: 关键词检查
-    resume_keywords = [
-        "教育", "学历", "工作", "经验", "技能", "项目",
-        "姓名", "联系", "电话", "邮箱", "职责", "任职",
-        "大学", "本科", "硕士", "博士", "公司", "负责"
-    ]
-
-    keyword_count = sum(1 for kw in resume_keywords if kw in text)
+    # 规则 2: 关键词检查（一次扫描匹配全部关键词）
+    keyword_count = len(_RESUME_KEYWORDS.find_all(text))
 
     if keyword_count < 2:
         logger.warning(f"⚠️ 关键词匹配不足: 仅匹配 {keyword_count} 个")
@@ -106,6 +117,3 @@ def validate_resume_content(text: str) -> bool:
     logger.info(f"✅ 简历内容验证通过 (长度: {len(text)}, 关键词: {keyword_count})")
     return True
 
-
-res = extract_text_from_file("D:\Workspace\RAGFlowOM\JDsx\\v0\\jddoc\李静.docx")
-print(res)
\ No newline at end of file
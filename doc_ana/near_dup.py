@@ -0,0 +1,196 @@
+"""简历近似重复检测
+
+同一个人修改几处后重新投递、或中介换个文件名再发一次，文件hash不同但内容几乎一样。
+这里用MinHash估计两份简历文本的Jaccard相似度（字符3-gram集合），超过阈值即视为近似重复：
+    - 单次置换MinHash：每个3-gram只哈希一次（blake2b），按哈希值分到128个桶，每桶保留最小值，
+      空桶从右侧最近的非空桶借值；两个签名取值相同的桶的比例即Jaccard相似度的估计
+    - LSH：128个桶分成16段，每段8个值，任一段完全相同才作为候选再估计相似度，
+      查询只比较少量候选，不随库大小线性增长（相似度0.8时命中概率约95%，0.5时约6%）；
+      套用同一模板的简历会让个别段的候选很多，按相同段数从多到少最多比较max_candidates个
+    - 签名持久化在SQLite（resume_fingerprints），进程内常驻一份分段索引，定期增量加载其他进程新增的行
+    - 近似重复的简历归入同一个簇（簇id为簇内第一份简历的指纹id）
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from ..data_db.fingerprint_store import FingerprintStore
+
+NUM_BINS = 128
+BANDS = 16
+ROWS = NUM_BINS // BANDS
+DEFAULT_MIN_SIMILARITY = 0.8
+DEFAULT_MAX_CANDIDATES = 256
+
+_NOISE = re.compile(r"[\s\W_]+", re.UNICODE)
+_EMPTY = 0xFFFF
+# 把签名当作一个大整数一次比较所有桶时，逐步折叠每个16位值所用的掩码（只保留每个值的低8/4/2/1位）
+_FOLD_MASKS = [(shift, int.from_bytes(((1 << shift) - 1).to_bytes(2, "little") * NUM_BINS, "little")) for shift in (8, 4, 2, 1)]
+
+
+def minhash(text: str, ngram: int = 3) -> bytes:
+    """文本的MinHash签名（忽略空白和标点，英文不区分大小写），NUM_BINS个16位值"""
+    text = _NOISE.sub("", text.lower())
+    shingles = {text[i:i + ngram] for i in range(max(len(text) - ngram + 1, 1))}
+    signature = [_EMPTY] * NUM_BINS
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+        b = h % NUM_BINS
+        value = (h >> 48) % _EMPTY
+        if value < signature[b]:
+            signature[b] = value
+    _densify(signature)
+    return array("H", signature).tobytes()
+
+
+def _densify(signature: List[int]) -> None:
+    """空桶从右侧（循环）最近的非空桶借值，短文本的签名仍然可比"""
+    if all(value == _EMPTY for value in signature):
+        return
+    for b in range(NUM_BINS):
+        offset = 0
+        while signature[(b + offset) % NUM_BINS] == _EMPTY:
+            offset += 1
+        signature[b] = signature[(b + offset) % NUM_BINS]
+
+
+def similarity(a: bytes, b: bytes) -> float:
+    """两个签名估计的Jaccard相似度"""
+    return _similarity(int.from_bytes(a, "little"), int.from_bytes(b, "little"))
+
+
+def _similarity(a: int, b: int) -> float:
+    # 异或后把每个16位值的非零位折叠到最低位（每步用掩码截断，避免相邻值的位移进来），数出取值不同的桶
+    diff = a ^ b
+    for shift, mask in _FOLD_MASKS:
+        diff = (diff | (diff >> shift)) & mask
+    return 1 - diff.bit_count() / NUM_BINS
+
+
+def band_keys(signature: bytes) -> List[bytes]:
+    step = ROWS * 2
+    return [signature[i:i + step] for i in range(0, len(signature), step)]
+
+
+@dataclass
+class DuplicateMatch:
+    blob_sha256: str
+    fingerprint_id: int
+    cluster_id: int
+    similarity: float
+
+
+class NearDupIndex:
+    """
+    近似重复索引
+
+    同一进程内共用一个实例（见get_index）；多个worker进程各自持有一份，
+    查询时若距上次加载超过refresh_interval秒，先增量加载其他进程新写入的签名。
+    """
+
+    def __init__(
+        self,
+        store: FingerprintStore,
+        min_similarity: float = DEFAULT_MIN_SIMILARITY,
+        max_candidates: int = DEFAULT_MAX_CANDIDATES,
+        refresh_interval: float = 1.0,
+    ):
+        self.store = store
+        self.min_similarity = min_similarity
+        self.max_candidates = max_candidates
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._refreshed_at = None
+        self._rows: Dict[int, tuple] = {}  # 指纹id -> (blob_sha256, 签名（整数）, cluster_id)
+        self._bands: List[Dict[bytes, List[int]]] = [{} for _ in range(BANDS)]
+
+    def _refresh(self, conn: sqlite3.Connection = None) -> None:
+        """增量加载其他进程新写入的签名；传入conn（登记时的写事务）时不看刷新间隔，必定加载"""
+        now = time.monotonic()
+        if conn is None:
+            if self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval:
+                return
+            rows = self.store.load_since(self._last_id)
+        else:
+            rows = self.store._load_since(conn, self._last_id)
+        for fid, sha256, signature, cluster_id in rows:
+            self._index(fid, sha256, signature, cluster_id)
+            self._last_id = fid
+        self._refreshed_at = now
+
+    def _index(self, fid: int, sha256: str, signature: bytes, cluster_id: int) -> None:
+        if fid in self._rows:
+            return
+        self._rows[fid] = (sha256, int.from_bytes(signature, "little"), cluster_id)
+        for band, key in zip(self._bands, band_keys(signature)):
+            band.setdefault(key, []).append(fid)
+
+    def find(self, signature: bytes, exclude_sha256: str = None) -> Optional[DuplicateMatch]:
+        """最相似的近似重复简历（不含exclude_sha256本身），没有返回None"""
+        with self._lock:
+            self._refresh()
+            return self._find(signature, exclude_sha256)
+
+    def _find(self, signature: bytes, exclude_sha256: str = None) -> Optional[DuplicateMatch]:
+        shared = Counter()
+        for band, key in zip(self._bands, band_keys(signature)):
+            shared.update(band.get(key, ()))
+
+        value = int.from_bytes(signature, "little")
+        best = None
+        for fid, _ in shared.most_common(self.max_candidates):
+            sha256, other, cluster_id = self._rows[fid]
+            if sha256 == exclude_sha256:
+                continue
+            score = _similarity(value, other)
+            if score >= self.min_similarity and (best is None or score > best.similarity):
+                best = DuplicateMatch(sha256, fid, cluster_id, score)
+        return best
+
+    def add(self, blob_sha256: str, signature: bytes) -> Tuple[int, Optional[DuplicateMatch]]:
+        """
+        登记简历签名并归簇
+
+        查找在登记的写事务内进行：先加载其他进程已提交的签名再查找，查找到插入之间不会有新签名写入，
+        两个worker同时处理近似相同的简历时，后登记的一方一定能看到先登记的一方。
+
+        Returns:
+            (簇id, 最相似的近似重复简历)；没有近似重复时自成一簇，第二项为None
+        """
+        match = None
+
+        def _find_cluster(conn: sqlite3.Connection) -> Optional[int]:
+            nonlocal match
+            self._refresh(conn)
+            match = self._find(signature, exclude_sha256=blob_sha256)
+            return match.cluster_id if match else None
+
+        with self._lock:
+            fid, cluster_id = self.store.add(blob_sha256, signature, _find_cluster)
+            # 本进程写入的直接加入索引；_last_id只随加载推进，避免漏掉其他进程写在前面的行
+            self._index(fid, blob_sha256, signature, cluster_id)
+        return cluster_id, match
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+_indexes: Dict[tuple, NearDupIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(db_path: str, min_similarity: float = DEFAULT_MIN_SIMILARITY) -> NearDupIndex:
+    """进程内共用的近似重复索引"""
+    with _indexes_lock:
+        key = (str(db_path), min_similarity)
+        if key not in _indexes:
+            _indexes[key] = NearDupIndex(FingerprintStore(db_path), min_similarity)
+        return _indexes[key]
@@ -0,0 +1,209 @@
+"""扫描件/纯图片PDF简历的OCR兜底
+
+只在文本提取失败（提取到的文字不足50字）时调用：
+    - pypdfium2把页面渲染成图片，pytesseract调用本机安装的tesseract识别（默认chi_sim+eng，
+      需安装tesseract及chi_sim语言包）；两者均为可选依赖，未安装时OCR不可用，提取照常失败
+    - 主线程逐页渲染（pdfium不是线程安全的，单页只需几十毫秒），识别交给线程池，
+      每页一个tesseract子进程，多页并行占满多个核；子进程内限制为单线程，避免核数超订
+    - 每个文件最多识别max_pages页、总共time_budget秒，超时的页直接放弃
+    - 识别结果按文件内容sha256缓存到<数据库目录>/ocr_cache，同一份文件（投递多个岗位、
+      extract和embed阶段、任务重试）只识别一次；一页都没识别出来或因超时少识别了页的结果不缓存，
+      下次（如任务重试时机器不忙）重新识别
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Union
+
+from ..data_db.database import DEFAULT_DB_PATH
+from ..telemetry import span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LANG = "chi_sim+eng"
+DEFAULT_CACHE_DIR = Path(DEFAULT_DB_PATH).parent / "ocr_cache"
+
+_available: Dict[str, bool] = {}
+_available_lock = threading.Lock()
+
+
+@dataclass
+class OcrResult:
+    text: str
+    pages: int  # 在预算内识别完成的页数
+    total_pages: int
+    truncated: bool = False  # 因页数或时间预算没有识别完
+    cached: bool = False
+
+
+def ocr_available(lang: str = DEFAULT_LANG) -> bool:
+    """pypdfium2、pytesseract和tesseract（含所需语言包）是否都可用，结果在进程内缓存"""
+    with _available_lock:
+        if lang not in _available:
+            _available[lang] = _check_available(lang)
+        return _available[lang]
+
+
+def _check_available(lang: str) -> bool:
+    try:
+        import pypdfium2  # noqa: F401
+        import pytesseract
+    except ImportError:
+        logger.warning("未安装pypdfium2/pytesseract，扫描件简历无法OCR")
+        return False
+    try:
+        installed = set(pytesseract.get_languages(config=""))
+    except Exception as e:
+        logger.warning(f"tesseract不可用，扫描件简历无法OCR: {e}")
+        return False
+    missing = [code for code in lang.split("+") if code not in installed]
+    if missing:
+        logger.warning(f"tesseract缺少语言包{missing}，扫描件简历无法OCR")
+        return False
+    return True
+
+
+def file_sha256(file_path: Union[str, Path]) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_path(cache_dir: Path, sha256: str) -> Path:
+    return cache_dir / sha256[:2] / f"{sha256}.json"
+
+
+def _write_cache(path: Path, result: OcrResult) -> None:
+    """写临时文件后os.replace，并发识别同一文件的进程不会读到半截内容"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".ocr-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"text": result.text, "pages": result.pages, "total_pages": result.total_pages,
+                       "truncated": result.truncated}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def ocr_pdf(
+    file_path: Union[str, Path],
+    sha256: str = None,
+    max_pages: int = 10,
+    time_budget: float = 90.0,
+    workers: int = None,
+    lang: str = DEFAULT_LANG,
+    dpi: int = 200,
+    cache_dir: Union[str, Path] = DEFAULT_CACHE_DIR,
+) -> OcrResult:
+    """
+    OCR识别PDF（先查缓存）
+
+    Args:
+        file_path: PDF路径
+        sha256: 文件内容hash，已知时（如任务的file_sha256）省去一次读文件
+        max_pages: 最多识别的页数（从第一页起）
+        time_budget: 整个文件的识别时间上限（秒）
+        workers: 并行识别的页数，默认CPU核数
+        lang: tesseract语言
+        dpi: 渲染分辨率
+        cache_dir: 缓存目录，None为不缓存
+
+    Returns:
+        识别结果；OCR不可用时抛出RuntimeError
+    """
+    sha256 = sha256 or file_sha256(file_path)
+    cache_file = _cache_path(Path(cache_dir), sha256) if cache_dir else None
+
+    with span("ocr", file_type=Path(file_path).suffix.lower()) as s:
+        if cache_file is not None and cache_file.exists():
+            s.count("ocr_cache_hits")
+            return OcrResult(**json.loads(cache_file.read_text(encoding="utf-8")), cached=True)
+
+        if not ocr_available(lang):
+            raise RuntimeError("OCR不可用")
+        result = _recognize(file_path, max_pages, time_budget, workers or os.cpu_count() or 1, lang, dpi)
+        s.count("ocr_pages", result.pages)
+        if result.truncated:
+            s.count("ocr_truncated")
+            logger.warning(f"OCR未识别完{file_path}: 共{result.total_pages}页，识别出{result.pages}页")
+
+        # 超时少识别的页可能只是当时机器繁忙，不缓存；只因max_pages没有识别后面的页时结果是确定的，照常缓存
+        timed_out = result.pages < min(result.total_pages, max_pages)
+        if cache_file is not None and result.pages and not timed_out:
+            _write_cache(cache_file, result)
+        return result
+
+
+def _recognize(file_path, max_pages: int, time_budget: float, workers: int, lang: str, dpi: int) -> OcrResult:
+    import pypdfium2 as pdfium
+    import pytesseract
+
+    # tesseract内部的OpenMP线程：多页并行时每个子进程只用一个核
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    deadline = time.monotonic() + time_budget
+
+    def _ocr_page(image) -> str:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        try:
+            # 超时后pytesseract会结束tesseract子进程并抛出RuntimeError
+            return pytesseract.image_to_string(image, lang=lang, timeout=remaining)
+        except RuntimeError:
+            return None
+        finally:
+            image.close()
+
+    pdf = pdfium.PdfDocument(str(file_path))
+    try:
+        total_pages = len(pdf)
+        page_count = min(total_pages, max_pages)
+        futures = []
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, page_count or 1))) as pool:
+            for index in range(page_count):
+                if time.monotonic() >= deadline:
+                    break
+                page = pdf[index]
+                try:
+                    image = page.render(scale=dpi / 72).to_pil()
+                finally:
+                    page.close()
+                futures.append(pool.submit(_ocr_page, image))
+            texts = [future.result() for future in futures]
+    finally:
+        pdf.close()
+
+    recognized = [text.strip() for text in texts if text is not None]
+    truncated = page_count < total_pages or len(recognized) < page_count
+    return OcrResult(
+        text="\n\n".join(recognized),
+        pages=len(recognized),
+        total_pages=total_pages,
+        truncated=truncated,
+    )
+
+
+def ocr_fallback(file_path: Union[str, Path], options: Dict[str, Any] = None, sha256: str = None) -> str:
+    """
+    文本提取失败时的OCR兜底，options为config["ocr"]；未启用、不是PDF或OCR不可用时返回空字符串
+    """
+    options = dict(options or {})
+    if not options.pop("enabled", True) or Path(file_path).suffix.lower() != ".pdf":
+        return ""
+    try:
+        return ocr_pdf(file_path, sha256=sha256, **options).text
+    except Exception as e:
+        logger.warning(f"OCR失败{file_path}: {e}")
+        return ""
@@ -0,0 +1,230 @@
+"""规则预筛
+
+在任何LLM调用之前，用纯文本规则快速判断简历是否明显不符合岗位：
+    - 必备关键词：Aho-Corasick多模式匹配，一次扫描同时匹配所有词（不再每个词扫一遍全文）
+    - 学历：识别简历中的最高学历
+    - 工作年限：合并简历中的时间段（重叠不重复计算），与"N年经验"的自述取较大值
+每个岗位的阈值单独配置（PrescreenRules，保存在positions.prescreen_rules），
+未通过的简历直接标记为"不推荐"并给出原因，不进入向量化和LLM分析。
+"""
+
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from ..data_model.ana_model import ResumeAnalysis
+from ..data_model.position import DEGREE_LEVELS, PrescreenRules
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick多模式匹配（不区分大小写）
+
+    纯英文数字的模式按单词边界匹配，避免"go"命中"google"、"C"命中任意单词。
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        for pattern in patterns:
+            pattern = pattern.strip().lower()
+            if pattern and pattern not in self.patterns:
+                self._add(pattern, len(self.patterns))
+                self.patterns.append(pattern)
+        self._ascii = [bool(re.fullmatch(r"[0-9a-z_+#.\- ]+", p)) for p in self.patterns]
+        self._build()
+
+    def _add(self, pattern: str, index: int) -> None:
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = nxt
+        self._output[node].append(index)
+
+    def _build(self) -> None:
+        # BFS建立失配指针，并把失配链上的输出合并进来
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+
+    def iter_matches(self, text: str) -> Iterable[Tuple[int, int]]:
+        """逐个产出(模式序号, 结束位置)"""
+        text = text.lower()
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for pos, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for index in output[node]:
+                if self._ascii[index] and not _on_word_boundary(text, pos - len(self.patterns[index]) + 1, pos + 1):
+                    continue
+                yield index, pos + 1
+
+    def find_all(self, text: str) -> Set[str]:
+        """返回文本中出现过的模式（小写）"""
+        return {self.patterns[index] for index, _ in self.iter_matches(text)}
+
+
+def _on_word_boundary(text: str, start: int, end: int) -> bool:
+    before = text[start - 1] if start > 0 else " "
+    after = text[end] if end < len(text) else " "
+    return not (before.isascii() and before.isalnum()) and not (after.isascii() and after.isalnum())
+
+
+# ---------------- 学历 ----------------
+
+_DEGREE_TERMS = {
+    "大专": ["大专", "专科", "高职"],
+    "本科": ["本科", "学士", "bachelor", "b.s.", "b.e."],
+    "硕士": ["硕士", "研究生", "master", "mba", "m.s."],
+    "博士": ["博士", "phd", "ph.d", "doctor"],
+}
+_DEGREE_OF = {term: degree for degree, terms in _DEGREE_TERMS.items() for term in terms}
+_DEGREE_MATCHER = AhoCorasick(_DEGREE_OF)
+
+
+def detect_degree(text: str) -> Optional[str]:
+    """简历中出现的最高学历（大专/本科/硕士/博士），没有识别到返回None"""
+    found = {_DEGREE_OF[term] for term in _DEGREE_MATCHER.find_all(text)}
+    return max(found, key=DEGREE_LEVELS.index) if found else None
+
+
+# ---------------- 工作年限 ----------------
+
+_DATE = r"(\d{4})\s*(?:[.\-/年]\s*(\d{1,2})\s*月?)?"
+_RANGE = re.compile(_DATE + r"\s*(?:-|—|–|~|～|至|到)+\s*(?:(至今|今|现在|present|now)|" + _DATE + ")", re.I)
+_STATED_YEARS = re.compile(r"(?:(\d{1,2})\s*年以?上?(?:工作|相关|开发|从业)*经[验历])|(?:(?:工作)?经[验历]\s*[:：]?\s*(\d{1,2})\s*年)")
+_EDUCATION_LINE = re.compile(r"大学|学院|学校|本科|硕士|博士|学士|大专|研究生|university|college|school", re.I)
+
+
+def estimate_years(text: str, today: Optional[date] = None) -> float:
+    """
+    估算工作年限（年）
+
+    合并非教育经历行中的时间段（重叠部分只算一次），与简历中"N年经验"的自述取较大值，
+    宁可高估也不误杀。
+    """
+    today = today or date.today()
+    now = today.year * 12 + today.month - 1
+    intervals = []
+    for line in text.splitlines():
+        if _EDUCATION_LINE.search(line):
+            continue
+        for m in _RANGE.finditer(line):
+            start = _month(m.group(1), m.group(2))
+            end = now if m.group(3) else _month(m.group(4), m.group(5), default_month=12)
+            if start is not None and end is not None and start <= end <= now:
+                intervals.append((start, end + 1))
+
+    months = 0
+    current_start = current_end = None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                months += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        months += current_end - current_start
+
+    stated = [int(a or b) for a, b in _STATED_YEARS.findall(text)]
+    return max([round(months / 12, 1)] + stated)
+
+
+def _month(year: str, month: Optional[str], default_month: int = 1) -> Optional[int]:
+    y = int(year)
+    m = int(month) if month else default_month
+    if not 1970 <= y <= 2100 or not 1 <= m <= 12:
+        return None
+    return y * 12 + m - 1
+
+
+# ---------------- 预筛 ----------------
+
+@dataclass
+class PrescreenResult:
+    passed: bool
+    reasons: List[str] = field(default_factory=list)
+    matched_terms: List[str] = field(default_factory=list)
+    missing_terms: List[str] = field(default_factory=list)
+    degree: Optional[str] = None
+    years: float = 0
+
+    def to_analysis(self) -> ResumeAnalysis:
+        """未通过预筛时写入候选人的分析结果"""
+        return ResumeAnalysis(
+            recommendation_level="不推荐",
+            key_concerns=self.reasons,
+            one_sentence_summary="规则预筛未通过：" + "；".join(self.reasons),
+            total_year_experience=int(self.years),
+        )
+
+
+class Prescreener:
+    """按岗位规则编译好的预筛器（匹配器构建一次，可重复用于该岗位的所有简历）"""
+
+    def __init__(self, rules: PrescreenRules):
+        self.rules = rules
+        # 每个必备项可以写成"A|B"，命中任一写法即算满足
+        self._alternatives = [[alt.strip().lower() for alt in term.split("|") if alt.strip()] for term in rules.must_have]
+        self._matcher = AhoCorasick(alt for alts in self._alternatives for alt in alts)
+
+    def screen(self, text: str) -> PrescreenResult:
+        rules = self.rules
+        result = PrescreenResult(passed=True, degree=detect_degree(text), years=estimate_years(text))
+        if not rules.enabled:
+            return result
+
+        if self._alternatives:
+            found = self._matcher.find_all(text)
+            for term, alts in zip(rules.must_have, self._alternatives):
+                (result.matched_terms if found.intersection(alts) else result.missing_terms).append(term)
+            ratio = len(result.matched_terms) / len(self._alternatives)
+            if ratio < rules.min_term_ratio:
+                result.reasons.append(f"缺少必备技能：{'、'.join(result.missing_terms)}")
+
+        if rules.min_degree and (result.degree is None or DEGREE_LEVELS.index(result.degree) < DEGREE_LEVELS.index(rules.min_degree)):
+            result.reasons.append(f"学历不满足：要求{rules.min_degree}及以上，简历中为{result.degree or '未识别'}")
+
+        if rules.min_years and result.years < rules.min_years:
+            result.reasons.append(f"工作年限不足：要求{rules.min_years:g}年，简历约{result.years:g}年")
+
+        result.passed = not result.reasons
+        return result
+
+
+_TERM_LEAD = re.compile(r"(?:熟悉|精通|掌握|熟练使用|熟练掌握|了解|具备|有)([^，。；;,.\n]{1,30})")
+_ASCII_TERM = re.compile(r"[A-Za-z][A-Za-z0-9+#.\-]{1,20}")
+
+
+def suggest_terms(job_description: str, limit: int = 10) -> List[str]:
+    """从岗位描述中提取候选的必备关键词（供HR在规则设置里挑选，不直接用于筛选）"""
+    terms: List[str] = []
+    for m in _TERM_LEAD.finditer(job_description):
+        for part in re.split(r"[、/及和与或]", m.group(1)):
+            part = part.strip(" 等的")
+            for ascii_term in _ASCII_TERM.findall(part) or ([part] if 2 <= len(part) <= 8 else []):
+                if ascii_term.lower() not in (t.lower() for t in terms):
+                    terms.append(ascii_term)
+    for ascii_term in _ASCII_TERM.findall(job_description):
+        if ascii_term.lower() not in (t.lower() for t in terms):
+            terms.append(ascii_term)
+    return terms[:limit]
@@ -0,0 +1,84 @@
+"""进程级HTTP连接池
+
+每个模型服务（按 scheme://host:port 区分）在进程内只有一个httpx.Client和一个httpx.AsyncClient
+（异步客户端绑定事件循环，每个事件循环一个），所有RAGEngine、所有Streamlit会话共用：
+    - keep-alive复用连接，不再每次调用重新建TCP连接
+    - 装了h2时对支持的服务使用HTTP/2（多路复用，一个连接承载多个并发请求）
+    - 每个服务的连接数有上限，超出的请求在连接池里排队
+"""
+
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Any, Dict
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_clients: Dict[str, httpx.Client] = {}
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = weakref.WeakKeyDictionary()
+
+
+def _origin(base_url: str) -> str:
+    parts = urlsplit(base_url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _client_options(config: Dict[str, Any]) -> Dict[str, Any]:
+    section = config.get("http_pool", {})
+    http2 = section.get("http2", True) and _http2_available()
+    return {
+        "http2": http2,
+        "limits": httpx.Limits(
+            max_connections=section.get("max_connections", 64),
+            max_keepalive_connections=section.get("max_keepalive_connections", 32),
+            keepalive_expiry=section.get("keepalive_expiry", 60.0),
+        ),
+        # 总截止时间由backend_control控制，这里只兜底
+        "timeout": httpx.Timeout(config["env"]["ollama_timeout"], connect=section.get("connect_timeout", 5.0)),
+    }
+
+
+def get_http_client(base_url: str, config: Dict[str, Any]) -> httpx.Client:
+    """取该服务共用的同步客户端（首次调用时按配置创建）"""
+    origin = _origin(base_url)
+    with _lock:
+        client = _clients.get(origin)
+        if client is None or client.is_closed:
+            options = _client_options(config)
+            client = _clients[origin] = httpx.Client(**options)
+            logger.info(f"创建HTTP连接池: {origin} (http2={options['http2']})")
+        return client
+
+
+def get_async_http_client(base_url: str, config: Dict[str, Any]) -> httpx.AsyncClient:
+    """取当前事件循环下该服务共用的异步客户端（必须在事件循环中调用）"""
+    loop = asyncio.get_running_loop()
+
+    origin = _origin(base_url)
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(origin)
+        if client is None or client.is_closed:
+            client = clients[origin] = httpx.AsyncClient(**_client_options(config))
+        return client
+
+
+def close_all() -> None:
+    """关闭所有同步客户端（进程退出前调用，异步客户端随事件循环回收）"""
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
@@ -0,0 +1,253 @@
+"""向量库维护：离线重建/压缩collection
+
+按岗位删除或覆盖写入节点后，Chroma只做逻辑删除，./vector_db会越来越大，检索也会变慢。
+重建时不重新读取简历、也不重新调用嵌入模型，直接从现有collection分批读出节点（id、文本、
+metadata（含LlamaIndex的节点内容）和已存的向量），并行写入一个新的collection：
+    - 新collection写完并核对条数后，改写指针文件切换为活动collection（os.replace，原子替换），
+      RAGEngine按指针文件打开collection，切换前后读到的都是完整数据
+    - 旧collection随后删除，默认再对chroma.sqlite3执行VACUUM回收空间
+    - 输出重建前后的条数和目录大小
+需要离线执行：先停止worker和界面，否则重建期间写入旧collection的数据会丢失。
+
+用法（在包的上级目录执行）:
+    python -m <包名>.index_tools stats
+    python -m <包名>.index_tools rebuild --batch-size 500 --workers 4
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from .telemetry import span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VECTOR_DB_PATH = "./vector_db"
+
+# 逻辑collection名 -> 当前活动的物理collection名
+_POINTER_FILE = "active_collections.json"
+
+
+def open_client(path: Union[str, Path] = DEFAULT_VECTOR_DB_PATH):
+    """打开本地持久化的Chroma"""
+    import chromadb
+
+    try:
+        return chromadb.PersistentClient(path=Path(path), tenant="default_tenant", database="default_database")
+    except Exception as e:
+        logger.warning(f"New ChromaDB API failed, trying legacy mode: {e}")
+        return chromadb.PersistentClient(path=str(path))
+
+
+def _read_pointers(path: Path) -> Dict[str, str]:
+    pointer_file = path / _POINTER_FILE
+    if not pointer_file.exists():
+        return {}
+    return json.loads(pointer_file.read_text(encoding="utf-8"))
+
+
+def active_collection_name(base_name: str, path: Union[str, Path] = DEFAULT_VECTOR_DB_PATH) -> str:
+    """逻辑collection当前对应的物理collection名（从未重建过时就是逻辑名本身）"""
+    return _read_pointers(Path(path)).get(base_name, base_name)
+
+
+def _set_active(path: Path, base_name: str, collection_name: str) -> None:
+    """原子地切换活动collection：写临时文件后os.replace"""
+    pointers = _read_pointers(path)
+    pointers[base_name] = collection_name
+    path.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path, prefix=".pointers-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(pointers, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path / _POINTER_FILE)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def directory_size(path: Union[str, Path]) -> int:
+    """目录下所有文件的总字节数"""
+    return sum(p.stat().st_size for p in Path(path).rglob("*") if p.is_file())
+
+
+def _next_name(base_name: str, current: str) -> str:
+    """<逻辑名>__g<代数>，每次重建代数加1"""
+    generation = 0
+    prefix = f"{base_name}__g"
+    if current.startswith(prefix) and current[len(prefix):].isdigit():
+        generation = int(current[len(prefix):])
+    return f"{prefix}{generation + 1}"
+
+
+@dataclass
+class RebuildReport:
+    base_name: str
+    old_collection: str
+    new_collection: str
+    records: int
+    size_before: int
+    size_after: int
+    seconds: float
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.size_before - self.size_after
+
+
+def rebuild_collection(
+    base_name: str,
+    path: Union[str, Path] = DEFAULT_VECTOR_DB_PATH,
+    batch_size: int = 500,
+    workers: int = 4,
+    keep_old: bool = False,
+    vacuum: bool = True,
+) -> RebuildReport:
+    """
+    从现有collection重建一个紧凑的新collection并切换过去（不重新嵌入）
+
+    Args:
+        base_name: 逻辑collection名（config["model"]["collection_name"]）
+        path: Chroma持久化目录
+        batch_size: 每批读写的节点数
+        workers: 并行复制的批数
+        keep_old: 是否保留旧collection（用于回退）
+        vacuum: 删除旧collection后是否对chroma.sqlite3执行VACUUM
+
+    Returns:
+        重建结果（条数、前后目录大小）
+    """
+    path = Path(path)
+    started = time.monotonic()
+    size_before = directory_size(path)
+    client = open_client(path)
+    old_name = active_collection_name(base_name, path)
+    source = client.get_collection(old_name)
+    new_name = _next_name(base_name, old_name)
+
+    # 上次重建中断留下的半成品
+    if new_name in _collection_names(client):
+        client.delete_collection(new_name)
+    target = client.create_collection(new_name, metadata=source.metadata or None)
+
+    max_batch = getattr(client, "get_max_batch_size", lambda: batch_size)()
+    batch_size = max(1, min(batch_size, max_batch))
+
+    with span("index.rebuild", collection=base_name) as s:
+        ids = source.get(include=[])["ids"]
+        batches = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+        logger.info(f"重建{old_name} -> {new_name}: {len(ids)}个节点，{len(batches)}批")
+
+        def _copy(batch_ids: List[str]) -> int:
+            batch = source.get(ids=batch_ids, include=["embeddings", "documents", "metadatas"])
+            target.upsert(
+                ids=batch["ids"],
+                embeddings=batch["embeddings"],
+                documents=batch["documents"],
+                metadatas=batch["metadatas"],
+            )
+            return len(batch["ids"])
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            copied = sum(pool.map(_copy, batches))
+        s.count("nodes", copied)
+
+        if target.count() != len(ids):
+            client.delete_collection(new_name)
+            raise RuntimeError(f"重建结果条数不一致: 期望{len(ids)}，实际{target.count()}，已放弃新collection")
+
+        _set_active(path, base_name, new_name)
+        logger.info(f"活动collection已切换为{new_name}")
+
+        if not keep_old:
+            client.delete_collection(old_name)
+            if vacuum:
+                _vacuum(path)
+
+    return RebuildReport(
+        base_name=base_name,
+        old_collection=old_name,
+        new_collection=new_name,
+        records=copied,
+        size_before=size_before,
+        size_after=directory_size(path),
+        seconds=round(time.monotonic() - started, 2),
+    )
+
+
+def _collection_names(client) -> List[str]:
+    # chromadb 0.6起list_collections只返回名字
+    return [c if isinstance(c, str) else c.name for c in client.list_collections()]
+
+
+def _vacuum(path: Path) -> None:
+    """回收chroma.sqlite3中已删除数据占用的空间"""
+    db_file = path / "chroma.sqlite3"
+    if not db_file.exists():
+        return
+    try:
+        conn = sqlite3.connect(db_file, isolation_level=None, timeout=30)
+        try:
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning(f"VACUUM失败（可稍后重试）: {e}")
+
+
+def collection_stats(base_name: str, path: Union[str, Path] = DEFAULT_VECTOR_DB_PATH) -> Dict[str, Any]:
+    """活动collection的节点数、各岗位节点数和目录大小"""
+    client = open_client(path)
+    name = active_collection_name(base_name, path)
+    collection = client.get_collection(name)
+    per_position: Dict[str, int] = {}
+    for metadata in collection.get(include=["metadatas"])["metadatas"]:
+        key = str((metadata or {}).get("position_id"))
+        per_position[key] = per_position.get(key, 0) + 1
+    return {
+        "collection": name,
+        "records": collection.count(),
+        "per_position": per_position,
+        "size_bytes": directory_size(path),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    from .config import get_config
+
+    parser = argparse.ArgumentParser(description="向量库维护")
+    parser.add_argument("--path", default=DEFAULT_VECTOR_DB_PATH)
+    parser.add_argument("--collection", default=None, help="逻辑collection名，默认取配置")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="查看活动collection的条数和大小")
+    rebuild = sub.add_parser("rebuild", help="离线重建/压缩活动collection")
+    rebuild.add_argument("--batch-size", type=int, default=500)
+    rebuild.add_argument("--workers", type=int, default=4)
+    rebuild.add_argument("--keep-old", action="store_true", help="保留旧collection用于回退")
+    rebuild.add_argument("--no-vacuum", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    base_name = args.collection or get_config()["model"]["collection_name"]
+    if args.command == "stats":
+        result = collection_stats(base_name, args.path)
+    else:
+        report = rebuild_collection(
+            base_name, args.path, args.batch_size, args.workers, keep_old=args.keep_old, vacuum=not args.no_vacuum
+        )
+        result = {**asdict(report), "bytes_saved": report.bytes_saved}
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
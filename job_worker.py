@@ -0,0 +1,374 @@
+"""后台筛选worker进程池
+
+从JobStore领取任务，按 extract → embed → analyze → save 逐阶段执行，每完成一个阶段
+记录检查点；extract阶段按岗位规则预筛，未通过的简历跳过embed和analyze，直接保存为"不推荐"；worker或整个服务重启后，未完成的任务从最后的检查点继续。
+各阶段都可以安全重试：向量库按固定node id覆盖写入，保存前按(岗位, 文件hash)查重。
+同一份简历已投递过其他岗位时，复用已有向量和人员档案，analyze阶段只调用一次评估；
+extract阶段还会检测近似重复（修改几处后重投、中介换文件名再发），同样复用，并把候选人归入重复簇提示HR。
+岗位描述修改后的重新评估任务（kind=reevaluate）跳过近似重复检测和embed，预筛规则改过时才重新预筛，
+保存时只覆盖原候选人的评估结果。
+任务中的模型调用都按批量优先级（backend_control.BULK）发出，界面上的交互请求优先。
+service部署模式下（config["deployment"]["mode"]），向量库写入和模型调用经数据服务进程执行
+（暂存文件路径在同一台机器上，服务可以直接读取），worker只直接访问SQLite（WAL，租约保证同一任务只有一个worker执行）。
+
+用法（在包的上级目录执行，与Streamlit应用分开运行）:
+    python -m <包名>.job_worker --processes 2
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .backend_control import BULK, request_priority, set_default_priority
+from .config import get_config
+from .data_db.candidate_store import CandidateStore
+from .data_db.database import DEFAULT_DB_PATH, DEFAULT_JOBS_DB_PATH
+from .data_db.job_store import KIND_REEVALUATE, STAGES, JobStore
+from .data_db.person_store import PersonStore
+from .data_db.position_store import PositionStore
+from .data_model.ana_model import ResumeAnalysis
+from .data_model.candidate import CandidateProfile, Education, ProjectExperience, Skills, WorkExperience
+from .data_model.position import STATUS_DELETED, PrescreenRules
+from .doc_ana.doc_ana import extract_text_from_file, validate_resume_content
+from .doc_ana.near_dup import get_index, minhash
+from .doc_ana.prescreen import Prescreener
+from .service.client import client_from_config, connect_engine, is_service_mode
+from .telemetry import file_type_of, span
+
+logger = logging.getLogger(__name__)
+
+
+class PermanentJobError(Exception):
+    """重试也不会成功的错误（文件无法解析、岗位已删除等），任务直接标记为failed"""
+
+
+class ScreeningWorker:
+    """单个worker进程内的任务执行器"""
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        jobs_db_path: str = DEFAULT_JOBS_DB_PATH,
+        db_path: str = DEFAULT_DB_PATH,
+        lease_seconds: float = 600,
+        poll_interval: float = 1.0,
+    ):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.jobs = JobStore(jobs_db_path)
+        self.candidates = CandidateStore(db_path)
+        self.persons = PersonStore(db_path)
+        self.positions = PositionStore(db_path)
+        self.db_path = db_path
+        self.config = config
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._engine = None
+        self._prescreeners: Dict[int, Prescreener] = {}
+
+    @property
+    def engine(self):
+        # 延迟创建：只处理保存阶段的任务不需要连接模型服务；
+        # service部署模式下为数据服务的瘦客户端，向量库写入和模型调用都在数据服务进程内执行
+        if self._engine is None:
+            self._engine = connect_engine(self.config)
+        return self._engine
+
+    def run(self, stop_event) -> None:
+        logger.info(f"worker启动: {self.worker_id}")
+        while not stop_event.is_set():
+            job = self.jobs.claim(self.worker_id, self.lease_seconds)
+            if job is None:
+                stop_event.wait(self.poll_interval)
+                continue
+            self.process(job)
+        logger.info(f"worker退出: {self.worker_id}")
+
+    def process(self, job: Dict[str, Any]) -> None:
+        """从任务当前阶段执行到结束"""
+        file_path = self.jobs.spool_path(job)
+        payload = dict(job["payload"])
+        stage = job["stage"]
+
+        with span("job", position=job["position_id"], file_type=file_type_of(job["file_name"]), job_id=job["id"]) as s, \
+                request_priority(BULK):
+            try:
+                for index in range(STAGES.index(stage), len(STAGES)):
+                    stage = STAGES[index]
+                    with span(f"job.{stage}"):
+                        getattr(self, f"_stage_{stage}")(job, file_path, payload)
+
+                    if stage == STAGES[-1]:
+                        break
+                    if not self.jobs.checkpoint(job["id"], self.worker_id, STAGES[index + 1], payload, self.lease_seconds):
+                        logger.warning(f"任务{job['id']}的租约已被接管，放弃执行")
+                        s.fail("租约被接管")
+                        return
+
+                self.jobs.complete(job["id"], self.worker_id, payload["candidate_id"])
+                logger.info(f"任务{job['id']}完成: {job['file_name']} -> 候选人{payload['candidate_id']}")
+
+            except PermanentJobError as e:
+                s.fail(str(e))
+                self.jobs.fail(job["id"], self.worker_id, f"[{stage}] {e}", retryable=False)
+            except Exception as e:
+                logger.error(f"任务{job['id']}在{stage}阶段出错: {e}", exc_info=True)
+                s.fail(f"{type(e).__name__}: {e}")
+                self.jobs.fail(job["id"], self.worker_id, f"[{stage}] {type(e).__name__}: {e}")
+
+    # ---------------- 阶段 ----------------
+
+    def _stage_extract(self, job: Dict[str, Any], file_path: Path, payload: Dict[str, Any]) -> None:
+        if not file_path.exists():
+            raise PermanentJobError(f"暂存文件不存在: {file_path}")
+        text, ok = extract_text_from_file(str(file_path), self.config.get("ocr"), job["file_sha256"])
+        if not ok:
+            raise PermanentJobError("无法提取简历文本")
+        if not validate_resume_content(text):
+            raise PermanentJobError("文件内容不像简历")
+        payload["text"] = text
+        if job["kind"] == KIND_REEVALUATE:
+            # 只是岗位描述改了：近似重复簇在首次处理时已经确定，不再登记
+            self._reevaluation_prescreen(job, payload)
+            return
+        self._check_near_duplicate(job, payload)
+        self._prescreen(job, payload)
+
+    def _check_near_duplicate(self, job: Dict[str, Any], payload: Dict[str, Any]) -> None:
+        """登记简历签名并归簇，与已有简历近似重复时记录对方的文件hash"""
+        near_dup = self.config.get("near_dup", {})
+        if not near_dup.get("enabled", True):
+            return
+        index = get_index(self.db_path, near_dup.get("min_similarity", 0.8))
+        with span("near_dup", position=job["position_id"]) as s:
+            cluster_id, match = index.add(job["file_sha256"], minhash(payload["text"]))
+            payload["dup_cluster_id"] = cluster_id
+            if match is not None:
+                s.count("near_duplicates")
+                payload["near_duplicate_of"] = match.blob_sha256
+                logger.info(f"任务{job['id']}与简历{match.blob_sha256[:12]}近似重复（相似度{match.similarity:.2f}）")
+
+    def _active_prescreen_rules(self, position_id: int) -> Optional[PrescreenRules]:
+        """岗位当前生效的预筛规则，未开启预筛返回None"""
+        if not self.config.get("prescreen", {}).get("enabled", True):
+            return None
+        rules = self.positions.get_prescreen_rules(position_id)
+        return rules if rules is not None and rules.enabled else None
+
+    def _reevaluation_prescreen(self, job: Dict[str, Any], payload: Dict[str, Any]) -> None:
+        """
+        重新评估任务的预筛：只在规则比入库时改过才重新预筛
+
+        入库时没有预筛的不预筛；规则未变时沿用当时的结论（通过的直接评估，未通过的仍为"不推荐"）
+        """
+        screened = self.candidates.get_prescreen(job["candidate_id"])
+        if screened is None:
+            return
+        rules = self._active_prescreen_rules(job["position_id"])
+        if rules is not None and rules.model_dump_json() == screened["rules"]:
+            if screened["rejected"]:
+                # 同样的规则和简历，结论不变，只是重新生成"不推荐"的分析结果
+                self._prescreen(job, payload)
+            return
+        # 规则已修改或已关闭预筛：按当前规则重新预筛，保存时覆盖候选人的预筛记录
+        payload["prescreen_rules"] = None
+        self._prescreen(job, payload)
+
+    def _prescreen(self, job: Dict[str, Any], payload: Dict[str, Any]) -> None:
+        """按岗位规则预筛，未通过时直接写入"不推荐"的分析结果；记录所用规则，供重新评估时判断规则是否改过"""
+        rules = self._active_prescreen_rules(job["position_id"])
+        if rules is None:
+            return
+        payload["prescreen_rules"] = rules.model_dump_json()
+
+        prescreener = self._prescreeners.get(job["position_id"])
+        if prescreener is None or prescreener.rules != rules:
+            prescreener = self._prescreeners[job["position_id"]] = Prescreener(rules)
+
+        with span("prescreen", position=job["position_id"]) as s:
+            result = prescreener.screen(payload["text"])
+            if not result.passed:
+                s.count("prescreen_rejected")
+                payload["prescreen_rejected"] = True
+                payload["analysis"] = result.to_analysis().model_dump()
+                logger.info(f"任务{job['id']}未通过预筛: {'；'.join(result.reasons)}")
+
+    def _stage_embed(self, job: Dict[str, Any], file_path: Path, payload: Dict[str, Any]) -> None:
+        if payload.get("prescreen_rejected") or job["kind"] == KIND_REEVALUATE:
+            return
+        if not self.engine.ingest_resume(str(file_path), job["position_id"], doc_key=job["file_sha256"],
+                                         reuse_key=self._reusable_duplicate(payload)):
+            raise RuntimeError("写入向量库失败")
+
+    def _stage_analyze(self, job: Dict[str, Any], file_path: Path, payload: Dict[str, Any]) -> None:
+        if payload.get("prescreen_rejected"):
+            return
+        position = self.positions.get_by_id(job["position_id"])
+        if position is None or position.status == STATUS_DELETED:
+            raise PermanentJobError(f"岗位{job['position_id']}不存在")
+        # 记录分析所依据的岗位描述版本（分析期间描述又被修改时，保存后仍显示为过期）
+        payload["jd_version"] = position.jd_version
+
+        person = self.persons.get_by_blob(job["file_sha256"])
+        duplicate_of = self._reusable_duplicate(payload)
+        if person is None and duplicate_of:
+            # 近似重复的简历已经分析过，沿用其人员档案，只针对本岗位重新评估
+            person = self.persons.get_by_blob(duplicate_of)
+        if person is not None:
+            analysis = self.engine.evaluate_profile(person["profile"], position.description)
+        else:
+            analysis = self.engine.analyze_resume(payload["text"], position.description)
+        if not analysis.analysis_success:
+            raise RuntimeError("LLM分析失败")
+        payload["analysis"] = analysis.model_dump()
+        payload["person_id"] = person["id"] if person else None
+
+    def _reusable_duplicate(self, payload: Dict[str, Any]) -> Optional[str]:
+        """可复用向量和人员档案的近似重复简历hash（配置为只标记时返回None）"""
+        if not self.config.get("near_dup", {}).get("reuse_analysis", True):
+            return None
+        return payload.get("near_duplicate_of")
+
+    def _stage_save(self, job: Dict[str, Any], file_path: Path, payload: Dict[str, Any]) -> None:
+        if job["kind"] == KIND_REEVALUATE:
+            analysis = ResumeAnalysis.model_validate(payload["analysis"])
+            # 本次重新预筛过时（payload中有prescreen_rules）同时更新预筛记录
+            rejected = bool(payload.get("prescreen_rejected")) if "prescreen_rules" in payload else None
+            if not self.candidates.update_analysis(job["candidate_id"], analysis, payload.get("jd_version"),
+                                                   payload.get("prescreen_rules"), rejected):
+                raise PermanentJobError(f"候选人{job['candidate_id']}已删除")
+            payload["candidate_id"] = job["candidate_id"]
+            return
+
+        # 上一次执行可能已经保存成功、只是没来得及标记完成
+        candidate_id = self.candidates.get_id_by_blob(job["position_id"], job["file_sha256"])
+        if candidate_id is None:
+            blob_sha256 = self.candidates.blobs.put(file_path)
+            analysis = ResumeAnalysis.model_validate(payload["analysis"])
+            profile = profile_from_analysis(Path(job["file_name"]).stem, job["position_id"], job["file_name"], analysis)
+            person_id = payload.get("person_id")
+            if person_id is None and not payload.get("prescreen_rejected"):
+                # 首次分析这份简历：保存与岗位无关的部分，之后投递其他岗位时复用
+                person_id = self.persons.save(blob_sha256, profile)
+            candidate_id = self.candidates.save(profile, analysis, blob_sha256=blob_sha256, person_id=person_id,
+                                                jd_version=payload.get("jd_version"),
+                                                dup_cluster_id=payload.get("dup_cluster_id"),
+                                                prescreen_rules=payload.get("prescreen_rules"),
+                                                prescreen_rejected=bool(payload.get("prescreen_rejected")))
+        payload["candidate_id"] = candidate_id
+
+
+def enqueue_reevaluation(position_id: int, candidates: CandidateStore, positions: PositionStore, jobs: JobStore) -> Optional[int]:
+    """岗位描述修改后调用：评估已过期的候选人按HR标签优先级入队重新评估，返回批次ID"""
+    position = positions.get_by_id(position_id)
+    if position is None:
+        return None
+    return jobs.enqueue_reevaluation(position_id, position.jd_version, candidates.get_stale(position_id), candidates.blobs.path)
+
+
+def profile_from_analysis(name: str, position_id: int, file_name: str, analysis: ResumeAnalysis) -> CandidateProfile:
+    """由LLM分析结果构建候选人档案"""
+    return CandidateProfile(
+        name=name,
+        position_id=position_id,
+        file_name=file_name,
+        total_years_experience=analysis.total_year_experience,
+        work_experience=[
+            WorkExperience(
+                company=work.company,
+                position=work.position,
+                start_time=work.start_time,
+                end_time=work.end_time,
+                description=work.description,
+            )
+            for work in analysis.work_experience
+        ],
+        project_experience=[
+            ProjectExperience(name=project.pro_name, role=project.role, description=project.description)
+            for project in analysis.project_experience
+        ],
+        # 提取调用只给出技能关键词，不分类别
+        skills=[Skills(category="技能关键词", items=analysis.skills)] if analysis.skills else [],
+        education=[Education(**education.model_dump()) for education in analysis.education],
+    )
+
+
+def _worker_main(config: Dict[str, Any], jobs_db_path: str, db_path: str, stop_event) -> None:
+    """子进程入口"""
+    # 停止由父进程通过stop_event通知，子进程忽略Ctrl+C，避免任务执行到一半被打断
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(processName)s %(name)s: %(message)s")
+    set_default_priority(BULK)
+    ScreeningWorker(config, jobs_db_path, db_path).run(stop_event)
+
+
+class WorkerPool:
+    """worker进程池，启动时先回收本机上次未完成的任务"""
+
+    def __init__(
+        self,
+        processes: int = 2,
+        config: Optional[Dict[str, Any]] = None,
+        jobs_db_path: str = DEFAULT_JOBS_DB_PATH,
+        db_path: str = DEFAULT_DB_PATH,
+    ):
+        self.processes = processes
+        self.config = config or get_config()
+        self.jobs_db_path = jobs_db_path
+        self.db_path = db_path
+        self._context = multiprocessing.get_context("spawn")
+        self._stop = self._context.Event()
+        self._workers: List[multiprocessing.Process] = []
+
+    def start(self) -> "WorkerPool":
+        if is_service_mode(self.config) and not client_from_config(self.config).health():
+            # worker不能自己打开向量库（与数据服务进程同时写Chroma），必须先启动数据服务
+            raise RuntimeError("service部署模式下需要先启动数据服务（python -m <包名>.service.server）")
+        # 同一台机器只运行一个WorkerPool：本机名下仍处于running的任务都是上次中断留下的
+        JobStore(self.jobs_db_path).requeue_expired(owner_prefix=f"{socket.gethostname()}:")
+        for i in range(self.processes):
+            worker = self._context.Process(
+                target=_worker_main,
+                args=(self.config, self.jobs_db_path, self.db_path, self._stop),
+                name=f"screening-worker-{i}",
+            )
+            worker.start()
+            self._workers.append(worker)
+        return self
+
+    def stop(self, timeout: float = None) -> None:
+        """通知worker在当前任务完成后退出"""
+        self._stop.set()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers.clear()
+
+    def join(self) -> None:
+        for worker in self._workers:
+            worker.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="后台简历筛选worker")
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--jobs-db", default=DEFAULT_JOBS_DB_PATH)
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    pool = WorkerPool(args.processes, jobs_db_path=args.jobs_db, db_path=args.db).start()
+    logger.info(f"已启动{args.processes}个worker，Ctrl+C在当前任务完成后退出")
+    try:
+        pool.join()
+    except KeyboardInterrupt:
+        logger.info("正在停止worker...")
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""接入客户端流控和共享连接池的LLM与嵌入模型
+
+    - 每次调用经过BackendController（见backend_control）：并发上限、截止时间、重试和熔断，
+      底层客户端自身的重试关闭，避免两层重试叠加放大流量
+    - 同步调用每次尝试以剩余时间（backend_control.attempt_timeout）作为单次请求的超时，
+      排队和重试之后的最后一次尝试也不会超出总截止时间
+    - HTTP连接来自进程级连接池（见http_pool），所有RAGEngine和会话共用keep-alive连接
+    - 开启priority_scheduling时，LLM请求按调用链的优先级（见backend_control.request_priority）
+      带上vLLM的priority字段，跨进程的交互请求由服务端优先调度
+嵌入直接调用Xinference的OpenAI兼容接口 POST /v1/embeddings（xinference客户端基于requests、
+不复用连接），一批文本一次请求。
+"""
+
+from typing import Any, Dict, List, Sequence
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.base.llms.types import ChatMessage, ChatResponse, CompletionResponse
+from llama_index.llms.openai_like import OpenAILike
+from pydantic import Field, PrivateAttr
+
+from .backend_control import BULK, INTERACTIVE, BackendController, attempt_timeout, current_priority, get_controller
+from .http_pool import get_async_http_client, get_http_client
+
+
+# vLLM的priority字段：数值越小越先调度
+VLLM_PRIORITY = {INTERACTIVE: 0, BULK: 10}
+
+
+class ControlledOpenAILike(OpenAILike):
+    """受控的vLLM（OpenAI兼容）客户端"""
+
+    _controller: BackendController = PrivateAttr()
+    _priority_scheduling: bool = PrivateAttr()
+
+    def __init__(self, controller: BackendController, priority_scheduling: bool = False, **kwargs: Any) -> None:
+        kwargs.setdefault("max_retries", 0)
+        kwargs.setdefault("timeout", controller.timeout)
+        super().__init__(**kwargs)
+        self._controller = controller
+        self._priority_scheduling = priority_scheduling
+
+    def _with_priority(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        if self._priority_scheduling:
+            extra_body = dict(kwargs.get("extra_body") or {})
+            extra_body.setdefault("priority", VLLM_PRIORITY[current_priority()])
+            kwargs["extra_body"] = extra_body
+        return kwargs
+
+    def _complete_attempt(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return super().complete(prompt, formatted=formatted, timeout=attempt_timeout(self.timeout), **kwargs)
+
+    def _chat_attempt(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        return super().chat(messages, timeout=attempt_timeout(self.timeout), **kwargs)
+
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return self._controller.call(self._complete_attempt, prompt, formatted=formatted, **self._with_priority(kwargs))
+
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        return self._controller.call(self._chat_attempt, messages, **self._with_priority(kwargs))
+
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return await self._controller.acall(super().acomplete, prompt, formatted=formatted, **self._with_priority(kwargs))
+
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        return await self._controller.acall(super().achat, messages, **self._with_priority(kwargs))
+
+
+class ControlledXinferenceEmbedding(BaseEmbedding):
+    """受控的Xinference嵌入客户端（走共享连接池）"""
+
+    model_uid: str = Field(description="Xinference中的模型UID")
+    base_url: str = Field(description="Xinference服务地址")
+
+    _controller: BackendController = PrivateAttr()
+    _config: Dict[str, Any] = PrivateAttr()
+
+    def __init__(self, controller: BackendController, config: Dict[str, Any], **kwargs: Any) -> None:
+        kwargs.setdefault("model_name", kwargs.get("model_uid"))
+        super().__init__(**kwargs)
+        self._controller = controller
+        self._config = config
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ControlledXinferenceEmbedding"
+
+    @property
+    def _endpoint(self) -> str:
+        return f"{self.base_url.rstrip('/')}/v1/embeddings"
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        response = get_http_client(self.base_url, self._config).post(
+            self._endpoint, json={"model": self.model_uid, "input": texts},
+            timeout=attempt_timeout(self._controller.timeout),
+        )
+        response.raise_for_status()
+        return _parse_embeddings(response.json())
+
+    async def _aembed(self, texts: List[str]) -> List[List[float]]:
+        response = await get_async_http_client(self.base_url, self._config).post(
+            self._endpoint, json={"model": self.model_uid, "input": texts}
+        )
+        response.raise_for_status()
+        return _parse_embeddings(response.json())
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._controller.call(self._embed, [query])[0]
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._controller.call(self._embed, [text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        # 一批文本一次请求（批大小由embed_batch_size控制）
+        return self._controller.call(self._embed, texts)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return (await self._controller.acall(self._aembed, [query]))[0]
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return (await self._controller.acall(self._aembed, [text]))[0]
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return await self._controller.acall(self._aembed, texts)
+
+
+def _parse_embeddings(body: Dict[str, Any]) -> List[List[float]]:
+    return [item["embedding"] for item in sorted(body["data"], key=lambda item: item["index"])]
+
+
+# 模型档位 -> 配置小节（流控按档位分开：小模型过载不影响大模型的并发上限）
+LLM_TIERS = {"llm": "vllm", "llm_small": "vllm_small"}
+
+
+def build_llm(config: Dict[str, Any], tier: str = "llm") -> ControlledOpenAILike:
+    # 小模型小节只需写与大模型不同的项，其余沿用vllm
+    section = {**config["vllm"], **config.get(LLM_TIERS[tier], {})}
+    return ControlledOpenAILike(
+        controller=get_controller(tier, config),
+        priority_scheduling=section.get("priority_scheduling", False),
+        model=section["vllm_model"],
+        api_base=section["vllm_api"],
+        api_key=section["vllm_key"],
+        http_client=get_http_client(section["vllm_api"], config),
+    )
+
+
+def build_embed_model(config: Dict[str, Any]) -> ControlledXinferenceEmbedding:
+    return ControlledXinferenceEmbedding(
+        controller=get_controller("embedding", config),
+        config=config,
+        model_uid=config["embedding"]["em_model"],
+        base_url=config["embedding"]["base_url"],
+    )
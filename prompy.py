@@ -112,3 +112,83 @@ RESUME_ANALYSIS_PROMPT = """
 6. work_experience 和 project_experience 如果简历中没有,返回空数组[]
 7. 日期格式尽量保持一致性
 """
+
+# ---------------- 两级模型：小模型提取 + 大模型评估 ----------------
+
+RESUME_EXTRACTION_PROMPT = """
+你是一位简历信息提取助手,请从候选人简历中提取结构化信息,只做提取,不做评价。
+
+# 候选人简历
+{resume_content}
+
+# 输出要求
+请严格按照以下 JSON 格式输出,不要添加任何其他文字:
+
+{{
+    "total_years_experience": 5,
+    "education": [
+        {{"school": "浙江大学", "major": "计算机科学", "degree": "硕士", "end_date": "2018-06"}}
+    ],
+    "skills": ["RAG", "Python", "需求分析"],
+    "work_experience": [
+        {{
+            "company": "阿里巴巴",
+            "position": "高级AI产品经理",
+            "start_date": "2020-06",
+            "end_date": "2024-03",
+            "description": "负责AI助手产品规划和落地,主导3个RAG项目上线,服务10万+企业用户"
+        }}
+    ],
+    "project_experience": [
+        {{
+            "name": "企业知识库RAG系统",
+            "role": "产品负责人",
+            "description": "主导B端RAG产品从0到1,检索准确率85%,用户满意度4.5/5"
+        }}
+    ]
+}}
+
+# 提取规则
+1. total_years_experience: 总工作年限,整数,无法判断时返回 0
+2. work_experience: 所有工作经历,按时间倒序(最新的在前);日期格式 "YYYY-MM",至今填"至今",无法确定填null
+3. project_experience: 最多5个重要项目;description保留技术栈、成果和数据,100字以内
+4. skills: 简历中出现的技能关键词,最多20个
+5. 简历中没有的内容返回空数组[],不要编造
+6. 必须严格返回JSON格式,不要有任何其他文字
+"""
+
+RESUME_EVALUATION_PROMPT = """
+你是一位专业的招聘顾问,请根据岗位描述和候选人档案(已从简历中提取的结构化信息),评估候选人与岗位的匹配程度。
+
+# 岗位描述
+{job_description}
+
+# 候选人档案
+{candidate_profile}
+
+# 输出要求
+请严格按照以下 JSON 格式输出,不要添加任何其他文字:
+
+{{
+    "recommendation_level": "推荐",
+    "key_strengths": [
+        "5年 AI 产品经验,主导过 3 个 RAG 项目成功上线",
+        "技术背景强(计算机硕士),能与研发团队深度沟通"
+    ],
+    "key_concerns": [
+        "缺乏制造业行业背景(现有经验集中在互联网行业)"
+    ],
+    "one_sentence_summary": "技术型 AI 产品专家,RAG 项目经验丰富,需补足制造业行业背景"
+}}
+
+# 评估标准
+- recommendation_level 必须是四个等级之一:
+  - **强烈推荐**:核心要求完全匹配,有突出亮点,几乎无明显短板
+  - **推荐**:大部分要求匹配,有一定亮点,无重大短板
+  - **可考虑**:部分要求匹配,有可培养潜力或可迁移能力
+  - **不推荐**:核心要求明显不匹配,短板较多
+- key_strengths: 3-5 条具体、可验证的优势,优先列出与岗位强相关的亮点,尽量包含数据支撑
+- key_concerns: 0-3 条需要注意的方面,诚实但不夸大,没有可以为空数组 []
+- one_sentence_summary: 50 字以内,格式:[特征标签] + [核心优势] + [主要关注点]
+- 只依据候选人档案中的信息,不要编造;必须严格返回JSON格式,不要有任何其他文字
+"""
@@ -1,3 +1,4 @@
+import json
 import logging
 from pathlib import Path
 from typing import List, Dict, Any, Optional
@@ -17,13 +18,16 @@ from llama_index.core.ingestion import IngestionPipeline
 from llama_index.core.schema import BaseNode, TextNode
 from llama_index.core.vector_stores import MetadataFilters, MetadataFilter, FilterOperator
 
-from llama_index.llms.openai_like import OpenAILike
-from llama_index.embeddings.xinference import XinferenceEmbedding
 from llama_index.vector_stores.chroma import ChromaVectorStore
 
-import chromadb
-
 from .data_db.candidate_store import CandidateStore
+from .data_model.ana_model import ResumeAnalysis
+from .doc_ana.compaction import compact_resume
+from .doc_ana.ocr import ocr_fallback
+from .index_tools import DEFAULT_VECTOR_DB_PATH, active_collection_name, open_client
+from .model_clients import build_embed_model, build_llm
+from .prompy import RESUME_ANALYSIS_PROMPT, RESUME_EVALUATION_PROMPT, RESUME_EXTRACTION_PROMPT
+from .telemetry import file_type_of, record_llm_usage, span
 
 logger = logging.getLogger(__name__)
 
@@ -45,10 +49,16 @@ class MultiPositionNodeParser(NodeParser):
         Returns:
             包含完整简历的node列表（每份简历1个node）
         """
-        all_nodes = []
-
         # 从kwargs中获取position_id
         position_id = kwargs.get("position_id")
+        with span("parse_nodes", position=position_id) as s:
+            all_nodes = self._build_nodes(documents, position_id, kwargs.get("doc_key"))
+            s.count("documents", len(documents))
+            s.count("nodes", len(all_nodes))
+        return all_nodes
+
+     def _build_nodes(self, documents: List[Document], position_id: Any, doc_key: str = None) -> List[BaseNode]:
+        all_nodes = []
         # 按文件路径分组（一个文件可能有多页）
         docs_by_filepath = defaultdict(list)  # 自动创建键值
         for doc in documents:
@@ -67,8 +77,13 @@ class MultiPositionNodeParser(NodeParser):
             metadata["candidate_name"] = Path(file_path).stem # 提取无后缀的文件名
             metadata["chunk_type"] = "full_resume"
             metadata["resume_length"] = len(full_text)
+            if doc_key:
+                metadata["doc_key"] = doc_key
 
             node = TextNode(text = full_text, metadata = metadata)
+            if doc_key:
+                # 固定node id，重复摄取同一份简历时覆盖而不是新增
+                node.id_ = node_id_for(position_id, doc_key)
             all_nodes.append(node)
             logger.info(f"创建完整简历node: {metadata['candidate_name']} (长度: {len(full_text)} 字符)")
 
@@ -76,7 +91,7 @@ class MultiPositionNodeParser(NodeParser):
 
 
 class RAGEngine:
-    def _init__(self, config:Dict[str,Any]) -> None:
+    def __init__(self, config:Dict[str,Any]) -> None:
         self.config = config
         self.documents_path = Path("./jddoc")
         self._LlamaIndex_embedding()
@@ -89,32 +104,19 @@ class RAGEngine:
         logger.info("RAGEngine V2 initialized successfully.")
 
     def _LlamaIndex_embedding(self):
-         """配置LlamaIndex的全局LLM和嵌入模型"""
-         Settings.llm = OpenAILike(
-              model = self.config["vllm"]["vllm_model"],
-              api_base= self.config["vllm"]["vllm_api"],
-              api_key= self.config["vllm"]["vllm_key"]
-
-         )
-         Settings.embed_model = XinferenceEmbedding(
-              model_uid=self.config["embedding"]["em_model"],
-              base_url=self.config["embedding"]["base_url"]
-         )
+         """配置LlamaIndex的全局LLM和嵌入模型（经过客户端流控，见backend_control）"""
+         Settings.llm = build_llm(self.config)
+         Settings.embed_model = build_embed_model(self.config)
+         # 两级模型时简历信息提取走小模型
+         small = self.config.get("vllm_small", {})
+         self.small_llm = build_llm(self.config, "llm_small") if small.get("enabled") else None
         
     def _load_or_create_index(self):
-        """加载或创建向量索引"""
-        try:
-            db = chromadb.PersistentClient(
-                path = Path("./vector_db"),
-                tenant="default_tenant",
-                database="default_database"
-
-            )
-        except Exception as e:
-            logger.warning(f"New ChromaDB API failed, trying legacy mode: {e}")
-            db = chromadb.PersistentClient(path="./vector_db")
-        
-        chromadb_collection = db.get_or_create_collection(self.config["model"]["collection_name"])
+        """加载或创建向量索引（collection名按index_tools的指针文件解析，离线重建后自动使用新collection）"""
+        db = open_client(DEFAULT_VECTOR_DB_PATH)
+        collection_name = active_collection_name(self.config["model"]["collection_name"], DEFAULT_VECTOR_DB_PATH)
+        chromadb_collection = db.get_or_create_collection(collection_name)
+        self.chroma_collection = chromadb_collection
         vector_store = ChromaVectorStore(chroma_collection=chromadb_collection)
         storage_context = StorageContext.from_defaults(vector_store=vector_store)
 
@@ -128,7 +130,9 @@ class RAGEngine:
         self,
         file_path:str,
         position_id:int,
-        candidate_name:str = None
+        candidate_name:str = None,
+        doc_key:str = None,
+        reuse_key:str = None
     ) -> bool:
         """
         摄取单个简历到向量数据库
@@ -137,31 +141,66 @@ class RAGEngine:
             file_path: 简历文件路径
             position_id: 岗位ID
             candidate_name: 候选人姓名(可选,默认从文件名提取)
+            doc_key: 文档唯一标识(如文件sha256)，指定后重复摄取是幂等的
+            reuse_key: 近似重复简历的doc_key，本文档没有已存向量时复用它的向量
 
         Returns:
             是否成功
         """
-        try:
-            reader = SimpleDirectoryReader(input_files=[file_path])
-            documents = reader.load_data()
+        with span("ingest", position=position_id, file_type=file_type_of(file_path)) as s:
+            try:
+                with span("load"):
+                    reader = SimpleDirectoryReader(input_files=[file_path])
+                    documents = reader.load_data()
+                    if sum(len(doc.get_content().strip()) for doc in documents) <= 50:
+                        # 扫描件：extract阶段已OCR过时直接命中缓存
+                        text = ocr_fallback(file_path, self.config.get("ocr"))
+                        if text.strip():
+                            s.count("ocr_documents")
+                            documents = [Document(text=text, metadata={"file_path": file_path, "file_name": Path(file_path).name})]
 
-            parser = MultiPositionNodeParser()
-            nodes = parser.get_nodes_from_documents(documents=documents, position_id = position_id)
-            
-            if not nodes:
-                logger.warning(f"未提取到有效节点")
-                return False
-            pipeline = IngestionPipeline(transformations=[Settings.embed_model])
-            nodes_with_embeddings = pipeline.run(nodes=nodes)
-            self.index.insert_nodes(nodes_with_embeddings)
+                parser = MultiPositionNodeParser()
+                nodes = parser.get_nodes_from_documents(documents=documents, position_id = position_id, doc_key = doc_key)
 
-            logger.info("成功插入节点到向量索引")
-            return True
-        
-        except Exception as e:
-            logger.error("简历提取失败")
-            return False
+                if not nodes:
+                    logger.warning(f"未提取到有效节点: {file_path}")
+                    s.fail("未提取到有效节点")
+                    return False
+                embedding = self._stored_embedding(doc_key) if doc_key else None
+                if embedding is None and reuse_key:
+                    embedding = self._stored_embedding(reuse_key)
+                if embedding is not None:
+                    # 同一份（或近似重复的）简历已经向量化过，直接复用向量
+                    for node in nodes:
+                        node.embedding = embedding
+                    nodes_with_embeddings = nodes
+                    s.count("embedding_reused", len(nodes))
+                else:
+                    with span("embed") as embed_span:
+                        pipeline = IngestionPipeline(transformations=[Settings.embed_model])
+                        nodes_with_embeddings = pipeline.run(nodes=nodes)
+                        embed_span.count("nodes", len(nodes_with_embeddings))
+                with span("insert_nodes"):
+                    if doc_key:
+                        self.chroma_collection.delete(ids=[node.node_id for node in nodes_with_embeddings])
+                    self.index.insert_nodes(nodes_with_embeddings)
+
+                logger.info("成功插入节点到向量索引")
+                return True
+
+            except Exception as e:
+                logger.error(f"简历摄取失败({file_path}): {e}", exc_info=True)
+                s.fail(f"{type(e).__name__}: {e}")
+                return False
         
+    def _stored_embedding(self, doc_key: str) -> Optional[List[float]]:
+        """向量库中同一文档（任意岗位下）已有的向量"""
+        result = self.chroma_collection.get(where={"doc_key": doc_key}, limit=1, include=["embeddings"])
+        embeddings = result.get("embeddings")
+        if embeddings is None or len(embeddings) == 0:
+            return None
+        return list(embeddings[0])
+
     def retrieve(
         self,
         query:str,
@@ -198,15 +237,148 @@ class RAGEngine:
             filters = filters
         )
         
-        # 执行检索
-        retrieved_nodes = retriever.retrieve(query)
+        # 执行检索（含查询向量化）
+        with span("retrieve", position=position_id, top_k=top_k) as s:
+            retrieved_nodes = retriever.retrieve(query)
+            s.count("nodes", len(retrieved_nodes))
         logger.info(f"检索到{len(retrieved_nodes)}个节点")
         
         return retrieved_nodes
     
-    def clear_position_data(self, position_id: int):
-        """清空指定岗位的向量数据"""
-        # ChromaDB不直接支持按metadata删除,这里需要重建索引
-        # 实际场景中可以考虑其他方案
-        logger.warning("向量库不支持按metadata删除,建议重建整个索引")
-        pass
+    def analyze_resume(self, resume_text: str, job_description: str) -> ResumeAnalysis:
+        """
+        调用LLM对照岗位描述评估简历并提取结构化信息
+
+        启用两级模型时先由小模型提取档案（llm.extract），再由大模型只根据精简档案评估（llm.evaluate），
+        否则大模型一次完成（llm.complete）。
+
+        Args:
+            resume_text: 简历全文
+            job_description: 岗位描述
+
+        Returns:
+            分析结果(失败时analysis_success为False)
+        """
+        with span("llm.analyze") as s:
+            resume_text = self._compact_resume(resume_text, s)
+            try:
+                if self.small_llm is None:
+                    data = self._complete_json("llm.complete", Settings.llm, RESUME_ANALYSIS_PROMPT.format(
+                        job_description=job_description,
+                        resume_content=resume_text
+                    ))
+                else:
+                    data = _normalize_analysis(self._complete_json("llm.extract", self.small_llm, RESUME_EXTRACTION_PROMPT.format(
+                        resume_content=resume_text
+                    )))
+                    data.update(self._evaluate(data, job_description))
+                return ResumeAnalysis.model_validate(_normalize_analysis(data))
+            except Exception as e:
+                logger.error(f"简历分析失败: {e}")
+                s.fail(f"{type(e).__name__}: {e}")
+                return ResumeAnalysis(analysis_success=False)
+
+    def evaluate_profile(self, profile: Dict[str, Any], job_description: str) -> ResumeAnalysis:
+        """
+        只做评估调用：对已提取过的人员档案（同一份简历投递其他岗位时）按新的岗位描述评估
+
+        Args:
+            profile: 人员档案（见PersonStore，字段为PERSON_PROFILE_FIELDS）
+            job_description: 岗位描述
+
+        Returns:
+            评估结果（经历等提取字段为空，由人员档案提供；失败时analysis_success为False）
+        """
+        with span("llm.analyze") as s:
+            s.count("profile_reused")
+            try:
+                data = self._evaluate(profile, job_description)
+                data["total_year_experience"] = profile.get("total_years_experience", 0)
+                return ResumeAnalysis.model_validate(data)
+            except Exception as e:
+                logger.error(f"简历评估失败: {e}")
+                s.fail(f"{type(e).__name__}: {e}")
+                return ResumeAnalysis(analysis_success=False)
+
+    def _evaluate(self, profile: Dict[str, Any], job_description: str) -> Dict[str, Any]:
+        """大模型根据精简档案评估，只返回评估字段"""
+        evaluation = self._complete_json("llm.evaluate", Settings.llm, RESUME_EVALUATION_PROMPT.format(
+            job_description=job_description,
+            candidate_profile=json.dumps(profile, ensure_ascii=False, separators=(",", ":"))
+        ))
+        return {key: evaluation[key] for key in EVALUATION_FIELDS if key in evaluation}
+
+    def _complete_json(self, stage: str, llm, prompt: str) -> Dict[str, Any]:
+        """调用一次LLM并解析JSON输出，耗时和token用量按stage（即模型档位）分别统计"""
+        with span(stage, model=llm.model) as llm_span:
+            response = llm.complete(prompt)
+            record_llm_usage(llm_span, response)
+        return _parse_llm_json(response.text)
+
+    def _compact_resume(self, resume_text: str, s) -> str:
+        """按配置压缩简历文本，节省的token数记入span（jdsx_resume_tokens_saved_total）"""
+        options = self.config.get("compaction", {})
+        if not options.get("enabled", True):
+            return resume_text
+
+        result = compact_resume(
+            resume_text,
+            token_budget=options.get("token_budget"),
+            drop_sections=tuple(options.get("drop_sections", ("hobbies", "portfolio"))),
+        )
+        s.count("resume_tokens_before", result.original_tokens)
+        s.count("resume_tokens_after", result.compacted_tokens)
+        s.count("resume_tokens_saved", result.tokens_saved)
+        logger.info(f"简历压缩: {result.original_tokens} -> {result.compacted_tokens} tokens，"
+                    f"节省{result.tokens_saved}")
+        return result.text
+
+    def clear_position_data(self, position_id: int) -> int:
+        """
+        删除指定岗位的全部向量，返回删除的节点数
+
+        Chroma只做逻辑删除，大量删除后可离线执行 index_tools rebuild 回收空间。
+        """
+        with span("index.clear_position", position=position_id) as s:
+            ids = self.chroma_collection.get(where={"position_id": position_id}, include=[])["ids"]
+            if ids:
+                self.chroma_collection.delete(ids=ids)
+            s.count("nodes", len(ids))
+        logger.info(f"已删除岗位{position_id}的{len(ids)}个向量节点")
+        return len(ids)
+
+
+def node_id_for(position_id: Any, doc_key: str) -> str:
+    """按岗位+文档标识生成的固定node id"""
+    return f"resume-{position_id}-{doc_key}"
+
+
+# 评估调用产出的字段，其余字段来自提取调用
+EVALUATION_FIELDS = ("recommendation_level", "key_strengths", "key_concerns", "one_sentence_summary")
+
+
+def _parse_llm_json(text: str) -> Dict[str, Any]:
+    """从LLM输出中取出JSON（去掉Qwen3的<think>块和```json代码块标记）"""
+    text = re.sub(r"<think>.*?</think>", "", text, flags=re.S).strip()
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        raise ValueError(f"LLM输出中没有JSON: {text[:200]}")
+    return json.loads(text[start:end + 1])
+
+
+def _normalize_analysis(data: Dict[str, Any]) -> Dict[str, Any]:
+    """把Prompt中的字段名对齐到ResumeAnalysis模型"""
+    if "total_years_experience" in data and "total_year_experience" not in data:
+        data["total_year_experience"] = data.pop("total_years_experience")
+    for work in data.get("work_experience") or []:
+        if "start_date" in work:
+            work["start_time"] = work.pop("start_date")
+        if "end_date" in work:
+            work["end_time"] = work.pop("end_date")
+    for project in data.get("project_experience") or []:
+        if "name" in project and "pro_name" not in project:
+            project["pro_name"] = project.pop("name")
+    for education in data.get("education") or []:
+        if "end_date" in education:
+            education["end_time"] = education.pop("end_date")
+    return data
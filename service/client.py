@@ -0,0 +1,336 @@
+"""数据服务的瘦客户端
+
+界面/API进程在service部署模式下不打开向量库和SQLite，改用这里与本地存储同名同参数的客户端：
+RemotePositionStore、RemoteCandidateStore（含.blobs）、RemoteNoteStore、RemoteJobStore、RemoteRAGEngine。
+每个线程复用一个keep-alive连接；retrieve_many/ingest_many等批量接口一次请求带多个调用，由服务端并行执行。
+
+    services = connect_services(get_config())   # 按config["deployment"]["mode"]返回本地或远程实现
+    services.candidates.get_by_position(position_id)
+"""
+
+import http.client
+import io
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from ..backend_control import current_priority
+from .protocol import PRIORITY_HEADER, dumps, loads
+
+DEFAULT_SERVICE_URL = "http://127.0.0.1:8765"
+
+
+class ServiceError(RuntimeError):
+    """服务端执行失败（error_type为服务端的异常类型名）"""
+
+    def __init__(self, message: str, error_type: str = None):
+        super().__init__(message)
+        self.error_type = error_type
+
+
+class ServiceClient:
+    """数据服务的HTTP客户端（线程安全，每个线程一个连接）"""
+
+    def __init__(self, base_url: str = DEFAULT_SERVICE_URL, timeout: float = 300.0):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _request(self, method: str, path: str, body: bytes = None) -> Tuple[int, bytes]:
+        headers = {PRIORITY_HEADER: current_priority()}
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        # 复用的连接可能已被服务端关闭（服务重启、空闲超时），换新连接重试一次
+        for attempt in range(2):
+            conn = getattr(self._local, "conn", None)
+            reused = conn is not None
+            if conn is None:
+                conn = self._local.conn = self._new_connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                return response.status, response.read()
+            except (ConnectionError, http.client.HTTPException, OSError):
+                conn.close()
+                self._local.conn = None
+                if not reused or attempt:
+                    raise
+        raise AssertionError("unreachable")
+
+    def call_many(self, calls: Iterable[Tuple[str, str, tuple, dict]], parallel: bool = False) -> List[Any]:
+        """
+        一次请求执行多个调用 [(target, method, args, kwargs)]
+
+        parallel为True时服务端并行执行（调用之间不能有先后依赖）；任一调用失败抛出ServiceError
+        """
+        calls = [{"target": t, "method": m, "args": list(a), "kwargs": kw} for t, m, a, kw in calls]
+        if not calls:
+            return []
+        status, data = self._request("POST", "/rpc", dumps({"calls": calls, "parallel": parallel}))
+        response = loads(data)
+        if status != 200:
+            raise ServiceError(response.get("error", f"HTTP {status}"))
+        values = []
+        for call, result in zip(calls, response["results"]):
+            if not result["ok"]:
+                raise ServiceError(f"{call['target']}.{call['method']}: {result['error']}", result.get("type"))
+            values.append(result["value"])
+        return values
+
+    def call(self, target: str, method: str, *args, **kwargs) -> Any:
+        return self.call_many([(target, method, args, kwargs)])[0]
+
+    def open_stream(self, path: str) -> http.client.HTTPResponse:
+        """流式GET（单独的连接，读完或关闭响应后释放）"""
+        conn = self._new_connection()
+        conn.request("GET", path, headers={PRIORITY_HEADER: current_priority()})
+        response = conn.getresponse()
+        if response.status != 200:
+            response.read()
+            conn.close()
+            raise ServiceError(f"GET {path}: HTTP {response.status}")
+        return response
+
+    def upload_stream(self, path: str, stream: BinaryIO) -> Any:
+        """流式POST文件流（从当前位置到末尾，单独的连接，不整体读入内存），返回解码后的响应"""
+        start = stream.tell()
+        size = stream.seek(0, io.SEEK_END) - start
+        stream.seek(start)
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout, blocksize=1 << 16)
+        try:
+            conn.request("POST", path, body=stream, headers={
+                PRIORITY_HEADER: current_priority(),
+                "Content-Type": "application/octet-stream",
+                "Content-Length": str(size),
+            })
+            response = conn.getresponse()
+            data = loads(response.read())
+        finally:
+            conn.close()
+        if response.status != 200:
+            raise ServiceError(f"POST {path}: {data.get('error', f'HTTP {response.status}')}")
+        return data
+
+    def health(self) -> bool:
+        try:
+            return self._request("GET", "/health")[0] == 200
+        except OSError:
+            return False
+
+
+class RemoteStore:
+    """把方法调用转发给服务端同名存储（target）"""
+
+    target: str = None
+
+    def __init__(self, client: ServiceClient):
+        self._client = client
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def _call(*args, **kwargs):
+            return self._client.call(self.target, name, *args, **kwargs)
+
+        _call.__name__ = name
+        return _call
+
+
+class RemotePositionStore(RemoteStore):
+    target = "positions"
+
+
+class RemoteNoteStore(RemoteStore):
+    target = "notes"
+
+
+class RemoteJobStore(RemoteStore):
+    target = "jobs"
+
+    def enqueue_batch(self, position_id: int, files: Iterable[Tuple[str, BinaryIO]], priority: int = 0, max_attempts: int = 5) -> int:
+        """文件逐个流式上传到服务端的简历存储（POST /blobs），再按sha256入队"""
+        uploaded = []
+        for file_name, stream in files:
+            query = urlencode({"ext": Path(file_name).suffix.lower()})
+            uploaded.append((file_name, self._client.upload_stream(f"/blobs?{query}", stream)["sha256"]))
+        return self._client.call("service", "enqueue_batch", position_id, uploaded, priority, max_attempts)
+
+
+class RemoteBlobStore:
+    """简历原文件（只读）：存在性查询走RPC，内容流式下载"""
+
+    def __init__(self, client: ServiceClient):
+        self._client = client
+
+    def exists(self, sha256: str) -> bool:
+        return self._client.call("blobs", "exists", sha256)
+
+    def open(self, sha256: str) -> BinaryIO:
+        """与本地ResumeBlobStore.open一样返回BufferedReader（HTTP响应本身不被下载组件等接受）"""
+        return io.BufferedReader(self._client.open_stream(f"/blobs/{sha256}"))
+
+    def iter_chunks(self, sha256: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        with self.open(sha256) as response:
+            while True:
+                chunk = response.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def copy_to(self, sha256: str, target) -> Any:
+        with self.open(sha256) as src, open(target, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+        return target
+
+
+class RemoteCandidateStore(RemoteStore):
+    target = "candidates"
+
+    def __init__(self, client: ServiceClient):
+        super().__init__(client)
+        self.blobs = RemoteBlobStore(client)
+
+
+class RemoteRAGEngine:
+    """RAGEngine的瘦客户端（向量库和模型调用都在服务进程内）"""
+
+    def __init__(self, client: ServiceClient):
+        self._client = client
+
+    def ingest_resume(self, file_path: str, position_id: int, candidate_name: str = None, doc_key: str = None, reuse_key: str = None) -> bool:
+        """file_path为服务所在机器上的路径"""
+        return self._client.call("engine", "ingest_resume", file_path, position_id, candidate_name, doc_key, reuse_key)
+
+    def ingest_many(self, items: List[Dict[str, Any]]) -> List[bool]:
+        """批量摄取，items为ingest_resume的关键字参数，服务端并行执行"""
+        return self._client.call_many([("engine", "ingest_resume", (), item) for item in items], parallel=True)
+
+    def retrieve(self, query: str, position_id: int = None, top_k: int = 5) -> List[Any]:
+        return self.retrieve_many([query], position_id, top_k)[0]
+
+    def retrieve_many(self, queries: List[str], position_id: int = None, top_k: int = 5) -> List[List[Any]]:
+        """多个查询一次请求，服务端并行检索"""
+        results = self._client.call_many(
+            [("engine", "retrieve", (query, position_id, top_k), {}) for query in queries], parallel=True
+        )
+        return [[_to_node(node) for node in nodes] for nodes in results]
+
+    def analyze_resume(self, resume_text: str, job_description: str):
+        return self._client.call("engine", "analyze_resume", resume_text, job_description)
+
+    def evaluate_profile(self, profile: Dict[str, Any], job_description: str):
+        return self._client.call("engine", "evaluate_profile", profile, job_description)
+
+    def clear_position_data(self, position_id: int) -> int:
+        return self._client.call("engine", "clear_position_data", position_id)
+
+
+def _to_node(data: Dict[str, Any]):
+    from llama_index.core.schema import NodeWithScore, TextNode
+
+    return NodeWithScore(node=TextNode(id_=data["node_id"], text=data["text"], metadata=data["metadata"]), score=data["score"])
+
+
+# ---------------- 部署模式 ----------------
+
+class LocalServices:
+    """local模式：在本进程内直接打开存储和向量库（单个界面进程时使用）"""
+
+    mode = "local"
+
+    def __init__(self, config: Dict[str, Any]):
+        from ..data_db.candidate_store import CandidateStore
+        from ..data_db.candinote_store import NoteStore
+        from ..data_db.job_store import JobStore
+        from ..data_db.position_store import PositionStore
+
+        self.config = config
+        self.positions = PositionStore()
+        self.candidates = CandidateStore()
+        self.notes = NoteStore()
+        self.jobs = JobStore()
+        self._engine = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        with self._lock:
+            if self._engine is None:
+                from ..rag_engine import RAGEngine
+                self._engine = RAGEngine(self.config)
+            return self._engine
+
+    def export_position(self, position_id: int, fmt: str, target: BinaryIO) -> None:
+        from ..data_db.candidate_export import export_position
+        export_position(position_id, fmt, target)
+
+    def enqueue_batch(self, position_id: int, files: Iterable[Tuple[str, BinaryIO]], priority: int = 0) -> int:
+        """批量上传的简历入队（候选人已删除的文件可以重新上传）"""
+        return self.jobs.enqueue_batch(position_id, files, priority, candidate_exists=self.candidates.exists)
+
+    def enqueue_reevaluation(self, position_id: int) -> Optional[int]:
+        from ..job_worker import enqueue_reevaluation
+        return enqueue_reevaluation(position_id, self.candidates, self.positions, self.jobs)
+
+
+class RemoteServices:
+    """service模式：所有数据访问经由数据服务进程"""
+
+    mode = "service"
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.client = client_from_config(config)
+        self.positions = RemotePositionStore(self.client)
+        self.candidates = RemoteCandidateStore(self.client)
+        self.notes = RemoteNoteStore(self.client)
+        self.jobs = RemoteJobStore(self.client)
+        self.engine = RemoteRAGEngine(self.client)
+
+    def export_position(self, position_id: int, fmt: str, target: BinaryIO) -> None:
+        with self.client.open_stream(f"/export/{position_id}?{urlencode({'fmt': fmt})}") as response:
+            shutil.copyfileobj(response, target, 1 << 20)
+
+    def enqueue_batch(self, position_id: int, files: Iterable[Tuple[str, BinaryIO]], priority: int = 0) -> int:
+        return self.jobs.enqueue_batch(position_id, files, priority)
+
+    def enqueue_reevaluation(self, position_id: int) -> Optional[int]:
+        return self.client.call("service", "enqueue_reevaluation", position_id)
+
+
+def client_from_config(config: Dict[str, Any]) -> ServiceClient:
+    section = config.get("deployment", {})
+    return ServiceClient(section.get("service_url", DEFAULT_SERVICE_URL), section.get("timeout", 300.0))
+
+
+def is_service_mode(config: Dict[str, Any]) -> bool:
+    mode = config.get("deployment", {}).get("mode", "local")
+    if mode not in ("local", "service"):
+        raise ValueError(f"未知的部署模式: {mode}")
+    return mode == "service"
+
+
+def connect_engine(config: Dict[str, Any]):
+    """
+    只需要RAGEngine的进程（如后台筛选worker）使用：service模式下返回RemoteRAGEngine，
+    向量库只由数据服务进程打开，worker不再各自用嵌入式Chroma写./vector_db
+    """
+    if is_service_mode(config):
+        return RemoteRAGEngine(client_from_config(config))
+    from ..rag_engine import RAGEngine
+    return RAGEngine(config)
+
+
+def connect_services(config: Dict[str, Any]):
+    """按部署模式返回LocalServices或RemoteServices"""
+    if is_service_mode(config):
+        return RemoteServices(config)
+    return LocalServices(config)
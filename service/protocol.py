@@ -0,0 +1,69 @@
+"""数据服务的请求/响应编码
+
+JSON之外需要保留的类型：
+    - pydantic模型（Position、CandidateProfile、ResumeAnalysis等）：{"__model__": 类名, "data": ...}
+    - bytes：{"__bytes__": base64}（简历文件不经过这里，走POST /blobs流式上传）
+    - 键不是字符串的dict（如 {candidate_id: ...}）：{"__items__": [[键, 值], ...]}
+    - datetime：{"__datetime__": ISO格式}
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Type
+
+from pydantic import BaseModel
+
+from ..data_model.ana_model import ResumeAnalysis
+from ..data_model.candidate import CandidateProfile
+from ..data_model.position import Position, PrescreenRules
+
+MODELS: Dict[str, Type[BaseModel]] = {
+    model.__name__: model for model in (Position, PrescreenRules, CandidateProfile, ResumeAnalysis)
+}
+
+# 调用方的优先级（backend_control.current_priority），服务端在同一优先级下执行模型调用
+PRIORITY_HEADER = "X-Request-Priority"
+
+
+def encode(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        name = type(value).__name__
+        if name not in MODELS:
+            raise TypeError(f"不支持传输的模型类型: {name}")
+        return {"__model__": name, "data": value.model_dump(mode="json")}
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {"__bytes__": base64.b64encode(bytes(value)).decode("ascii")}
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, dict):
+        if all(isinstance(key, str) for key in value):
+            return {key: encode(item) for key, item in value.items()}
+        return {"__items__": [[encode(key), encode(item)] for key, item in value.items()]}
+    if isinstance(value, (list, tuple, set)):
+        return [encode(item) for item in value]
+    return value
+
+
+def decode(value: Any) -> Any:
+    if isinstance(value, list):
+        return [decode(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if "__model__" in value:
+        return MODELS[value["__model__"]].model_validate(value["data"])
+    if "__bytes__" in value:
+        return base64.b64decode(value["__bytes__"])
+    if "__datetime__" in value:
+        return datetime.fromisoformat(value["__datetime__"])
+    if "__items__" in value:
+        return {decode(key): decode(item) for key, item in value["__items__"]}
+    return {key: decode(item) for key, item in value.items()}
+
+
+def dumps(value: Any) -> bytes:
+    return json.dumps(encode(value), ensure_ascii=False, default=str).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    return decode(json.loads(data.decode("utf-8")))
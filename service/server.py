@@ -0,0 +1,370 @@
+"""本机数据服务：独占向量库和SQLite，供多个界面/API进程共用
+
+多个Streamlit/API进程各自打开./vector_db（嵌入式Chroma）和SQLite时，写入会争抢文件锁，
+Chroma也不支持多进程同时写。部署模式为service时（config["deployment"]["mode"]），
+由这一个进程打开向量库和所有数据库，界面进程通过service.client中的瘦客户端访问
+（后台筛选worker的向量写入和模型调用也经由本服务，见service.client.connect_engine）：
+    - POST /rpc：批量调用，一个请求带多个 {target, method, args, kwargs}，按顺序执行
+      （parallel为true时在线程池中并行执行，用于批量检索/摄取）；只能调用白名单内的方法
+    - 候选人/备注/岗位的写操作交给WriteBatcher，多个界面进程的并发写入合并到同一事务提交
+    - POST /blobs?ext=.pdf：流式上传简历文件（写入简历存储），返回sha256，批量上传再按sha256入队
+    - GET /blobs/<sha256>：流式下载简历原文件；GET /export/<岗位id>?fmt=csv：流式导出（分块传输）
+    - GET /health
+调用方的模型调用优先级通过请求头传递，界面发起的重新分析仍按交互优先级调度。
+只监听本机地址；摄取接口的file_path是服务所在机器上的路径。
+
+用法（在包的上级目录执行，先于界面进程启动）:
+    python -m <包名>.service.server --port 8765
+"""
+
+import argparse
+import logging
+import signal
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from ..backend_control import PRIORITIES, request_priority
+from ..config import get_config
+from ..data_db.async_store import WriteBatcher
+from ..data_db.candidate_store import CandidateStore
+from ..data_db.candinote_store import NoteStore
+from ..data_db.database import DEFAULT_DB_PATH, DEFAULT_JOBS_DB_PATH
+from ..data_db.job_store import JobStore
+from ..data_db.position_store import PositionStore
+from ..telemetry import span
+from .protocol import PRIORITY_HEADER, dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# 可远程调用的方法
+READS: Dict[str, set] = {
+    "positions": {"get_by_id", "get_all", "get_prescreen_rules", "get_data_version", "count_candidates",
+                  "get_all_with_stats", "get_retrieval_labels", "get_labelled_position_ids"},
+    "candidates": {"get_by_id", "exists", "get_id_by_blob", "get_stale", "count_stale", "get_by_position",
+                   "get_data_version", "get_stats_by_position", "get_stats_for_positions"},
+    "notes": {"get_notes", "get_note_count", "get_note_counts", "get_latest_notes"},
+    "jobs": {"get_batch_progress", "list_batches", "has_pending"},
+    "blobs": {"exists"},
+    "engine": {"retrieve", "analyze_resume", "evaluate_profile"},
+}
+WRITES: Dict[str, set] = {
+    "positions": {"create", "update", "set_prescreen_rules", "delete", "set_retrieval_labels", "label_from_hr_tags"},
+    "candidates": {"save", "update_analysis", "update_hr_tag", "delete", "rebuild_stats"},
+    "notes": {"add_note", "delete_note"},
+    "jobs": {"retry_failed"},
+    "engine": {"ingest_resume", "clear_position_data"},
+    "service": {"enqueue_batch", "enqueue_reevaluation"},
+}
+# 公开方法只是 with connect(): self._方法(conn, ...) 的写操作，改由WriteBatcher合并提交
+GROUP_COMMIT = {
+    ("positions", "create"), ("positions", "update"),
+    ("candidates", "save"), ("candidates", "update_analysis"), ("candidates", "update_hr_tag"),
+    ("notes", "add_note"), ("notes", "delete_note"),
+}
+
+
+class DataService:
+    """服务进程内的存储和RAGEngine（RAGEngine首次用到时创建）"""
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        db_path: str = DEFAULT_DB_PATH,
+        jobs_db_path: str = DEFAULT_JOBS_DB_PATH,
+        rpc_workers: int = 8,
+    ):
+        self.config = config
+        self.positions = PositionStore(db_path)
+        self.candidates = CandidateStore(db_path)
+        self.notes = NoteStore(db_path)
+        self.jobs = JobStore(jobs_db_path)
+        self.blobs = self.candidates.blobs
+        self.writer = WriteBatcher(db_path)
+        self.pool = ThreadPoolExecutor(max_workers=rpc_workers, thread_name_prefix="rpc")
+        self._engine = None
+        self._engine_lock = threading.Lock()
+
+    @property
+    def engine(self):
+        with self._engine_lock:
+            if self._engine is None:
+                from ..rag_engine import RAGEngine
+                self._engine = RAGEngine(self.config)
+            return self._engine
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        self.writer.close()
+
+    # ---------------- 调用 ----------------
+
+    def _resolve(self, target: str, method: str) -> Callable:
+        if method not in READS.get(target, set()) | WRITES.get(target, set()):
+            raise PermissionError(f"不允许远程调用: {target}.{method}")
+        if target == "service":
+            return getattr(self, method)
+        owner = getattr(self, target)
+        if (target, method) in GROUP_COMMIT:
+            private = getattr(owner, f"_{method}")
+            return lambda *args, **kwargs: self.writer.submit(private, *args, **kwargs).result()
+        return getattr(owner, method)
+
+    def call(self, target: str, method: str, args: List[Any], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """执行单个调用，异常作为结果返回（不影响同批其他调用）"""
+        try:
+            result = self._resolve(target, method)(*args, **kwargs)
+            if (target, method) == ("engine", "retrieve"):
+                result = [_node_to_dict(node) for node in result]
+            return {"ok": True, "value": result}
+        except Exception as e:
+            if not isinstance(e, PermissionError):
+                logger.warning(f"远程调用{target}.{method}失败: {type(e).__name__}: {e}")
+            return {"ok": False, "error": str(e), "type": type(e).__name__}
+
+    def call_batch(self, calls: List[Dict[str, Any]], parallel: bool = False, priority: str = None) -> List[Dict[str, Any]]:
+        def _one(call: Dict[str, Any]) -> Dict[str, Any]:
+            # 线程池中执行时ContextVar不随线程传递，在这里重新设置优先级
+            with request_priority(priority) if priority in PRIORITIES else nullcontext():
+                return self.call(call["target"], call["method"], call.get("args", []), call.get("kwargs", {}))
+
+        with span("service.rpc") as s:
+            s.count("calls", len(calls))
+            if parallel and len(calls) > 1:
+                return list(self.pool.map(_one, calls))
+            return [_one(call) for call in calls]
+
+    def enqueue_batch(self, position_id: int, files: List[Tuple[str, str]], priority: int = 0, max_attempts: int = 5) -> int:
+        """批量上传的简历入队，files为 (原文件名, sha256)，文件已经由POST /blobs流式存入简历存储"""
+        missing = [sha256 for _, sha256 in files if not self.blobs.exists(sha256)]
+        if missing:
+            raise FileNotFoundError(f"简历文件未上传或已被清理: {', '.join(missing)}")
+
+        def _open_uploaded():
+            # 逐个打开，入队时一次只有一个文件流
+            for file_name, sha256 in files:
+                with self.blobs.open(sha256) as stream:
+                    yield file_name, stream
+
+        return self.jobs.enqueue_batch(position_id, _open_uploaded(), priority, max_attempts,
+                                       candidate_exists=self.candidates.exists)
+
+    def enqueue_reevaluation(self, position_id: int) -> Optional[int]:
+        """岗位描述修改后已有候选人重新评估入队（源文件路径在服务端解析）"""
+        from ..job_worker import enqueue_reevaluation
+        return enqueue_reevaluation(position_id, self.candidates, self.positions, self.jobs)
+
+    def export_position(self, position_id: int, fmt: str, target) -> None:
+        from ..data_db.candidate_export import export_position
+        export_position(position_id, fmt, target, db_path=str(self.candidates.db_path))
+
+
+def _node_to_dict(node) -> Dict[str, Any]:
+    """NodeWithScore -> 可JSON编码的dict（客户端再还原）"""
+    return {
+        "node_id": node.node.node_id,
+        "text": node.node.get_content(),
+        "metadata": dict(node.node.metadata),
+        "score": node.score,
+    }
+
+
+class _BodyReader:
+    """按Content-Length读取请求体，读完后返回空bytes（不越过本请求读到下一个keep-alive请求）"""
+
+    def __init__(self, rfile, length: int):
+        self.rfile = rfile
+        self.remaining = length
+        self.consumed = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b""
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.rfile.read(size)
+        if not data:
+            self.remaining = 0
+            return data
+        self.remaining -= len(data)
+        self.consumed += len(data)
+        return data
+
+
+class _ChunkedWriter:
+    """把写入转为HTTP/1.1分块传输，导出时边生成边发送"""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if data:
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + bytes(data) + b"\r\n")
+            self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def seekable(self) -> bool:
+        return False
+
+    def flush(self):
+        self.wfile.flush()
+
+    def close(self):
+        # 写出器（如pyarrow）可能自己关闭目标，结束块只发一次
+        if not self.closed:
+            self.closed = True
+            self.wfile.write(b"0\r\n\r\n")
+
+
+def make_handler(service: DataService):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive，客户端每个线程复用一个连接
+        timeout = 300  # 空闲连接超过该秒数关闭，释放处理线程
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _send(self, status: int, body: bytes, content_type: str = "application/json"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            parts = urlsplit(self.path)
+            if parts.path == "/blobs":
+                self._receive_blob(parse_qs(parts.query).get("ext", [""])[0])
+                return
+            if parts.path != "/rpc":
+                self.send_error(404)
+                return
+            try:
+                request = loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            except Exception as e:
+                self._send(400, dumps({"error": f"请求无法解析: {e}"}))
+                return
+            results = service.call_batch(
+                request.get("calls", []), request.get("parallel", False), self.headers.get(PRIORITY_HEADER)
+            )
+            self._send(200, dumps({"results": results}))
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            segments = [s for s in parts.path.split("/") if s]
+            if segments == ["health"]:
+                self._send(200, dumps({"ok": True}))
+            elif len(segments) == 2 and segments[0] == "blobs":
+                self._send_blob(segments[1])
+            elif len(segments) == 2 and segments[0] == "export" and segments[1].isdigit():
+                query = parse_qs(parts.query)
+                self._send_export(int(segments[1]), query.get("fmt", ["csv"])[0])
+            else:
+                self.send_error(404)
+
+        def _send_blob(self, sha256: str):
+            if not (len(sha256) == 64 and all(c in "0123456789abcdef" for c in sha256)) or not service.blobs.exists(sha256):
+                self.send_error(404)
+                return
+            path = service.blobs.path(sha256)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(path.stat().st_size))
+            self.end_headers()
+            for chunk in service.blobs.iter_chunks(sha256):
+                self.wfile.write(chunk)
+
+        def _receive_blob(self, ext: str):
+            """请求体边读边写入简历存储（put_stream边写边算hash），返回 {"sha256": ...}"""
+            if "Content-Length" not in self.headers:
+                self._send(411, dumps({"error": "需要Content-Length"}))
+                return
+            body = _BodyReader(self.rfile, int(self.headers["Content-Length"]))
+            try:
+                with span("service.upload") as s:
+                    sha256 = service.blobs.put_stream(body, ext=ext[:16])
+                    s.count("bytes", body.consumed)
+            except Exception as e:
+                logger.error(f"接收上传文件失败: {e}")
+                self.close_connection = True
+                self._send(500, dumps({"error": str(e)}))
+                return
+            if body.remaining:
+                # 客户端提前断开
+                self.close_connection = True
+                return
+            self._send(200, dumps({"sha256": sha256}))
+
+        def _send_export(self, position_id: int, fmt: str):
+            from ..data_db.candidate_export import EXPORT_FORMATS
+            if fmt not in EXPORT_FORMATS:
+                self._send(400, dumps({"error": f"不支持的导出格式: {fmt}"}))
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", EXPORT_FORMATS[fmt])
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            writer = _ChunkedWriter(self.wfile)
+            try:
+                with span("service.export", position=position_id):
+                    service.export_position(position_id, fmt, writer)
+            except Exception as e:
+                # 响应头已发出，只能断开连接让客户端看到不完整的传输
+                logger.error(f"导出岗位{position_id}失败: {e}")
+                self.close_connection = True
+                return
+            writer.close()
+
+    return Handler
+
+
+def serve(
+    config: Dict[str, Any] = None,
+    host: str = None,
+    port: int = None,
+    db_path: str = DEFAULT_DB_PATH,
+    jobs_db_path: str = DEFAULT_JOBS_DB_PATH,
+) -> ThreadingHTTPServer:
+    """创建服务（调用方负责serve_forever和关闭）"""
+    config = config or get_config()
+    section = config.get("deployment", {})
+    service = DataService(config, db_path, jobs_db_path, section.get("rpc_workers", 8))
+    server = ThreadingHTTPServer((host or section.get("host", "127.0.0.1"), port or section.get("port", 8765)), make_handler(service))
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本机数据服务（向量库和数据库）")
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    parser.add_argument("--jobs-db", default=DEFAULT_JOBS_DB_PATH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    server = serve(host=args.host, port=args.port, db_path=args.db, jobs_db_path=args.jobs_db)
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    logger.info(f"数据服务已启动: http://{server.server_address[0]}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
+        logger.info("数据服务已停止")
+
+
+if __name__ == "__main__":
+    main()
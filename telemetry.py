@@ -0,0 +1,372 @@
+"""埋点：分阶段计时span、计数器和直方图
+
+    with span("embed", position=position_id, file_type=".pdf") as s:
+        ...
+        s.count("nodes", len(nodes))
+
+    @traced("extract")
+    def extract_text_from_file(...): ...
+
+每个span按(stage, position, file_type, outcome)记录耗时直方图和次数，
+span.count()记录的数量（节点数、token数等）累加到计数器；span之间按调用关系嵌套，
+结束时输出一行JSON日志（trace_id/span_id/parent_id），可以还原一批简历的耗时分布。
+指标以Prometheus文本格式导出：render_prometheus() 或 start_metrics_server(port)。
+"""
+
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "jdsx"
+LABEL_NAMES = ("stage", "position", "file_type", "outcome")
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+OUTCOME_OK = "ok"
+OUTCOME_FAILED = "failed"    # 正常返回但结果为失败（如提取不到文本）
+OUTCOME_ERROR = "error"      # 抛出异常
+
+
+class _Histogram:
+    __slots__ = ("buckets", "count", "sum")
+
+    def __init__(self):
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+
+
+class Registry:
+    """进程内指标存储（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._durations: Dict[Tuple[str, ...], _Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._gauges: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+
+    def observe(self, labels: Tuple[str, ...], seconds: float):
+        with self._lock:
+            histogram = self._durations.get(labels)
+            if histogram is None:
+                histogram = self._durations[labels] = _Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def reset(self):
+        with self._lock:
+            self._durations.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前指标的字典形式（压测报告、调试用）"""
+        with self._lock:
+            return {
+                "durations": [
+                    {**dict(zip(LABEL_NAMES, labels)), "count": h.count, "sum": h.sum}
+                    for labels, h in self._durations.items()
+                ],
+                "counters": [
+                    {"name": name, **dict(labels), "value": value}
+                    for (name, labels), value in self._counters.items()
+                ],
+                "gauges": [
+                    {"name": name, **dict(labels), "value": value}
+                    for (name, labels), value in self._gauges.items()
+                ],
+            }
+
+    def render_prometheus(self) -> str:
+        """Prometheus文本格式（exposition format 0.0.4）"""
+        duration = f"{METRIC_PREFIX}_stage_duration_seconds"
+        lines = [
+            f"# HELP {duration} 各阶段耗时",
+            f"# TYPE {duration} histogram",
+        ]
+        with self._lock:
+            durations = sorted((labels, h.buckets[:], h.count, h.sum) for labels, h in self._durations.items())
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+
+        for labels, buckets, count, total in durations:
+            base = _format_labels(zip(LABEL_NAMES, labels))
+            for bound, value in zip(DURATION_BUCKETS, buckets):
+                lines.append(f"{duration}_bucket{_format_labels(zip(LABEL_NAMES, labels), le=repr(bound))} {value}")
+            lines.append(f"{duration}_bucket{_format_labels(zip(LABEL_NAMES, labels), le='+Inf')} {count}")
+            lines.append(f"{duration}_sum{base} {total}")
+            lines.append(f"{duration}_count{base} {count}")
+
+        seen = set()
+        for (name, labels), value in counters:
+            metric = f"{METRIC_PREFIX}_{name}_total"
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+
+        for (name, labels), value in gauges:
+            metric = f"{METRIC_PREFIX}_{name}"
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(pairs, **extra) -> str:
+    items = list(pairs) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = Registry()
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("telemetry_span", default=None)
+_log_spans = True
+
+
+class Span:
+    """一次阶段执行，labels在结束前都可以补充"""
+
+    __slots__ = ("stage", "labels", "outcome", "error", "counts", "attrs",
+                 "trace_id", "span_id", "parent_id", "started", "duration")
+
+    def __init__(self, stage: str, parent: Optional["Span"], labels: Dict[str, Any]):
+        self.stage = stage
+        self.labels = labels
+        self.outcome = OUTCOME_OK
+        self.error: Optional[str] = None
+        self.counts: Dict[str, float] = {}
+        self.attrs: Dict[str, Any] = {}
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:8]
+        self.parent_id = parent.span_id if parent else None
+        self.started = time.perf_counter()
+        self.duration = 0.0
+
+    def set(self, **labels):
+        """补充position/file_type等标签，未指定时继承父span"""
+        self.labels.update({k: v for k, v in labels.items() if v is not None})
+
+    def count(self, name: str, value: float = 1):
+        """累加数量（节点数、prompt_tokens等）"""
+        if value:
+            self.counts[name] = self.counts.get(name, 0) + value
+
+    def fail(self, reason: str = None):
+        self.outcome = OUTCOME_FAILED
+        if reason:
+            self.error = reason
+
+    def label(self, name: str) -> str:
+        value = self.labels.get(name)
+        return "" if value is None else str(value)
+
+
+@contextmanager
+def span(stage: str, position: Any = None, file_type: str = None, **attrs) -> Iterator[Span]:
+    """
+    计时一个阶段
+
+    Args:
+        stage: 阶段名（extract、embed、llm.analyze、store.candidate.save等）
+        position: 岗位ID，未指定时继承父span
+        file_type: 文件类型（.pdf/.docx/.txt），未指定时继承父span
+        **attrs: 只写入日志的附加字段
+    """
+    parent = _current_span.get()
+    labels = dict(parent.labels) if parent else {}
+    current = Span(stage, parent, labels)
+    current.set(position=position, file_type=file_type)
+    current.attrs.update(attrs)
+
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.outcome = OUTCOME_ERROR
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        _finish(current)
+
+
+def _finish(current: Span):
+    current.duration = time.perf_counter() - current.started
+    labels = (current.stage, current.label("position"), current.label("file_type"), current.outcome)
+    REGISTRY.observe(labels, current.duration)
+    for name, value in current.counts.items():
+        REGISTRY.inc(name, value, stage=current.stage)
+
+    level = logging.WARNING if current.outcome == OUTCOME_ERROR else logging.DEBUG
+    if _log_spans and logger.isEnabledFor(level):
+        record = {
+            "event": "span",
+            "stage": current.stage,
+            "trace_id": current.trace_id,
+            "span_id": current.span_id,
+            "parent_id": current.parent_id,
+            "position": current.labels.get("position"),
+            "file_type": current.labels.get("file_type"),
+            "outcome": current.outcome,
+            "duration_ms": round(current.duration * 1000, 3),
+        }
+        if current.counts:
+            record["counts"] = current.counts
+        if current.attrs:
+            record["attrs"] = current.attrs
+        if current.error:
+            record["error"] = current.error
+        logger.log(level, json.dumps(record, ensure_ascii=False, default=str))
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def file_type_of(file_path: Any) -> str:
+    return Path(str(file_path)).suffix.lower() if file_path else ""
+
+
+def traced(stage: str, outcome: Callable[[Any], bool] = None):
+    """
+    函数级span装饰器
+
+    参数中有position_id（或带position_id属性的对象，如CandidateProfile）时作为position标签，
+    有file_path时取扩展名作为file_type标签；outcome(返回值)为False时记为failed。
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            position, file_type = _labels_from_args(signature, args, kwargs)
+            with span(stage, position=position, file_type=file_type) as s:
+                result = fn(*args, **kwargs)
+                if outcome is not None and not outcome(result):
+                    s.fail()
+                return result
+        return wrapper
+    return decorator
+
+
+def call_labels(fn: Callable, args: tuple, kwargs: dict) -> Tuple[Any, Optional[str]]:
+    """从调用参数中取(position, file_type)标签"""
+    return _labels_from_args(inspect.signature(fn), args, kwargs)
+
+
+def _labels_from_args(signature: inspect.Signature, args, kwargs) -> Tuple[Any, Optional[str]]:
+    try:
+        arguments = signature.bind_partial(*args, **kwargs).arguments
+    except TypeError:
+        return None, None
+
+    position = arguments.get("position_id")
+    if position is None:
+        for value in arguments.values():
+            position = getattr(value, "position_id", None)
+            if position is not None:
+                break
+    file_path = arguments.get("file_path") or arguments.get("original_file_path")
+    return position, (file_type_of(file_path) if file_path else None)
+
+
+def traced_methods(prefix: str, exclude: Tuple[str, ...] = ()):
+    """类装饰器：给所有公开方法加span，stage为 <prefix>.<方法名>"""
+    def decorator(cls):
+        for name, member in list(vars(cls).items()):
+            if name.startswith("_") or name in exclude or not inspect.isfunction(member):
+                continue
+            setattr(cls, name, traced(f"{prefix}.{name}")(member))
+        return cls
+    return decorator
+
+
+def record_llm_usage(s: Span, response: Any):
+    """从OpenAI兼容响应（response.raw.usage）中取token用量"""
+    raw = getattr(response, "raw", None)
+    usage = raw.get("usage") if isinstance(raw, dict) else getattr(raw, "usage", None)
+    if usage is None:
+        return
+    for key in ("prompt_tokens", "completion_tokens"):
+        value = usage.get(key) if isinstance(usage, dict) else getattr(usage, key, None)
+        if value:
+            s.count(key, value)
+
+
+def render_prometheus() -> str:
+    return REGISTRY.render_prometheus()
+
+
+def configure(log_spans: bool = True, metrics_port: int = None):
+    """按配置开启span日志和/metrics端口（重复调用只启动一次服务）"""
+    global _log_spans
+    _log_spans = log_spans
+    if metrics_port:
+        start_metrics_server(metrics_port)
+
+
+_server_lock = threading.Lock()
+_servers: Dict[int, ThreadingHTTPServer] = {}
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """在后台线程提供 GET /metrics"""
+    with _server_lock:
+        if port in _servers:
+            return _servers[port]
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, fmt, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                data = render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        _servers[port] = server
+        logger.info(f"指标服务已启动: http://{host}:{port}/metrics")
+        return server
@@ -0,0 +1,29 @@
+"""测试公共设置
+
+仓库目录本身就是包（模块之间用相对导入，没有__init__.py），这里把它注册为jdsx包，
+测试里统一用 from jdsx.xxx import ... 导入被测模块。
+"""
+
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+if "jdsx" not in sys.modules:
+    _package = types.ModuleType("jdsx")
+    _package.__path__ = [str(ROOT)]
+    sys.modules["jdsx"] = _package
+
+
+@pytest.fixture(autouse=True)
+def _isolated_cwd(tmp_path, monkeypatch):
+    """默认路径（./data、./data_db/positions.db等）都是相对路径，测试在临时目录中执行"""
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture
+def db_path(tmp_path) -> Path:
+    return tmp_path / "candidates.db"
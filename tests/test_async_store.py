@@ -0,0 +1,50 @@
+"""存储层异步接口：写线程批量提交（data_db.async_store）"""
+
+import pytest
+
+from jdsx.data_db.async_store import WriteBatcher
+from jdsx.data_db.database import connect
+
+
+def _insert_position(conn, name: str) -> int:
+    return conn.execute("INSERT INTO positions (name, description) VALUES (?, '')", (name,)).lastrowid
+
+
+def _insert_then_fail(conn, name: str):
+    _insert_position(conn, name)
+    raise ValueError("写入出错")
+
+
+def _position_names(db_path):
+    with connect(db_path) as conn:
+        return [row[0] for row in conn.execute("SELECT name FROM positions ORDER BY id")]
+
+
+def test_failed_request_rolls_back_only_itself(db_path):
+    # max_delay足够长，三个请求进入同一批
+    writer = WriteBatcher(str(db_path), max_delay=0.5)
+    try:
+        futures = [
+            writer.submit(_insert_position, "后端"),
+            writer.submit(_insert_then_fail, "前端"),
+            writer.submit(_insert_position, "测试"),
+        ]
+        first, failed, last = (future.exception(timeout=5) or future.result() for future in futures)
+    finally:
+        writer.close()
+
+    assert isinstance(failed, ValueError)
+    assert last == first + 1  # 同一事务中，回滚的插入没有占用rowid
+    assert _position_names(db_path) == ["后端", "测试"]
+
+
+def test_close_drains_queue_then_rejects_writes(db_path):
+    writer = WriteBatcher(str(db_path), max_batch=2, max_delay=0.5)
+    futures = [writer.submit(_insert_position, f"岗位{i}") for i in range(5)]
+    writer.close()
+
+    # 关闭前提交的写操作全部完成（分成多批提交）
+    assert [future.result(timeout=0) for future in futures] == [1, 2, 3, 4, 5]
+    assert len(_position_names(db_path)) == 5
+    with pytest.raises(RuntimeError):
+        writer.submit(_insert_position, "后端")
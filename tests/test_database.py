@@ -0,0 +1,174 @@
+"""数据库版本化迁移（data_db.database）"""
+
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from jdsx.data_db.database import MIGRATIONS, _column_names, connect, get_data_version, init_database, migrate
+
+LATEST = len(MIGRATIONS)
+
+
+def _user_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _create_baseline_candidates(path: Path) -> None:
+    """迁移之前CandidateStore建出的表：没有外键，AI优势列名拼错（ai_atrengths），user_version为0"""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE candidates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            position_id INTEGER NOT NULL,
+            file_name TEXT NOT NULL,
+            original_file_path TEXT,
+            total_years_experience INTEGER,
+            profile_json TEXT,
+            recommendation_level TEXT DEFAULT '可考虑',
+            ai_atrengths TEXT,
+            ai_concerns TEXT,
+            ai_summary TEXT,
+            hr_tag TEXT DEFAULT NULL,
+            hr_note TEXT DEFAULT NULL,
+            hr_tagged_at TIMESTAMP,
+            parser_status TEXT DEFAULT 'success',
+            error_message TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO candidates (name, position_id, file_name, recommendation_level, hr_tag) VALUES (?, ?, ?, ?, ?)",
+        [("张伟", 7, "张伟.pdf", "推荐", "star"), ("李静", 7, "李静.docx", "不推荐", None), ("王磊", 3, "王磊.pdf", "可考虑", None)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def _create_legacy_positions(path: Path) -> None:
+    """之前单独存放的岗位库"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE positions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            description TEXT NOT NULL,
+            status TEXT DEFAULT 'active',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO positions (id, name, description) VALUES (?, ?, ?)",
+        [(3, "测试工程师", "负责自动化测试"), (7, "后端工程师", "熟悉Python")]
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_fresh_database_reaches_latest_version(db_path):
+    init_database(db_path)
+    with connect(db_path) as conn:
+        assert _user_version(conn) == LATEST
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {"positions", "candidates", "candidate_notes", "position_stats", "resume_blobs",
+            "person_profiles", "data_versions", "resume_fingerprints", "retrieval_labels"} <= tables
+
+
+def test_baseline_database_is_migrated_in_place(db_path):
+    _create_baseline_candidates(db_path)
+    _create_legacy_positions(Path("data_db/positions.db"))
+
+    init_database(db_path)
+
+    with connect(db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        assert _user_version(conn) == LATEST
+
+        # 旧岗位按原id导入，候选人的position_id仍然有效
+        positions = {row["id"]: dict(row) for row in conn.execute("SELECT * FROM positions")}
+        assert {pid: p["name"] for pid, p in positions.items()} == {3: "测试工程师", 7: "后端工程师"}
+        assert all(p["jd_version"] == 1 for p in positions.values())
+
+        # 原有数据保留，缺少的列补齐，已有的评估视为基于当前岗位描述
+        rows = conn.execute("SELECT * FROM candidates ORDER BY id").fetchall()
+        assert [row["name"] for row in rows] == ["张伟", "李静", "王磊"]
+        assert all(row["jd_version"] == 1 for row in rows)
+        assert all(row["blob_sha256"] is None and row["person_id"] is None for row in rows)
+        columns = set(_column_names(conn, "candidates"))
+        assert {"ai_strengths", "blob_sha256", "person_id", "jd_version", "dup_cluster_id",
+                "prescreen_rules", "prescreen_rejected"} <= columns
+
+        # 统计表从已有候选人重算
+        stats = {row["position_id"]: dict(row) for row in conn.execute("SELECT * FROM position_stats")}
+        assert stats[7]["total"] == 2 and stats[7]["star_count"] == 1 and stats[7]["not_recommended_count"] == 1
+        assert stats[3]["total"] == 1 and stats[3]["untagged_count"] == 1
+
+
+def test_migrate_continues_from_intermediate_version(db_path):
+    conn = connect(db_path)
+    try:
+        assert migrate(conn, MIGRATIONS[:6]) == 6
+        conn.execute("INSERT INTO positions (name, description) VALUES ('后端', 'Python')")
+        conn.execute("INSERT INTO candidates (name, position_id, file_name) VALUES ('张伟', 1, '张伟.pdf')")
+        conn.commit()
+        assert "data_versions" not in {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+
+        assert migrate(conn) == LATEST
+        assert _user_version(conn) == LATEST
+        # 已经是最新版本时不再执行任何迁移
+        assert migrate(conn) == LATEST
+        assert conn.execute("SELECT COUNT(*) FROM candidates").fetchone()[0] == 1
+    finally:
+        conn.close()
+
+
+def test_failed_migration_rolls_back_and_keeps_version(db_path):
+    def _create_table(conn):
+        conn.execute("CREATE TABLE first (id INTEGER)")
+
+    def _broken(conn):
+        conn.execute("CREATE TABLE second (id INTEGER)")
+        raise RuntimeError("迁移出错")
+
+    conn = connect(db_path)
+    try:
+        with pytest.raises(RuntimeError):
+            migrate(conn, [_create_table, _broken])
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert _user_version(conn) == 1
+        assert "first" in tables and "second" not in tables
+    finally:
+        conn.close()
+
+
+def test_each_update_bumps_data_version_once(db_path):
+    init_database(db_path)
+    with connect(db_path) as conn:
+        conn.execute("INSERT INTO positions (id, name, description) VALUES (1, '后端', 'Python'), (2, '前端', 'React')")
+        conn.execute("INSERT INTO candidates (id, name, position_id, file_name) VALUES (1, '张伟', 1, '张伟.pdf')")
+
+    def _versions():
+        with connect(db_path) as conn:
+            return get_data_version(conn, 0), get_data_version(conn, 1), get_data_version(conn, 2)
+
+    before = _versions()
+    with connect(db_path) as conn:
+        conn.execute("UPDATE candidates SET hr_tag = 'star' WHERE id = 1")
+    after_tag = _versions()
+    assert after_tag == (before[0] + 1, before[1] + 1, before[2])
+
+    # 修改描述会嵌套更新jd_version和updated_at，版本号仍只加1
+    with connect(db_path) as conn:
+        conn.execute("UPDATE positions SET description = 'Python, Go' WHERE id = 1")
+        assert conn.execute("SELECT jd_version FROM positions WHERE id = 1").fetchone()[0] == 2
+    after_jd = _versions()
+    assert after_jd == (after_tag[0] + 1, after_tag[1] + 1, after_tag[2])
+
+    # 候选人换岗位时两个岗位都失效
+    with connect(db_path) as conn:
+        conn.execute("UPDATE candidates SET position_id = 2 WHERE id = 1")
+    assert _versions() == (after_jd[0] + 1, after_jd[1] + 1, after_jd[2] + 1)
@@ -0,0 +1,172 @@
+"""筛选任务队列：入队去重、领取与租约、失败重试、幂等key让出（data_db.job_store）"""
+
+import io
+import sqlite3
+
+import pytest
+
+from jdsx.data_db import job_store as job_store_module
+from jdsx.data_db.job_store import STATUS_DONE, STATUS_FAILED, STATUS_QUEUED, STATUS_RUNNING, JobStore, job_key
+
+
+class FakeClock:
+    """替换job_store模块里的time，租约和退避按手动推进的时间计算"""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(job_store_module, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def jobs(tmp_path) -> JobStore:
+    return JobStore(str(tmp_path / "jobs.db"))
+
+
+def _files(*items):
+    return [(name, io.BytesIO(content)) for name, content in items]
+
+
+def _job_rows(jobs: JobStore):
+    with sqlite3.connect(jobs.db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        return [dict(row) for row in conn.execute("SELECT * FROM jobs ORDER BY id")]
+
+
+def test_enqueue_spools_files_and_skips_duplicate_content(jobs):
+    batch_id = jobs.enqueue_batch(1, _files(("a.pdf", b"resume a"), ("copy.pdf", b"resume a"), ("b.pdf", b"resume b")))
+
+    progress = jobs.get_batch_progress(batch_id)
+    assert (progress["total"], progress["duplicate_count"], progress[STATUS_QUEUED]) == (2, 1, 2)
+    for job in _job_rows(jobs):
+        assert jobs.spool_path(job).read_bytes() == {"a.pdf": b"resume a", "b.pdf": b"resume b"}[job["file_name"]]
+
+    # 同一份文件投递另一个岗位是新任务
+    other = jobs.enqueue_batch(2, _files(("a.pdf", b"resume a")))
+    assert jobs.get_batch_progress(other)["total"] == 1
+
+
+def test_claim_by_priority_and_hold_lease(jobs, clock):
+    jobs.enqueue_batch(1, _files(("low.pdf", b"low")))
+    jobs.enqueue_batch(1, _files(("high.pdf", b"high")), priority=5)
+
+    first = jobs.claim("worker-a", lease_seconds=60)
+    second = jobs.claim("worker-b", lease_seconds=60)
+    assert (first["file_name"], second["file_name"]) == ("high.pdf", "low.pdf")
+    assert first["status"] == STATUS_RUNNING and first["attempts"] == 1
+    # 租约有效期内不会被再次领取
+    assert jobs.claim("worker-c", lease_seconds=60) is None
+
+
+def test_expired_lease_is_taken_over(jobs, clock):
+    jobs.enqueue_batch(1, _files(("a.pdf", b"a")))
+    job = jobs.claim("worker-a", lease_seconds=60)
+    assert jobs.checkpoint(job["id"], "worker-a", "embed", {"text": "..."}, lease_seconds=60)
+
+    clock.now += 30
+    assert jobs.claim("worker-b", lease_seconds=60) is None
+
+    clock.now += 31  # 续租后的60秒已过
+    taken = jobs.claim("worker-b", lease_seconds=60)
+    assert taken["id"] == job["id"] and taken["attempts"] == 2
+    # 从检查点继续
+    assert taken["stage"] == "embed" and taken["payload"] == {"text": "..."}
+
+    # 原worker的写入全部失效
+    assert not jobs.checkpoint(job["id"], "worker-a", "analyze", {}, lease_seconds=60)
+    assert not jobs.complete(job["id"], "worker-a", candidate_id=1)
+    assert jobs.fail(job["id"], "worker-a", "boom") == STATUS_RUNNING
+    assert jobs.complete(taken["id"], "worker-b", candidate_id=1)
+    assert not jobs.spool_path(taken).exists()
+
+
+def test_expired_lease_after_last_attempt_fails_job(jobs, clock):
+    jobs.enqueue_batch(1, _files(("a.pdf", b"a")), max_attempts=1)
+    job = jobs.claim("worker-a", lease_seconds=60)
+
+    clock.now += 61
+    assert jobs.claim("worker-b", lease_seconds=60) is None
+    row = _job_rows(jobs)[0]
+    assert row["id"] == job["id"] and row["status"] == STATUS_FAILED
+    assert "worker中断或超时" in row["last_error"]
+
+
+def test_retryable_failure_backs_off_then_requeues(jobs, clock):
+    batch_id = jobs.enqueue_batch(1, _files(("a.pdf", b"a")), max_attempts=2)
+    job = jobs.claim("worker-a")
+
+    assert jobs.fail(job["id"], "worker-a", "timeout") == STATUS_QUEUED
+    assert jobs.claim("worker-a") is None  # 退避中
+    clock.now += 3600
+    job = jobs.claim("worker-a")
+    assert job["attempts"] == 2
+
+    # 次数用完后标记为失败，手动重试后重新计数
+    assert jobs.fail(job["id"], "worker-a", "timeout") == STATUS_FAILED
+    assert jobs.get_batch_progress(batch_id)["errors"][0]["last_error"] == "timeout"
+    assert jobs.retry_failed(batch_id) == 1
+    assert jobs.claim("worker-a")["attempts"] == 1
+
+
+def test_requeue_expired_recovers_own_running_jobs(jobs, clock):
+    jobs.enqueue_batch(1, _files(("a.pdf", b"a"), ("b.pdf", b"b")))
+    jobs.claim("host1:100:abc", lease_seconds=600)
+    jobs.claim("host2:200:def", lease_seconds=600)
+
+    assert jobs.requeue_expired(owner_prefix="host1:") == 1
+    statuses = {row["lease_owner"]: row["status"] for row in _job_rows(jobs)}
+    assert statuses == {None: STATUS_QUEUED, "host2:200:def": STATUS_RUNNING}
+
+
+def test_reupload_replaces_failed_job(jobs):
+    first_batch = jobs.enqueue_batch(1, _files(("a.pdf", b"a")))
+    job = jobs.claim("worker-a")
+    jobs.fail(job["id"], "worker-a", "无法提取简历文本", retryable=False)
+    assert jobs.spool_path(job).exists()  # 失败的任务保留暂存文件，可以手动重试
+
+    second_batch = jobs.enqueue_batch(1, _files(("a-new-name.pdf", b"a")))
+
+    rows = _job_rows(jobs)
+    assert len(rows) == 1 and rows[0]["batch_id"] == second_batch and rows[0]["status"] == STATUS_QUEUED
+    assert jobs.get_batch_progress(first_batch)["total"] == 0
+    assert jobs.get_batch_progress(second_batch)["total"] == 1
+    assert jobs.spool_path(rows[0]).read_bytes() == b"a"
+    assert not jobs.spool_path(job).exists()  # 被代替的任务连同暂存文件删除
+
+
+def test_reupload_after_candidate_deleted(jobs):
+    jobs.enqueue_batch(1, _files(("a.pdf", b"a")))
+    job = jobs.claim("worker-a")
+    jobs.complete(job["id"], "worker-a", candidate_id=42)
+    key = job_key(1, job["file_sha256"])
+
+    # 不知道候选人是否存在、或候选人仍在时，按重复处理
+    assert jobs.get_batch_progress(jobs.enqueue_batch(1, _files(("a.pdf", b"a"))))["duplicate_count"] == 1
+    batch_id = jobs.enqueue_batch(1, _files(("a.pdf", b"a")), candidate_exists=lambda candidate_id: True)
+    assert jobs.get_batch_progress(batch_id)["duplicate_count"] == 1
+
+    batch_id = jobs.enqueue_batch(1, _files(("a.pdf", b"a")), candidate_exists=lambda candidate_id: candidate_id != 42)
+    assert jobs.get_batch_progress(batch_id)["total"] == 1
+
+    rows = _job_rows(jobs)
+    assert [(row["status"], row["idempotency_key"]) for row in rows] == [
+        (STATUS_DONE, f"{key}#{job['id']}"),
+        (STATUS_QUEUED, key),
+    ]
+
+
+def test_active_job_is_not_released(jobs):
+    jobs.enqueue_batch(1, _files(("a.pdf", b"a")))
+    jobs.claim("worker-a")
+
+    batch_id = jobs.enqueue_batch(1, _files(("a.pdf", b"a")), candidate_exists=lambda candidate_id: False)
+    assert jobs.get_batch_progress(batch_id)["duplicate_count"] == 1
+    assert [row["status"] for row in _job_rows(jobs)] == [STATUS_RUNNING]
@@ -0,0 +1,63 @@
+"""规则预筛：Aho-Corasick多模式匹配与单词边界（doc_ana.prescreen）"""
+
+from datetime import date
+
+from jdsx.data_model.position import PrescreenRules
+from jdsx.doc_ana.prescreen import AhoCorasick, Prescreener, detect_degree, estimate_years
+
+
+def test_ascii_patterns_match_on_word_boundaries():
+    matcher = AhoCorasick(["go", "c", "java"])
+
+    assert matcher.find_all("熟悉Google搜索、会用Excel、JavaScript") == set()
+    assert matcher.find_all("熟悉Go和C语言，三年Java开发") == {"go", "c", "java"}
+    assert matcher.find_all("golang/c-sharp") == {"c"}
+
+
+def test_symbol_patterns_and_case_insensitive():
+    matcher = AhoCorasick(["C++", "c#", " Python ", "python"])
+
+    assert matcher.patterns == ["c++", "c#", "python"]  # 去空格、转小写、去重
+    assert matcher.find_all("精通C++，了解C#开发，PYTHON脚本") == {"c++", "c#", "python"}
+    assert matcher.find_all("cc++ 与 c#d") == set()
+
+
+def test_chinese_patterns_match_inside_text():
+    matcher = AhoCorasick(["机器学习", "学习", "推荐系统"])
+
+    assert matcher.find_all("负责推荐系统的机器学习模型") == {"机器学习", "学习", "推荐系统"}
+
+
+def test_overlapping_patterns_found_through_fail_links():
+    matcher = AhoCorasick(["数据", "大数据", "数据库", "据库存"])
+
+    matches = sorted((matcher.patterns[index], end) for index, end in matcher.iter_matches("大数据库存"))
+    assert matches == [("大数据", 3), ("据库存", 5), ("数据", 3), ("数据库", 4)]
+
+
+def test_detect_degree_takes_highest():
+    assert detect_degree("2015-2019 某大学 本科；2019-2022 硕士研究生") == "硕士"
+    assert detect_degree("Master of Science, PhD candidate") == "博士"
+    assert detect_degree("高中毕业") is None
+
+
+def test_estimate_years_merges_overlapping_ranges():
+    text = "2018.03-2020.02 甲公司\n2019.06 - 2021.01 乙公司（兼职）\n2016-2020 某大学 本科"
+    assert estimate_years(text, today=date(2024, 1, 1)) == round(35 / 12, 1)
+    # 自述年限更大时取自述
+    assert estimate_years(text + "\n5年以上开发经验", today=date(2024, 1, 1)) == 5
+
+
+def test_prescreener_reports_reasons():
+    screener = Prescreener(PrescreenRules(must_have=["Python|py", "Go"], min_degree="本科", min_years=3))
+
+    passed = screener.screen("本科，5年工作经验，熟悉Python和Go")
+    assert passed.passed and passed.missing_terms == []
+
+    rejected = screener.screen("大专，1年经验，熟悉Google Ads")
+    assert not rejected.passed
+    assert rejected.missing_terms == ["Python|py", "Go"]
+    assert len(rejected.reasons) == 3
+    assert rejected.to_analysis().recommendation_level == "不推荐"
+
+    assert Prescreener(PrescreenRules(enabled=False, must_have=["Rust"])).screen("").passed
@@ -0,0 +1,64 @@
+"""数据服务的请求/响应编码（service.protocol）"""
+
+from datetime import datetime
+
+import pytest
+
+from jdsx.data_model.ana_model import ResumeAnalysis
+from jdsx.data_model.candidate import CandidateProfile, Skills, WorkExperience
+from jdsx.data_model.position import Position, PrescreenRules
+from jdsx.service.protocol import decode, dumps, encode, loads
+
+
+def _round_trip(value):
+    return loads(dumps(value))
+
+
+def test_models_round_trip():
+    position = Position(
+        id=7, name="后端工程师", description="熟悉Python", jd_version=3,
+        prescreen_rules=PrescreenRules(must_have=["Python|py"], min_degree="本科", min_years=3),
+        created_at=datetime(2024, 5, 1, 9, 30),
+    )
+    profile = CandidateProfile(
+        id=1, name="张伟", position_id=7, file_name="张伟.pdf",
+        work_experience=[WorkExperience(company="某公司", position="工程师", description="负责后端")],
+        skills=[Skills(category="编程语言", items=["Python", "Go"])],
+        hr_tag="star", hr_tagged_at=datetime(2024, 5, 2, 18, 0),
+    )
+    analysis = ResumeAnalysis(recommendation_level="推荐", key_strengths=["Python经验丰富"])
+
+    decoded = _round_trip({"position": position, "profiles": [profile], "analysis": analysis})
+
+    assert decoded == {"position": position, "profiles": [profile], "analysis": analysis}
+    assert isinstance(decoded["position"].prescreen_rules, PrescreenRules)
+    assert decoded["profiles"][0].hr_tagged_at == datetime(2024, 5, 2, 18, 0)
+
+
+def test_builtin_types_round_trip():
+    value = {
+        "blob": b"\x00\xffresume",
+        "at": datetime(2024, 5, 1, 9, 30, 15),
+        "stats": {1: {"total": 3}, 2: {"total": 0}},
+        "pairs": [("a.pdf", "sha")],
+        "empty": {},
+        "none": None,
+    }
+
+    decoded = _round_trip(value)
+
+    assert decoded["blob"] == b"\x00\xffresume"
+    assert decoded["at"] == datetime(2024, 5, 1, 9, 30, 15)
+    assert decoded["stats"] == {1: {"total": 3}, 2: {"total": 0}}
+    assert decoded["pairs"] == [["a.pdf", "sha"]]  # JSON没有元组，解码为列表
+    assert decoded["empty"] == {} and decoded["none"] is None
+
+
+def test_non_string_keys_are_encoded_as_items():
+    assert encode({1: "a"}) == {"__items__": [[1, "a"]]}
+    assert decode(encode({"1": "a"})) == {"1": "a"}
+
+
+def test_unsupported_model_is_rejected():
+    with pytest.raises(TypeError):
+        dumps(WorkExperience(company="某公司", position="工程师", description=""))